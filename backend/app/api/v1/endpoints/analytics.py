@@ -8,14 +8,17 @@ GET  /analytics/export/csv          - Export analytics as CSV
 GET  /analytics/export/report       - Export analytics as HTML report
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 
 from app.core.deps import get_current_user, get_store
+from app.services.analytics_columnar import range_bounds
 from app.services.analytics_service import (
-    export_analytics_csv,
+    analytics_report_etag,
     export_analytics_report,
     get_dashboard_summary,
     get_product_analytics,
+    stream_analytics_csv,
 )
 from app.utils.json_store import JsonStore
 
@@ -33,6 +36,53 @@ def _get_retailer_id(current_user: dict) -> str:
     return current_user["_id"]
 
 
+def _check_date_range(date_from: str | None, date_to: str | None) -> None:
+    """Reject date filters that are not ISO dates / datetimes with a 422."""
+    try:
+        range_bounds(date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e),
+        )
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip: an explicit gzip entry
+    decides, otherwise a "*" entry does. Entries with q=0 are refusals.
+    """
+    qvalues: dict[str, float] = {}
+    for entry in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+    q = qvalues.get("gzip", qvalues.get("*", 0.0))
+    return q > 0
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match check: "*" or any listed tag equal under weak comparison."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
 @router.get("/dashboard")
 async def dashboard(
     date_from: str = Query(None, description="Start date (YYYY-MM-DD)"),
@@ -42,6 +92,7 @@ async def dashboard(
 ):
     """Get retailer analytics dashboard data."""
     retailer_id = _get_retailer_id(current_user)
+    _check_date_range(date_from, date_to)
     return await get_dashboard_summary(store, retailer_id, date_from, date_to)
 
 
@@ -64,33 +115,45 @@ async def product_analytics(
 
 @router.get("/export/csv")
 async def export_csv(
+    request: Request,
     date_from: str = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: str = Query(None, description="End date (YYYY-MM-DD)"),
+    gzip: bool = Query(True, description="Gzip-encode the download if the client accepts it"),
     current_user: dict = Depends(get_current_user),
     store: JsonStore = Depends(get_store),
 ):
-    """Export analytics as a CSV file download."""
+    """Stream analytics as a CSV file download."""
     retailer_id = _get_retailer_id(current_user)
-    csv_bytes = await export_analytics_csv(store, retailer_id, date_from, date_to)
-    return Response(
-        content=csv_bytes,
+    _check_date_range(date_from, date_to)
+    compress = gzip and _accepts_gzip(request.headers.get("accept-encoding", ""))
+    headers = {
+        "Content-Disposition": "attachment; filename=fitview_analytics.csv",
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_analytics_csv(store, retailer_id, date_from, date_to, compress=compress),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=fitview_analytics.csv"},
+        headers=headers,
     )
 
 
 @router.get("/export/report")
 async def export_report(
+    request: Request,
     date_from: str = Query(None, description="Start date (YYYY-MM-DD)"),
     date_to: str = Query(None, description="End date (YYYY-MM-DD)"),
     current_user: dict = Depends(get_current_user),
     store: JsonStore = Depends(get_store),
 ):
-    """Export analytics as an HTML report."""
+    """Export analytics as an HTML report. Supports conditional GET via ETag."""
     retailer_id = _get_retailer_id(current_user)
-    html = await export_analytics_report(store, retailer_id, date_from, date_to)
-    return Response(
-        content=html,
-        media_type="text/html",
-        headers={"Content-Disposition": "attachment; filename=fitview_analytics_report.html"},
-    )
+    _check_date_range(date_from, date_to)
+    etag = await analytics_report_etag(store, retailer_id, date_from, date_to)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    etag, html = await export_analytics_report(store, retailer_id, date_from, date_to, etag)
+    headers["Content-Disposition"] = "attachment; filename=fitview_analytics_report.html"
+    return Response(content=html, media_type="text/html", headers=headers)
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, Body, HTTPException, status
 
+from app.core import events
 from app.core.deps import get_store, get_current_user
 from app.core.security import create_access_token, create_refresh_token, verify_refresh_token
 from app.models.user import UserCreate, UserLogin, UserResponse, TokenResponse
 from app.services import auth_service
+from app.utils.audit import log_audit_event
 from app.utils.json_store import JsonStore
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -87,6 +89,7 @@ async def export_my_data(
 
     # Strip internal fields for cleaner export
     profile = {k: v for k, v in current_user.items() if k not in ("hashed_password", "_id")}
+    await log_audit_event(store, "data_export", user_id, "export", resource_type="user", resource_id=user_id)
 
     return {
         "profile": profile,
@@ -108,10 +111,22 @@ async def delete_my_account(
     user_id = current_user["id"]
     email = current_user["email"]
 
+    # Read models drop exactly these rows when USER_DELETED is published
+    sessions = await store.find_many("tryon_sessions", {"user_id": user_id})
+    cart = await store.find_one("carts", {"user_id": user_id})
+
     # Delete all user-associated collections
     await store.delete_many("tryon_sessions", {"user_id": user_id})
     await store.delete_many("carts", {"user_id": user_id})
     await store.delete_many("wishlists", {"user_id": user_id})
     await store.delete_one("users", {"email": email})
 
+    await events.publish(
+        events.USER_DELETED,
+        user_id=user_id,
+        sessions=sessions,
+        cart_items=cart.get("items", []) if cart else [],
+    )
+    await log_audit_event(store, "account_deletion", user_id, "delete", resource_type="user", resource_id=user_id)
+
     return None
@@ -28,13 +28,10 @@ async def send_chat_message(
     except Exception:
         pass
 
-    # Get or create session
-    session_id = await chatbot_service.get_or_create_session(redis_client, request.session_id)
-
-    # Send message
-    response_text, suggested_products = await chatbot_service.send_message(
+    # Send message (the session is resolved together with the prompt context)
+    session_id, response_text, suggested_products = await chatbot_service.send_message(
         message=request.message,
-        session_id=session_id,
+        session_id=request.session_id,
         user=current_user,
         redis_client=redis_client,
         store=store,
@@ -8,7 +8,7 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
 
-from app.core.deps import get_current_user, get_store
+from app.core.deps import get_current_user, get_optional_user, get_store
 from app.models.product import (
     ProductCreate,
     ProductListResponse,
@@ -16,6 +16,7 @@ from app.models.product import (
     ProductUpdate,
 )
 from app.services import product_service
+from app.services.analytics_service import track_event
 from app.utils.json_store import JsonStore
 from app.utils.storage import upload_image_multiple_sizes, validate_image
 
@@ -73,6 +74,7 @@ async def list_products(
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str,
+    current_user: Optional[dict] = Depends(get_optional_user),
     store: JsonStore = Depends(get_store),
 ):
     """Get a single product by ID."""
@@ -82,6 +84,7 @@ async def get_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
+    track_event("product_viewed", current_user["_id"] if current_user else None, product_id)
     return product
 
 
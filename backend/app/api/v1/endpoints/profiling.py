@@ -0,0 +1,42 @@
+"""
+Profiling report endpoints for FitView AI (admin only).
+
+GET  /admin/profiles          - List stored request profiles
+GET  /admin/profiles/{name}   - Download a profile (.prof, or ?format=text)
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.core.deps import require_role
+from app.core.profiling import list_profiles, profile_path, render_text
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["Profiling"],
+    dependencies=[Depends(require_role(["admin"]))],
+)
+
+
+@router.get("")
+async def get_profiles():
+    """List stored profiling reports, newest first."""
+    return {"profiles": list_profiles()}
+
+
+@router.get("/{name}")
+async def download_profile(
+    name: str,
+    format: str = Query("prof", regex="^(prof|text)$"),
+    sort: str = Query("cumulative", regex="^(cumulative|tottime|calls)$"),
+):
+    """Download a report as a pstats dump, or as a text summary with ?format=text."""
+    path = profile_path(name)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    if format == "text":
+        return PlainTextResponse(render_text(path, sort=sort))
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
@@ -3,14 +3,27 @@ Recommendations API Endpoints for FitView AI.
 Phase 4: Intelligence Layer.
 
 GET /recommendations/size?product_id=xxx - Size recommendation
+POST /recommendations/size/bulk          - Size recommendations for a product list
 GET /recommendations/style?limit=10      - Style recommendations
+GET /recommendations/also-tried?product_id=xxx - Customers who tried this also tried
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.core.deps import get_current_user, get_store
-from app.models.recommendation import SizeRecommendation, StyleRecommendation
-from app.services.recommendation_service import recommend_size, recommend_style
+from app.models.recommendation import (
+    BulkSizeRecommendation,
+    BulkSizeRequest,
+    SizeRecommendation,
+    StyleRecommendation,
+)
+from app.services import product_service
+from app.services.recommendation_service import (
+    recommend_also_tried,
+    recommend_size,
+    recommend_sizes_bulk,
+    recommend_style,
+)
 from app.utils.json_store import JsonStore
 
 router = APIRouter(prefix="/recommendations", tags=["Recommendations"])
@@ -36,6 +49,44 @@ async def get_size_recommendation(
         )
 
 
+@router.post("/size/bulk", response_model=BulkSizeRecommendation)
+async def get_bulk_size_recommendations(
+    request: BulkSizeRequest,
+    current_user: dict = Depends(get_current_user),
+    store: JsonStore = Depends(get_store),
+):
+    """
+    Size recommendations for a whole product listing in one call: pass
+    product_ids, or the listing's filters / page to resolve them.
+    """
+    try:
+        product_ids = request.product_ids
+        if not product_ids:
+            filters = request.model_dump(
+                include={"category", "subcategory", "search", "price_min", "price_max"},
+                exclude_none=True,
+            )
+            product_ids = await product_service.get_product_ids(
+                store,
+                filters,
+                request.page,
+                request.limit,
+                request.sort_by,
+                -1 if request.sort_order == "desc" else 1,
+            )
+        recommendations = await recommend_sizes_bulk(
+            store=store,
+            user_id=current_user["_id"],
+            product_ids=product_ids,
+        )
+        return BulkSizeRecommendation(recommendations=recommendations)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate size recommendations: {str(e)}",
+        )
+
+
 @router.get("/style", response_model=StyleRecommendation)
 async def get_style_recommendations(
     limit: int = Query(10, ge=1, le=50, description="Number of recommendations"),
@@ -54,3 +105,24 @@ async def get_style_recommendations(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to generate style recommendations: {str(e)}",
         )
+
+
+@router.get("/also-tried", response_model=StyleRecommendation)
+async def get_also_tried(
+    product_id: str = Query(..., description="Product ID to find related products for"),
+    limit: int = Query(10, ge=1, le=50, description="Number of recommendations"),
+    current_user: dict = Depends(get_current_user),
+    store: JsonStore = Depends(get_store),
+):
+    """Products most often tried by the same customers (offline item-item similarity)."""
+    try:
+        return await recommend_also_tried(
+            store=store,
+            product_id=product_id,
+            limit=limit,
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate also-tried recommendations: {str(e)}",
+        )
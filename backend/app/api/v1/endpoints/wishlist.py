@@ -3,19 +3,21 @@ Wishlist API Endpoints for FitView AI.
 Phase 4: Intelligence Layer.
 
 GET    /wishlist              - Get user's wishlist
+GET    /wishlist/contains?ids=a,b - Which products are in the wishlist
 POST   /wishlist              - Add item to wishlist
 DELETE /wishlist/{product_id} - Remove item from wishlist
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.core.deps import get_current_user, get_store
-from app.models.wishlist import WishlistItemRequest, WishlistResponse
+from app.models.wishlist import WishlistContainsResponse, WishlistItemRequest, WishlistResponse
 from app.services.wishlist_service import (
     WishlistServiceError,
     add_to_wishlist,
     get_wishlist,
     remove_from_wishlist,
+    wishlist_contains,
 )
 from app.utils.json_store import JsonStore
 
@@ -31,6 +33,23 @@ async def get_user_wishlist(
     return await get_wishlist(store, current_user["_id"])
 
 
+@router.get("/contains", response_model=WishlistContainsResponse)
+async def check_wishlist_items(
+    ids: str = Query(..., description="Comma-separated product IDs (max 100)"),
+    current_user: dict = Depends(get_current_user),
+    store: JsonStore = Depends(get_store),
+):
+    """Wishlist state for a page of products in one call."""
+    product_ids = [pid for pid in dict.fromkeys(p.strip() for p in ids.split(",")) if pid]
+    if len(product_ids) > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At most 100 product IDs per request",
+        )
+    contains = await wishlist_contains(store, current_user["_id"], product_ids)
+    return WishlistContainsResponse(contains=contains)
+
+
 @router.post("", response_model=WishlistResponse, status_code=status.HTTP_201_CREATED)
 async def add_wishlist_item(
     request: WishlistItemRequest,
@@ -4,6 +4,7 @@ from app.api.v1.endpoints import auth, products, models, tryon
 from app.api.v1.endpoints import style, recommendations, cart, wishlist
 from app.api.v1.endpoints import analytics
 from app.api.v1.endpoints import chatbot
+from app.api.v1.endpoints import profiling
 
 api_router = APIRouter()
 
@@ -28,3 +29,6 @@ api_router.include_router(analytics.router)
 
 # Phase 6 (Bedrock): AI Chatbot
 api_router.include_router(chatbot.router, prefix="/chatbot", tags=["chatbot"])
+
+# Operations: request profiling reports
+api_router.include_router(profiling.router)
@@ -57,6 +57,31 @@ async def cache_set(key: str, value: Any, ttl: int = 3600) -> bool:
         return False
 
 
+async def cache_get_many(keys: list[str]) -> list[Optional[Any]]:
+    if not _redis or not keys:
+        return [None] * len(keys)
+    try:
+        vals = await _redis.mget(keys)
+        return [json.loads(val) if val else None for val in vals]
+    except Exception as e:
+        logger.warning(f"Redis mget error for {len(keys)} keys: {e}")
+        return [None] * len(keys)
+
+
+async def cache_set_many(items: dict[str, Any], ttl: int = 3600) -> bool:
+    if not _redis or not items:
+        return False
+    try:
+        async with _redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.setex(key, ttl, json.dumps(value, default=str))
+            await pipe.execute()
+        return True
+    except Exception as e:
+        logger.warning(f"Redis pipelined set error for {len(items)} keys: {e}")
+        return False
+
+
 async def cache_delete(key: str) -> bool:
     if not _redis:
         return False
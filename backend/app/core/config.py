@@ -50,6 +50,54 @@ class Settings(BaseSettings):
     BEDROCK_CHAT_MODEL_ID: str = "anthropic.claude-3-5-haiku-20241022"
     USE_BEDROCK: bool = False
 
+    # Try-on cache warmer (pre-generates popular model x product pairs off-peak)
+    TRYON_WARMER_ENABLED: bool = False
+    TRYON_WARMER_BUDGET: int = 20  # max AI generations per off-peak window
+    TRYON_WARMER_START_HOUR: int = 1  # off-peak window start, UTC hour (inclusive)
+    TRYON_WARMER_END_HOUR: int = 6  # off-peak window end, UTC hour (exclusive)
+    TRYON_WARMER_INTERVAL_SECONDS: int = 1800
+    TRYON_WARMER_TOP_MODELS: int = 5
+    TRYON_WARMER_CACHE_TTL_SECONDS: int = 86400
+
+    # Prometheus-format metrics at /metrics (unauthenticated; keep it off unless
+    # the endpoint is only reachable by the scraper)
+    METRICS_ENABLED: bool = False
+
+    # Request tracing (Server-Timing header for admins / DEBUG; optional JSON-lines trace export)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORT_PATH: str = ""  # e.g. "traces.jsonl"; empty disables export
+
+    # Per-request cProfile capture (admins can always profile via the header)
+    PROFILING_ENABLED: bool = False  # random sampling; the header is honoured for admins only
+    PROFILING_HEADER: str = "X-Profile"
+    PROFILING_SAMPLE_RATE: int = 0  # profile 1 in N requests when enabled; 0 disables sampling
+    PROFILING_DIR: str = "profiles"
+    PROFILING_MAX_FILES: int = 50
+
+    # Item-item collaborative filtering (artifact built by scripts/build_item_similarity.py)
+    ITEM_SIMILARITY_PATH: str = "data/item_similarity.npz"
+    ITEM_SIMILARITY_TOP_N: int = 20  # neighbors kept per product
+    STYLE_CF_WEIGHT: float = 5.0  # weight of also-tried similarity in style scores; 0 disables
+
+    # get_current_user cache of verified access token -> user (bounded by token expiry).
+    # Profile / role changes are seen after at most AUTH_CACHE_TTL_SECONDS.
+    AUTH_CACHE_SIZE: int = 10000  # 0 disables
+    AUTH_CACHE_TTL_SECONDS: int = 60
+
+    # Per-user style / size recommendation cache (invalidated via the event bus)
+    RECOMMENDATION_CACHE_SIZE: int = 5000  # users kept in the in-process LRU
+    RECOMMENDATION_CACHE_TTL_SECONDS: int = 300
+    RECOMMENDATION_CACHE_REDIS: bool = False  # also share entries through Redis
+
+    # Buffered analytics / audit event ingest
+    EVENT_BUFFER_SIZE: int = 10000  # max events held in memory before dropping
+    EVENT_BATCH_SIZE: int = 500  # max events written per store call
+    EVENT_FLUSH_INTERVAL_SECONDS: float = 2.0
+    EVENT_DROP_POLICY: str = "oldest"  # "oldest" | "newest" when the buffer is full (audit events are never dropped)
+    # analytics_events.jsonl rotates at this size, keeping EVENT_LOG_BACKUPS old files
+    EVENT_LOG_MAX_BYTES: int = 64 * 1024 * 1024
+    EVENT_LOG_BACKUPS: int = 4
+
     model_config = {
         "env_file": ".env",
         "env_file_encoding": "utf-8",
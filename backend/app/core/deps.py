@@ -1,17 +1,31 @@
+import time
+from collections import OrderedDict
 from typing import Callable, List
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from app.core import events
 from app.core.config import settings
+from app.core.metrics import record_cache
 from app.core.security import verify_token
 from app.utils.json_store import JsonStore
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_PREFIX}/auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_PREFIX}/auth/login", auto_error=False
+)
 
 # Global store — initialized in main.py lifespan
 store: JsonStore | None = None
 
+# Verified access token -> (cached until, user principal); bounded LRU.
+# There is no user-update path, so entries expire by AUTH_CACHE_TTL_SECONDS
+# only; account deletion drops them immediately.
+_principals: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+# user_id -> tokens cached for that user, for invalidation
+_user_tokens: dict[str, set[str]] = {}
+
 
 def get_store() -> JsonStore:
     if store is None:
@@ -26,6 +40,15 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     s: JsonStore = Depends(get_store),
 ) -> dict:
+    cached = _principals.get(token)
+    if cached is not None:
+        if cached[0] > time.time():
+            _principals.move_to_end(token)
+            record_cache("auth", True)
+            return dict(cached[1])
+        _forget_token(token)
+    record_cache("auth", False)
+
     payload = verify_token(token)
     email: str | None = payload.get("sub")
     if email is None:
@@ -42,9 +65,51 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     user["id"] = user["_id"]
+    _cache_principal(token, payload, user)
     return user
 
 
+async def get_optional_user(
+    token: str | None = Depends(optional_oauth2_scheme),
+    s: JsonStore = Depends(get_store),
+) -> dict | None:
+    """Current user on endpoints that also serve anonymous callers (None if not signed in)."""
+    if not token:
+        return None
+    try:
+        return await get_current_user(token, s)
+    except HTTPException:
+        return None
+
+
+def _cache_principal(token: str, payload: dict, user: dict) -> None:
+    if settings.AUTH_CACHE_SIZE <= 0:
+        return
+    # Never outlive the token itself
+    until = min(time.time() + settings.AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0))
+    _principals[token] = (until, dict(user))
+    _user_tokens.setdefault(user["_id"], set()).add(token)
+    while len(_principals) > settings.AUTH_CACHE_SIZE:
+        _forget_token(next(iter(_principals)))
+
+
+def _forget_token(token: str) -> None:
+    entry = _principals.pop(token, None)
+    if entry is not None:
+        tokens = _user_tokens.get(entry[1]["_id"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del _user_tokens[entry[1]["_id"]]
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(user_id: str, **_) -> None:
+    """Drop cached principals of a deleted user."""
+    for token in list(_user_tokens.get(user_id, ())):
+        _forget_token(token)
+
+
 def require_role(allowed_roles: List[str]) -> Callable:
     """
     Dependency factory for role-based access control.
@@ -0,0 +1,43 @@
+"""
+Internal event bus for FitView AI.
+
+Services publish domain events after their writes (a try-on was created,
+the catalog or a fashion model changed, an account was deleted) and
+in-process caches subscribe to them to invalidate. Handlers may be sync or async; they run
+inline in the publisher's task, in subscription order. A failing handler
+is logged and does not affect the publisher or the other handlers.
+"""
+
+import inspect
+import logging
+from collections import defaultdict
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Event names (payload keyword arguments in parentheses)
+TRYON_CREATED = "tryon.created"  # (user_id, product_id, session)
+CATALOG_CHANGED = "catalog.changed"  # (product_id)
+USER_DELETED = "user.deleted"  # (user_id, sessions, cart_items) of the deleted account
+MODEL_CHANGED = "model.changed"  # (model_id)
+
+_handlers: dict[str, list[Callable]] = defaultdict(list)
+
+
+def subscribe(event: str) -> Callable:
+    """Decorator registering a handler for an event."""
+    def decorator(handler: Callable) -> Callable:
+        _handlers[event].append(handler)
+        return handler
+    return decorator
+
+
+async def publish(event: str, **payload) -> None:
+    """Deliver an event to its handlers."""
+    for handler in _handlers.get(event, ()):
+        try:
+            result = handler(**payload)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            logger.error(f"Event handler {handler.__qualname__} failed for {event}: {e}")
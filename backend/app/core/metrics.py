@@ -0,0 +1,191 @@
+"""
+In-process metrics for FitView AI, exposed in Prometheus text format.
+
+Minimal counter / gauge / histogram types with labels, plus the metrics
+the backend records: try-on pipeline stages, AI provider calls, store
+operations, cache hit/miss counts and event-loop lag. `render()` produces
+the exposition text served at /metrics.
+"""
+
+import asyncio
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Latency buckets in seconds: sub-millisecond store ops up to 60s AI calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0,
+)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def _samples(self) -> Iterator[str]:
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self._buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the wall time of the `with` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> Iterator[str]:
+        for key, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self._buckets, counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            le = _format_labels(self.labelnames, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{le} {count}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# -------------------------------------------------------------------
+# Backend metrics
+# -------------------------------------------------------------------
+
+TRYON_STAGE_SECONDS = Histogram(
+    "fitview_tryon_stage_seconds",
+    "Try-on pipeline stage latency "
+    "(fetch, preprocess_model, preprocess_garment, postprocess, upload, session_write).",
+    ("stage",),
+)
+
+TRYON_PROVIDER_SECONDS = Histogram(
+    "fitview_tryon_provider_seconds",
+    "AI provider call latency per provider and outcome.",
+    ("provider", "outcome"),
+)
+
+STORE_OPERATION_SECONDS = Histogram(
+    "fitview_store_operation_seconds",
+    "JsonStore operation latency by collection and operation.",
+    ("collection", "op"),
+)
+
+CACHE_REQUESTS = Counter(
+    "fitview_cache_requests_total",
+    "Cache lookups by cache and result (hit | miss).",
+    ("cache", "result"),
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "fitview_event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wakeup and when it actually ran.",
+)
+
+EVENT_LOOP_LAG_LAST = Gauge(
+    "fitview_event_loop_lag_last_seconds",
+    "Most recently measured event-loop lag.",
+)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+async def event_loop_lag_monitor(interval: float = 0.5) -> None:
+    """Background task: measure how late the loop wakes up from a fixed sleep."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        EVENT_LOOP_LAG_LAST.set(lag)
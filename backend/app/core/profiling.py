@@ -0,0 +1,114 @@
+"""
+Per-request cProfile capture for FitView AI.
+
+A request is profiled when it carries the PROFILING_HEADER and comes from
+an admin (bearer token role), or when PROFILING_ENABLED is set and it falls
+in the random 1-in-PROFILING_SAMPLE_RATE sample. The header is ignored for
+everyone else.
+
+cProfile hooks the whole event-loop thread, so only one request is profiled
+at a time and the report also includes other coroutines that ran in
+between. Reports are pstats dumps kept in PROFILING_DIR, trimmed to the
+newest PROFILING_MAX_FILES.
+"""
+
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import random
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.security import is_admin_request
+
+logger = logging.getLogger(__name__)
+
+_NAME_RE = re.compile(r"^[\w\-]+\.prof$")
+_active = False
+
+
+def should_profile(request: Request) -> bool:
+    """Decide whether to profile this request."""
+    if _active:
+        return False
+    if request.headers.get(settings.PROFILING_HEADER) and is_admin_request(request):
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return settings.PROFILING_ENABLED and rate > 0 and random.randrange(rate) == 0
+
+
+def start_profile() -> cProfile.Profile:
+    global _active
+    _active = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+async def finish_profile(profiler: cProfile.Profile, request: Request) -> Optional[str]:
+    """Stop the profiler, save its report (in a worker thread) and return the report name."""
+    global _active
+    profiler.disable()
+    _active = False
+
+    profile_dir = Path(settings.PROFILING_DIR)
+    slug = re.sub(r"[^\w]+", "_", request.url.path).strip("_")[:60] or "root"
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}_{request.method}_{slug}_{uuid.uuid4().hex[:6]}.prof"
+    try:
+        await asyncio.to_thread(_save, profiler, profile_dir, name)
+    except OSError as e:
+        logger.error(f"Saving profile failed: {e}")
+        return None
+    return name
+
+
+def _save(profiler: cProfile.Profile, profile_dir: Path, name: str) -> None:
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(profile_dir / name))
+    _trim(profile_dir)
+
+
+def _trim(profile_dir: Path) -> None:
+    reports = sorted(profile_dir.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for old in reports[: max(0, len(reports) - settings.PROFILING_MAX_FILES)]:
+        old.unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Stored reports, newest first."""
+    profile_dir = Path(settings.PROFILING_DIR)
+    if not profile_dir.is_dir():
+        return []
+    reports = sorted(profile_dir.glob("*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [
+        {
+            "name": p.name,
+            "size_bytes": p.stat().st_size,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(p.stat().st_mtime)),
+        }
+        for p in reports
+    ]
+
+
+def profile_path(name: str) -> Optional[Path]:
+    """Resolve a report name to its file, rejecting anything that is not a plain report name."""
+    if not _NAME_RE.match(name):
+        return None
+    path = Path(settings.PROFILING_DIR) / name
+    return path if path.is_file() else None
+
+
+def render_text(path: Path, sort: str = "cumulative", limit: int = 50) -> str:
+    """Human-readable pstats summary of a report."""
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
@@ -4,6 +4,7 @@ from typing import Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from starlette.requests import Request
 
 from app.core.config import settings
 
@@ -64,6 +65,18 @@ def verify_token(token: str) -> dict[str, Any]:
         )
 
 
+def is_admin_request(request: Request) -> bool:
+    """Whether the request carries a valid access token with the admin role."""
+    auth = request.headers.get("authorization", "")
+    if not auth.lower().startswith("bearer "):
+        return False
+    try:
+        payload = verify_token(auth[7:])
+    except HTTPException:
+        return False
+    return payload.get("role") == "admin"
+
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
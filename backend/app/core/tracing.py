@@ -0,0 +1,199 @@
+"""
+Lightweight request tracing for FitView AI.
+
+A root span is opened per request by TracingMiddleware; code below it opens
+nested spans with `span()` or the `@traced()` decorator. The active span is
+kept in a ContextVar, so it follows awaits and is inherited by tasks
+created with asyncio.gather / create_task. Outside a request, spans are
+no-ops.
+
+Finished traces go to the configured exporter: JSON lines on disk
+(TRACING_EXPORT_PATH, written by a background thread) or an in-memory
+collector for tests. For admins (and everyone in DEBUG) the middleware
+also summarizes the root's direct children in a Server-Timing response
+header; span names describe internals, so anonymous clients never get it.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["Span"]] = ContextVar("fitview_current_span", default=None)
+
+
+class Span:
+    """One timed operation in a trace."""
+
+    __slots__ = ("name", "attributes", "start", "end", "children", "error")
+
+    def __init__(self, name: str, attributes: Optional[dict] = None):
+        self.name = name
+        self.attributes = attributes or {}
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: list["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        data: dict[str, Any] = {
+            "name": self.name,
+            "duration_ms": round(self.duration_ms, 3),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [c.to_dict() for c in self.children]
+        return data
+
+
+# -------------------------------------------------------------------
+# Exporters
+# -------------------------------------------------------------------
+
+class InMemoryExporter:
+    """Keeps finished traces in a list (for tests and debugging)."""
+
+    def __init__(self):
+        self.traces: list[dict] = []
+
+    def export(self, root: Span) -> None:
+        self.traces.append(root.to_dict())
+
+
+class JsonlExporter:
+    """
+    Appends each finished trace as one JSON line. export() only enqueues;
+    a daemon thread serializes and writes, batching whatever is queued.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._queue: queue.SimpleQueue[Optional[Span]] = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, root: Span) -> None:
+        self._queue.put(root)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            roots = [self._queue.get()]
+            while not self._queue.empty():
+                roots.append(self._queue.get_nowait())
+            done = None in roots
+            lines = [json.dumps(r.to_dict(), default=str) + "\n" for r in roots if r is not None]
+            if lines:
+                try:
+                    with open(self.path, "a") as f:
+                        f.writelines(lines)
+                except OSError as e:
+                    logger.error(f"Trace export failed: {e}")
+            if done:
+                return
+
+
+_exporter: Optional[Any] = None
+
+
+def set_exporter(exporter: Optional[Any]) -> None:
+    """Install the exporter for finished root spans (None disables export)."""
+    global _exporter
+    _exporter = exporter
+
+
+# -------------------------------------------------------------------
+# Span API
+# -------------------------------------------------------------------
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Span]:
+    """Open a root span, making it current for the block, and export it afterwards."""
+    root = Span(name, attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current.reset(token)
+        if _exporter is not None:
+            _exporter.export(root)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+    """Open a child span of the current span. No-op when no trace is active."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = type(e).__name__
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _current.reset(token)
+
+
+def traced(name: Optional[str] = None):
+    """Decorator wrapping a sync or async function in a span."""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def sync_wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+_TOKEN_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+def server_timing(root: Span, limit: int = 10) -> str:
+    """
+    Summarize a root span for the Server-Timing header: its direct children
+    aggregated by name (slowest first), plus the total.
+    """
+    totals: dict[str, float] = {}
+    for child in root.children:
+        totals[child.name] = totals.get(child.name, 0.0) + child.duration_ms
+    slowest = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:limit]
+    entries = [f"{_TOKEN_RE.sub('_', n)};dur={ms:.1f}" for n, ms in slowest]
+    entries.append(f"total;dur={root.duration_ms:.1f}")
+    return ", ".join(entries)
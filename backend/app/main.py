@@ -2,6 +2,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
@@ -11,11 +12,18 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
 from app.core.config import settings
-from app.core import deps
+from app.core import deps, metrics
+from app.core.profiling import finish_profile, should_profile, start_profile
+from app.core.security import is_admin_request
+from app.core.tracing import JsonlExporter, server_timing, set_exporter, start_trace
 from app.core.db import connect_db, close_db
 from app.core.cache import connect_redis, close_redis
 from app.api.v1.router import api_router
+from app.services.item_similarity import item_neighbors
+from app.services.tryon_warmer import warmer_loop
+from app.utils.event_ingest import event_ingest
 from app.utils.json_store import JsonStore
+import asyncio
 import os
 
 # Ensure upload directory exists before StaticFiles mount
@@ -37,11 +45,42 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 
+class TracingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not settings.TRACING_ENABLED:
+            return await call_next(request)
+        with start_trace(f"{request.method} {request.url.path}") as root:
+            response = await call_next(request)
+        # Span names expose internals; only admins (or DEBUG) see the summary
+        if settings.DEBUG or is_admin_request(request):
+            response.headers["Server-Timing"] = server_timing(root)
+        return response
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        if not should_profile(request):
+            return await call_next(request)
+        profiler = start_profile()
+        try:
+            response = await call_next(request)
+        finally:
+            name = await finish_profile(profiler, request)
+        if name:
+            response.headers["X-Profile-Id"] = name
+        return response
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup: initialize JSON store
     deps.store = JsonStore(data_dir=settings.DATA_DIR)
     deps.store.load()
+    deps.store.create_index("users", "email")
+    # Analytics events are append-only JSON lines, bounded on disk by rotation
+    deps.store.set_log_retention(
+        "analytics_events", settings.EVENT_LOG_MAX_BYTES, settings.EVENT_LOG_BACKUPS
+    )
     print(f"JSON store loaded from {settings.DATA_DIR}/")
 
     # Startup: connect MongoDB
@@ -58,9 +97,45 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Redis connection failed (continuing without it): {e}")
 
+    # Startup: trace exporter
+    trace_exporter = None
+    if settings.TRACING_ENABLED and settings.TRACING_EXPORT_PATH:
+        trace_exporter = JsonlExporter(settings.TRACING_EXPORT_PATH)
+        set_exporter(trace_exporter)
+
+    # Startup: event-loop lag sampling for /metrics
+    lag_task = None
+    if settings.METRICS_ENABLED:
+        lag_task = asyncio.create_task(metrics.event_loop_lag_monitor())
+
+    # Startup: background writer for buffered analytics / audit events
+    ingest_task = asyncio.create_task(event_ingest.drain_loop(deps.store))
+
+    # Startup: offline item-item similarity artifact ("also tried")
+    if item_neighbors.load(settings.ITEM_SIMILARITY_PATH):
+        print(f"Item similarity loaded from {settings.ITEM_SIMILARITY_PATH}")
+
+    # Startup: off-peak try-on cache warmer
+    warmer_task = None
+    if settings.TRYON_WARMER_ENABLED:
+        warmer_task = asyncio.create_task(warmer_loop(deps.store))
+        print(
+            f"Try-on warmer enabled ({settings.TRYON_WARMER_START_HOUR}:00-"
+            f"{settings.TRYON_WARMER_END_HOUR}:00 UTC, budget {settings.TRYON_WARMER_BUDGET}/window)"
+        )
+
     yield
 
-    # Shutdown: disconnect MongoDB and Redis
+    # Shutdown: stop background tasks, disconnect MongoDB and Redis
+    if warmer_task:
+        warmer_task.cancel()
+    if lag_task:
+        lag_task.cancel()
+    ingest_task.cancel()
+    await event_ingest.flush(deps.store)
+    if trace_exporter:
+        set_exporter(None)
+        trace_exporter.close()
     await close_db()
     await close_redis()
     print("Server shutting down")
@@ -80,6 +155,12 @@ app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 # Security headers middleware
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Per-request tracing (Server-Timing header for admins / DEBUG)
+app.add_middleware(TracingMiddleware)
+
+# Opt-in per-request profiling (header from admins, or config-enabled sampling)
+app.add_middleware(ProfilingMiddleware)
+
 # CORS middleware — use configured ALLOWED_ORIGINS
 _allowed_origins = [o.strip() for o in settings.ALLOWED_ORIGINS.split(",") if o.strip()]
 app.add_middleware(
@@ -97,6 +178,13 @@ app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads"
 app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("metrics disabled\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health", tags=["Health"])
 async def health_check():
     from app.core.db import get_db
@@ -26,6 +26,7 @@ class TopModel(BaseModel):
 
 class DashboardSummary(BaseModel):
     """Full dashboard analytics summary for a retailer."""
+    version: str = "0"  # aggregate version; changes when the underlying data does
     total_tryons: int = 0
     total_products: int = 0
     total_models: int = 0
@@ -52,8 +53,8 @@ class ProductAnalytics(BaseModel):
 
 class AnalyticsEvent(BaseModel):
     """Schema for tracking analytics events."""
-    event_type: str = Field(..., description="tryon_generated | product_viewed | product_favorited | style_variation")
-    user_id: str
+    event_type: str = Field(..., description="tryon_generated | product_viewed | product_favorited | cart_added | wishlist_added | style_variation")
+    user_id: Optional[str] = None
     product_id: Optional[str] = None
     metadata: Optional[dict] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -16,6 +16,30 @@ class SizeRecommendation(BaseModel):
     all_sizes: list[dict] = Field(default_factory=list, description="All sizes with scores")
 
 
+class BulkSizeRequest(BaseModel):
+    """
+    Schema for bulk size recommendations: explicit product IDs, or (when
+    product_ids is empty) the same filters as the product list endpoint.
+    """
+    product_ids: list[str] = Field(default_factory=list, max_length=100)
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    search: Optional[str] = None
+    price_min: Optional[float] = Field(None, ge=0)
+    price_max: Optional[float] = Field(None, ge=0)
+    sort_by: str = Field("created_at", pattern="^(created_at|price|name)$")
+    sort_order: str = Field("desc", pattern="^(asc|desc)$")
+    page: int = Field(1, ge=1)
+    limit: int = Field(20, ge=1, le=100)
+
+
+class BulkSizeRecommendation(BaseModel):
+    """Schema for bulk size recommendation response."""
+    recommendations: dict[str, SizeRecommendation] = Field(
+        default_factory=dict, description="Size recommendation per product ID"
+    )
+
+
 class StyleRecommendation(BaseModel):
     """Schema for style recommendation response."""
     products: list[dict] = Field(default_factory=list, description="Recommended products")
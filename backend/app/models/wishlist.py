@@ -37,3 +37,8 @@ class WishlistResponse(BaseModel):
     """Schema for the full wishlist response."""
     items: list[WishlistItemResponse] = Field(default_factory=list)
     total: int = 0
+
+
+class WishlistContainsResponse(BaseModel):
+    """Schema for bulk wishlist membership checks."""
+    contains: dict[str, bool] = Field(default_factory=dict, description="Product ID -> in wishlist")
@@ -0,0 +1,379 @@
+"""
+Columnar Try-On Session Store for FitView AI analytics.
+Phase 5: Retailer Analytics Dashboard.
+
+Holds tryon_sessions as NumPy columns so analytics filters and group-bys are
+vectorized single passes instead of repeated loops over lists of dicts:
+
+- product / model / provider: dictionary-encoded int32 codes
+- created_at: datetime64[us] (UTC)
+- is_favorite: bool
+- processing_ms: int64
+
+Retailer scoping is a lookup-table mask over product codes, so no retailer
+column is needed. Columns grow by doubling; rows are appended as sessions
+are created (TRYON_CREATED), favorites are flipped in place, and a deleted
+account's rows are compacted out (USER_DELETED).
+
+Per-product reads use a product -> rows index and a ring of the product's
+most recent rows, so they cost O(sessions of that product). Sessions with
+an unparseable created_at (NaT) are counted but never listed as recent.
+"""
+
+import asyncio
+import logging
+from collections import Counter, deque
+from datetime import date, datetime, timezone
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.core import events
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 1024
+_MISSING = ""
+RECENT_PER_PRODUCT = 10
+
+
+def _utc_iso(value: str) -> str:
+    """Normalize an ISO date/datetime string to a naive-UTC string NumPy can parse."""
+    if not value:
+        return "NaT"
+    if len(value) == 10:
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            return "NaT"
+    if value.endswith("+00:00"):
+        return value[:-6]
+    if value.endswith("Z"):
+        return value[:-1]
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return "NaT"
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat()
+
+
+def to_datetime64(value: str) -> np.datetime64:
+    """Parse an ISO date/datetime string to naive-UTC datetime64[us]."""
+    return np.datetime64(_utc_iso(value), "us")
+
+
+def range_bounds(
+    date_from: Optional[str], date_to: Optional[str]
+) -> tuple[Optional[np.datetime64], Optional[np.datetime64]]:
+    """
+    Convert API date filters to a half-open [lo, hi) datetime64 range.
+    A bare YYYY-MM-DD date_to includes the whole day. Raises ValueError for
+    a filter that is not an ISO date / datetime.
+    """
+    lo = _filter_bound(date_from) if date_from else None
+    hi = None
+    if date_to:
+        hi = _filter_bound(date_to)
+        if "T" not in date_to:
+            hi = hi + np.timedelta64(1, "D")
+        else:
+            hi = hi + np.timedelta64(1, "us")
+    return lo, hi
+
+
+def _filter_bound(value: str) -> np.datetime64:
+    bound = to_datetime64(value)
+    if np.isnat(bound):
+        raise ValueError(f"Invalid date filter: {value!r}")
+    return bound
+
+
+class _Dictionary:
+    """Value <-> int32 code mapping for a categorical column."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def encode(self, value: Optional[str]) -> int:
+        value = value or _MISSING
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        return self._codes.get(value)
+
+
+class SessionColumns:
+    """Append-only columnar copy of tryon_sessions."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._built = False
+        self._version = 0  # bumped on every load / write
+        self._reset(_INITIAL_CAPACITY)
+
+    def _reset(self, capacity: int) -> None:
+        self._n = 0
+        self.products = _Dictionary()
+        self.models = _Dictionary()
+        self.providers = _Dictionary()
+        self._product = np.empty(capacity, dtype=np.int32)
+        self._model = np.empty(capacity, dtype=np.int32)
+        self._provider = np.empty(capacity, dtype=np.int32)
+        self._created_at = np.empty(capacity, dtype="datetime64[us]")
+        self._is_favorite = np.empty(capacity, dtype=bool)
+        self._processing_ms = np.empty(capacity, dtype=np.int64)
+        self._row_of: dict[str, int] = {}
+        # Per-row display fields for recent-session listings
+        self._info: list[tuple[str, str, str, str, str]] = []
+        # product code -> rows (oldest first) / most recent rows
+        self._product_rows: dict[int, list[int]] = {}
+        self._recent: dict[int, deque] = {}
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def version(self) -> str:
+        """The "version" summarize() reports; changes on every load / write."""
+        return f"c{self._version}"
+
+    # ------------------------------------------------------------------
+    # Build / write path
+    # ------------------------------------------------------------------
+
+    def invalidate(self) -> None:
+        self._built = False
+
+    async def ensure_built(self, store: JsonStore) -> None:
+        if self._built:
+            return
+        async with self._lock:
+            if self._built:
+                return
+            sessions = await store.find_many("tryon_sessions", {})
+            self.load(sessions)
+            self._built = True
+            logger.info(f"Columnar session store built with {self._n} rows")
+
+    def load(self, sessions: Iterable[dict]) -> None:
+        """Replace the contents with `sessions` (bulk build)."""
+        sessions = list(sessions)
+        self._reset(max(_INITIAL_CAPACITY, len(sessions)))
+        n = len(sessions)
+        self._product[:n] = [self.products.encode(s.get("product_id")) for s in sessions]
+        self._model[:n] = [self.models.encode(s.get("model_id")) for s in sessions]
+        self._provider[:n] = [self.providers.encode(s.get("ai_provider", "unknown")) for s in sessions]
+        self._created_at[:n] = np.array(
+            [_utc_iso(s.get("created_at", "")) for s in sessions], dtype="datetime64[us]"
+        )
+        self._is_favorite[:n] = [bool(s.get("is_favorite")) for s in sessions]
+        self._processing_ms[:n] = [s.get("processing_time_ms") or 0 for s in sessions]
+        self._row_of = {s.get("_id"): i for i, s in enumerate(sessions)}
+        self._info = [_row_info(s) for s in sessions]
+        self._n = n
+        self._index_products()
+        self._version += 1
+
+    def _index_products(self) -> None:
+        """Group rows by product, each group ordered by created_at."""
+        n = self._n
+        product = self._product[:n]
+        created = self._created_at[:n]
+        order = np.lexsort((created, product))
+        bounds = np.flatnonzero(np.diff(product[order])) + 1
+        for group in np.split(order, bounds):
+            if not group.size:
+                continue
+            code = int(product[group[0]])
+            self._product_rows[code] = group.tolist()
+            # NaT sorts last; keep undated rows out of the recency ring
+            dated = group[~np.isnat(created[group])]
+            self._recent[code] = deque(dated[-RECENT_PER_PRODUCT:].tolist(), maxlen=RECENT_PER_PRODUCT)
+
+    def _grow(self) -> None:
+        capacity = len(self._product) * 2
+        for name in ("_product", "_model", "_provider", "_created_at", "_is_favorite", "_processing_ms"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self._n] = old[: self._n]
+            setattr(self, name, new)
+
+    def append(self, session: dict) -> None:
+        """Append a newly created session (no-op until built)."""
+        if not self._built:
+            return
+        if self._n == len(self._product):
+            self._grow()
+        i = self._n
+        code = self.products.encode(session.get("product_id"))
+        self._product[i] = code
+        self._model[i] = self.models.encode(session.get("model_id"))
+        self._provider[i] = self.providers.encode(session.get("ai_provider", "unknown"))
+        self._created_at[i] = to_datetime64(session.get("created_at", ""))
+        self._is_favorite[i] = bool(session.get("is_favorite"))
+        self._processing_ms[i] = session.get("processing_time_ms") or 0
+        self._row_of[session.get("_id")] = i
+        self._info.append(_row_info(session))
+        self._product_rows.setdefault(code, []).append(i)
+        if code not in self._recent:
+            self._recent[code] = deque(maxlen=RECENT_PER_PRODUCT)
+        if not np.isnat(self._created_at[i]):
+            self._recent[code].append(i)
+        self._n += 1
+        self._version += 1
+
+    def remove(self, session_ids: Iterable[str]) -> None:
+        """Drop the rows of deleted sessions, keeping the rest in order."""
+        if not self._built:
+            return
+        rows = [self._row_of[sid] for sid in session_ids if sid in self._row_of]
+        if not rows:
+            return
+        keep = np.ones(self._n, dtype=bool)
+        keep[rows] = False
+        n = int(keep.sum())
+        for name in ("_product", "_model", "_provider", "_created_at", "_is_favorite", "_processing_ms"):
+            column = getattr(self, name)
+            column[:n] = column[: self._n][keep]
+        self._info = [info for info, kept in zip(self._info, keep.tolist()) if kept]
+        self._row_of = {info[0]: i for i, info in enumerate(self._info)}
+        self._n = n
+        self._product_rows = {}
+        self._recent = {}
+        self._index_products()
+        self._version += 1
+
+    def set_favorite(self, session_id: str, is_favorite: bool) -> None:
+        row = self._row_of.get(session_id)
+        if row is not None:
+            self._is_favorite[row] = is_favorite
+            self._version += 1
+
+    # ------------------------------------------------------------------
+    # Vectorized reads
+    # ------------------------------------------------------------------
+
+    def mask(
+        self,
+        product_ids: Optional[Iterable[str]] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> np.ndarray:
+        """Boolean row mask for sessions of `product_ids` within the date range."""
+        n = self._n
+        if product_ids is None:
+            m = np.ones(n, dtype=bool)
+        else:
+            lut = np.zeros(len(self.products) + 1, dtype=bool)
+            codes = [c for c in (self.products.code(pid) for pid in product_ids) if c is not None]
+            lut[codes] = True
+            m = lut[self._product[:n]]
+
+        lo, hi = range_bounds(date_from, date_to)
+        created = self._created_at[:n]
+        if lo is not None:
+            m &= created >= lo
+        if hi is not None:
+            m &= created < hi
+        return m
+
+    @staticmethod
+    def _decode_counts(dictionary: _Dictionary, codes: np.ndarray) -> Counter:
+        counts = np.bincount(codes, minlength=len(dictionary))
+        nz = np.flatnonzero(counts)
+        return Counter({
+            dictionary.values[c]: int(counts[c])
+            for c in nz
+            if dictionary.values[c] != _MISSING
+        })
+
+    def product_rows(self, product_id: str) -> np.ndarray:
+        """Row indices of one product's sessions (index lookup, no scan)."""
+        code = self.products.code(product_id)
+        return np.asarray(self._product_rows.get(code, ()), dtype=np.int64)
+
+    def summarize(self, m: np.ndarray) -> dict:
+        """
+        Aggregate the selected rows (a boolean mask or row indices). Returns
+        the same shape as AnalyticsRollups.summarize so callers can use
+        either source.
+        """
+        n = self._n
+        product = self._product[:n][m]
+        favorite = self._is_favorite[:n][m]
+        processing = self._processing_ms[:n][m]
+        processing = processing[processing > 0]
+
+        days, day_counts = np.unique(
+            self._created_at[:n][m].astype("datetime64[D]"), return_counts=True
+        )
+        tryons_by_date = {
+            str(day): int(count) for day, count in zip(days, day_counts) if not np.isnat(day)
+        }
+
+        return {
+            "version": self.version,
+            "total_tryons": int(product.size),
+            "total_favorites": int(favorite.sum()),
+            "avg_processing_time_ms": float(processing.mean()) if processing.size else 0.0,
+            "tryons_by_date": tryons_by_date,
+            "products": self._decode_counts(self.products, product),
+            "product_favorites": self._decode_counts(self.products, product[favorite]),
+            "models": self._decode_counts(self.models, self._model[:n][m]),
+            "providers": self._decode_counts(self.providers, self._provider[:n][m]),
+        }
+
+    def recent(self, product_id: str) -> list[dict]:
+        """The product's most recent sessions, newest first, from its ring."""
+        code = self.products.code(product_id)
+        recent = []
+        for row in reversed(self._recent.get(code, ())):
+            session_id, user_id, model_name, status, created_at = self._info[row]
+            recent.append({
+                "session_id": session_id,
+                "user_id": user_id,
+                "model_name": model_name,
+                "status": status,
+                "is_favorite": bool(self._is_favorite[row]),
+                "created_at": created_at,
+            })
+        return recent
+
+
+def _row_info(session: dict) -> tuple[str, str, str, str, str]:
+    return (
+        session.get("_id"),
+        session.get("user_id"),
+        session.get("model_name", ""),
+        session.get("status", ""),
+        session.get("created_at", ""),
+    )
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+session_columns = SessionColumns()
+
+
+@events.subscribe(events.TRYON_CREATED)
+def _on_tryon_created(session: dict, **_) -> None:
+    session_columns.append(session)
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(sessions: list[dict], **_) -> None:
+    session_columns.remove(s.get("_id") for s in sessions)
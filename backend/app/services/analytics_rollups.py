@@ -0,0 +1,331 @@
+"""
+Incremental Analytics Rollups for FitView AI.
+Phase 5: Retailer Analytics Dashboard.
+
+Keeps per-retailer, per-day aggregates of try-on sessions (counts, favorites,
+processing-time sums, per-product / per-model / per-provider counters).
+The rollups are built once from the store and then updated as sessions are
+created (TRYON_CREATED) or favorited, and a deleted account's sessions are
+subtracted from their days (USER_DELETED), so dashboard reads cost
+O(days + products) instead of a scan over every session.
+
+Day keys are the YYYY-MM-DD prefix of created_at, so date ranges are
+resolved at day granularity. Sessions without created_at go to an UNDATED
+bucket that only the unbounded (no date_from / date_to) range includes.
+
+Merged range results are cached per (retailer_id, date_from, date_to). A
+write only evicts the cached ranges of that retailer that contain the
+written day, so repeated dashboard refreshes are dictionary lookups.
+"""
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Optional
+
+from app.core import events
+from app.core.metrics import record_cache
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = 1024
+UNDATED = ""
+
+
+class DayRollup:
+    """Aggregates for one retailer on one day."""
+
+    __slots__ = (
+        "version",
+        "tryons",
+        "favorites",
+        "processing_ms_total",
+        "processing_count",
+        "products",
+        "product_favorites",
+        "models",
+        "providers",
+    )
+
+    def __init__(self):
+        self.version = 0  # bumped on every write to this bucket
+        self.tryons = 0
+        self.favorites = 0
+        self.processing_ms_total = 0
+        self.processing_count = 0
+        self.products: Counter = Counter()
+        self.product_favorites: Counter = Counter()
+        self.models: Counter = Counter()
+        self.providers: Counter = Counter()
+
+
+class AnalyticsRollups:
+    """In-process rollup store keyed by retailer_id -> day -> DayRollup."""
+
+    def __init__(self):
+        self._retailers: dict[str, dict[str, DayRollup]] = {}
+        self._product_retailer: dict[str, Optional[str]] = {}
+        self._favorite_sessions: set[str] = set()
+        self._built = False
+        self._store: Optional[JsonStore] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        # (retailer_id, day_from, day_to) -> merged summary
+        self._query_cache: OrderedDict[tuple[str, str, str], dict] = OrderedDict()
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next read (e.g. after sessions are bulk-deleted)."""
+        self._built = False
+        self._query_cache.clear()
+
+    async def ensure_built(self, store: JsonStore) -> None:
+        """Build the rollups from the store if they are not current."""
+        if self._built:
+            return
+        async with self._lock:
+            if self._built:
+                return
+            self._store = store
+            products = await store.find_many("products", {})
+            sessions = await store.find_many("tryon_sessions", {})
+
+            self._retailers = {}
+            self._favorite_sessions = set()
+            self._query_cache.clear()
+            self._generation += 1
+            self._product_retailer = {p["_id"]: p.get("retailer_id") for p in products}
+            for session in sessions:
+                retailer_id = self._product_retailer.get(session.get("product_id", ""))
+                if retailer_id:
+                    self._add_session(retailer_id, session)
+            self._built = True
+            logger.info(f"Analytics rollups built from {len(sessions)} sessions")
+
+    async def _retailer_for(self, store: JsonStore, product_id: str) -> Optional[str]:
+        # Combined outfits ("id1,id2") are not attributed to a single product
+        if not product_id or "," in product_id:
+            return None
+        if product_id not in self._product_retailer:
+            product = await store.find_one("products", {"_id": product_id})
+            self._product_retailer[product_id] = product.get("retailer_id") if product else None
+        return self._product_retailer[product_id]
+
+    def _bucket(self, retailer_id: str, created_at: str) -> DayRollup:
+        """Return the day bucket for a write, evicting cached ranges that cover it."""
+        day = created_at[:10]
+        days = self._retailers.setdefault(retailer_id, {})
+        if day not in days:
+            days[day] = DayRollup()
+        bucket = days[day]
+        bucket.version += 1
+        if self._query_cache:
+            stale = [
+                key for key in self._query_cache
+                if key[0] == retailer_id and _in_range(day, key[1], key[2])
+            ]
+            for key in stale:
+                del self._query_cache[key]
+        return bucket
+
+    def _add_session(self, retailer_id: str, session: dict) -> None:
+        bucket = self._bucket(retailer_id, session.get("created_at", ""))
+        pid = session.get("product_id")
+        mid = session.get("model_id")
+
+        bucket.tryons += 1
+        bucket.products[pid] += 1
+        if mid:
+            bucket.models[mid] += 1
+        bucket.providers[session.get("ai_provider", "unknown")] += 1
+        if session.get("processing_time_ms"):
+            bucket.processing_ms_total += session["processing_time_ms"]
+            bucket.processing_count += 1
+        if session.get("is_favorite"):
+            bucket.favorites += 1
+            bucket.product_favorites[pid] += 1
+            self._favorite_sessions.add(session.get("_id"))
+
+    def _remove_session(self, retailer_id: str, session: dict) -> None:
+        bucket = self._bucket(retailer_id, session.get("created_at", ""))
+        pid = session.get("product_id")
+        mid = session.get("model_id")
+
+        bucket.tryons -= 1
+        _decrement(bucket.products, pid)
+        if mid:
+            _decrement(bucket.models, mid)
+        _decrement(bucket.providers, session.get("ai_provider", "unknown"))
+        if session.get("processing_time_ms"):
+            bucket.processing_ms_total -= session["processing_time_ms"]
+            bucket.processing_count -= 1
+        if session.get("_id") in self._favorite_sessions:
+            bucket.favorites -= 1
+            _decrement(bucket.product_favorites, pid)
+            self._favorite_sessions.discard(session.get("_id"))
+
+    # ------------------------------------------------------------------
+    # Write hooks (events, and favorite toggles from tryon_service)
+    # ------------------------------------------------------------------
+
+    async def record_session(self, session: dict) -> None:
+        """Fold a newly created try-on session into the rollups."""
+        if not self._built:
+            return  # the next build will pick it up from the store
+        retailer_id = await self._retailer_for(self._store, session.get("product_id", ""))
+        if retailer_id:
+            self._add_session(retailer_id, session)
+
+    def remove_sessions(self, sessions: list[dict]) -> None:
+        """Subtract deleted sessions from their day buckets."""
+        if not self._built:
+            return
+        for session in sessions:
+            # Only sessions whose retailer is known were ever counted
+            retailer_id = self._product_retailer.get(session.get("product_id", ""))
+            if retailer_id:
+                self._remove_session(retailer_id, session)
+
+    async def record_favorite(self, store: JsonStore, session: dict, is_favorite: bool) -> None:
+        """Apply a favorite toggle; repeated toggles to the same state are no-ops."""
+        if not self._built:
+            return
+        session_id = session.get("_id")
+        if (session_id in self._favorite_sessions) == is_favorite:
+            return
+        pid = session.get("product_id", "")
+        retailer_id = await self._retailer_for(store, pid)
+        if not retailer_id:
+            return
+        bucket = self._bucket(retailer_id, session.get("created_at", ""))
+
+        delta = 1 if is_favorite else -1
+        bucket.favorites += delta
+        bucket.product_favorites[pid] += delta
+        if is_favorite:
+            self._favorite_sessions.add(session_id)
+        else:
+            self._favorite_sessions.discard(session_id)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def range_version(
+        self,
+        retailer_id: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> str:
+        """
+        The "version" summarize() would report for the range, without merging
+        the buckets: a cached result's version, else a sum over bucket versions.
+        """
+        day_from = date_from[:10] if date_from else ""
+        day_to = date_to[:10] if date_to else ""
+        cached = self._query_cache.get((retailer_id, day_from, day_to))
+        if cached is not None:
+            return cached["version"]
+        version = sum(
+            bucket.version
+            for day, bucket in self._retailers.get(retailer_id, {}).items()
+            if _in_range(day, day_from, day_to)
+        )
+        return f"{self._generation}.{version}"
+
+    def summarize(
+        self,
+        retailer_id: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> dict:
+        """
+        Merge the day rollups of a retailer within [date_from, date_to].
+        Results are cached and shared between callers; treat them as read-only.
+        The "version" key changes whenever any bucket in the range is written.
+        """
+        day_from = date_from[:10] if date_from else ""
+        day_to = date_to[:10] if date_to else ""
+
+        key = (retailer_id, day_from, day_to)
+        cached = self._query_cache.get(key)
+        record_cache("analytics_query", cached is not None)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return cached
+
+        version = 0
+        total_tryons = 0
+        total_favorites = 0
+        processing_ms_total = 0
+        processing_count = 0
+        tryons_by_date: dict[str, int] = {}
+        products: Counter = Counter()
+        product_favorites: Counter = Counter()
+        models: Counter = Counter()
+        providers: Counter = Counter()
+
+        for day, bucket in sorted(self._retailers.get(retailer_id, {}).items()):
+            if not _in_range(day, day_from, day_to):
+                if day_to and day > day_to:
+                    break
+                continue
+            version += bucket.version
+            if not bucket.tryons:
+                continue
+            total_tryons += bucket.tryons
+            total_favorites += bucket.favorites
+            processing_ms_total += bucket.processing_ms_total
+            processing_count += bucket.processing_count
+            if day != UNDATED:
+                tryons_by_date[day] = bucket.tryons
+            products.update(bucket.products)
+            product_favorites.update(bucket.product_favorites)
+            models.update(bucket.models)
+            providers.update(bucket.providers)
+
+        result = {
+            "version": f"{self._generation}.{version}",
+            "total_tryons": total_tryons,
+            "total_favorites": total_favorites,
+            "avg_processing_time_ms": processing_ms_total / processing_count if processing_count else 0.0,
+            "tryons_by_date": tryons_by_date,
+            "products": products,
+            "product_favorites": product_favorites,
+            "models": models,
+            "providers": providers,
+        }
+        self._query_cache[key] = result
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return result
+
+
+def _in_range(day: str, day_from: str, day_to: str) -> bool:
+    """Whether a day bucket falls in a range; UNDATED only in the unbounded one."""
+    if day == UNDATED:
+        return not day_from and not day_to
+    return (not day_from or day >= day_from) and (not day_to or day <= day_to)
+
+
+def _decrement(counter: Counter, key) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+analytics_rollups = AnalyticsRollups()
+
+
+@events.subscribe(events.TRYON_CREATED)
+async def _on_tryon_created(session: dict, **_) -> None:
+    await analytics_rollups.record_session(session)
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(sessions: list[dict], **_) -> None:
+    analytics_rollups.remove_sessions(sessions)
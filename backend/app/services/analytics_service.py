@@ -4,22 +4,37 @@ Phase 5: Data aggregation, export, and event tracking.
 """
 
 import csv
+import hashlib
 import io
-from collections import Counter, defaultdict
+import json
+import zlib
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timezone
-from typing import Optional
-
+from html import escape
+from string import Template
+from typing import AsyncIterator, Optional
+
+from app.core import events
+from app.core.metrics import record_cache
+from app.services.analytics_columnar import session_columns
+from app.services.analytics_rollups import analytics_rollups
+from app.utils.event_ingest import event_ingest
 from app.utils.json_store import JsonStore
 
+CSV_CHUNK_ROWS = 500
 
-async def track_event(
-    store: JsonStore,
+
+def track_event(
     event_type: str,
-    user_id: str,
+    user_id: Optional[str],
     product_id: Optional[str] = None,
     metadata: Optional[dict] = None,
-) -> str:
-    """Track an analytics event. Called from other services."""
+) -> bool:
+    """
+    Track an analytics event. Called from other services.
+    The event is buffered and written in the background; returns False if
+    the buffer dropped it.
+    """
     doc = {
         "event_type": event_type,
         "user_id": user_id,
@@ -27,7 +42,7 @@ async def track_event(
         "metadata": metadata or {},
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
-    return await store.insert_one("analytics_events", doc)
+    return event_ingest.emit("analytics_events", doc)
 
 
 async def _get_retailer_product_ids(store: JsonStore, retailer_id: str) -> list[str]:
@@ -48,20 +63,19 @@ async def _get_retailer_models_map(store: JsonStore, retailer_id: str) -> dict[s
     return {m["_id"]: m for m in models}
 
 
-def _filter_sessions_by_date(
-    sessions: list[dict],
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-) -> list[dict]:
-    """Filter sessions by date range using ISO string comparison."""
-    filtered = sessions
+def _has_time(value: Optional[str]) -> bool:
+    return bool(value) and "T" in value
+
+
+def _date_range_query(date_from: Optional[str] = None, date_to: Optional[str] = None) -> dict:
+    """Store query for a created_at range using ISO string comparison."""
+    created_at: dict[str, str] = {}
     if date_from:
-        filtered = [s for s in filtered if s.get("created_at", "") >= date_from]
+        created_at["$gte"] = date_from
     if date_to:
         # date_to should be inclusive of the full day
-        date_to_end = date_to + "T23:59:59" if "T" not in date_to else date_to
-        filtered = [s for s in filtered if s.get("created_at", "") <= date_to_end]
-    return filtered
+        created_at["$lte"] = date_to + "T23:59:59" if "T" not in date_to else date_to
+    return {"created_at": created_at} if created_at else {}
 
 
 async def get_dashboard_summary(
@@ -77,6 +91,7 @@ async def get_dashboard_summary(
 
     if not product_ids:
         return {
+            "version": "0",
             "total_tryons": 0,
             "total_products": 0,
             "total_models": len(models_map),
@@ -89,56 +104,34 @@ async def get_dashboard_summary(
             "ai_provider_distribution": {},
         }
 
-    # Get all tryon sessions - we filter in Python since JsonStore doesn't support $in
-    all_sessions = await store.find_many("tryon_sessions", {})
-    retailer_sessions = [s for s in all_sessions if s.get("product_id") in product_ids]
-
-    # Apply date filtering
-    retailer_sessions = _filter_sessions_by_date(retailer_sessions, date_from, date_to)
-
-    total_tryons = len(retailer_sessions)
-    total_favorites = sum(1 for s in retailer_sessions if s.get("is_favorite"))
-
-    # Average processing time
-    processing_times = [s.get("processing_time_ms", 0) for s in retailer_sessions if s.get("processing_time_ms")]
-    avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0.0
+    if _has_time(date_from) or _has_time(date_to):
+        # Sub-day ranges: one vectorized pass over the columnar sessions
+        await session_columns.ensure_built(store)
+        agg = session_columns.summarize(session_columns.mask(product_ids, date_from, date_to))
+    else:
+        # Whole days: read precomputed per-day rollups
+        await analytics_rollups.ensure_built(store)
+        agg = analytics_rollups.summarize(retailer_id, date_from, date_to)
 
-    # Try-ons by date (YYYY-MM-DD)
-    tryons_by_date: dict[str, int] = defaultdict(int)
-    for s in retailer_sessions:
-        date_str = s.get("created_at", "")[:10]  # YYYY-MM-DD
-        if date_str:
-            tryons_by_date[date_str] += 1
+    total_tryons = agg["total_tryons"]
+    total_favorites = agg["total_favorites"]
+    avg_processing_time = agg["avg_processing_time_ms"]
+    tryons_by_date = agg["tryons_by_date"]
 
     # Top products
-    product_counter: Counter = Counter()
-    product_fav_counter: Counter = Counter()
-    for s in retailer_sessions:
-        pid = s.get("product_id")
-        if pid:
-            product_counter[pid] += 1
-            if s.get("is_favorite"):
-                product_fav_counter[pid] += 1
-
     top_products = []
-    for pid, count in product_counter.most_common(5):
+    for pid, count in agg["products"].most_common(5):
         product = products_map.get(pid, {})
         top_products.append({
             "product_id": pid,
             "name": product.get("name", "Unknown"),
             "tryon_count": count,
-            "favorite_count": product_fav_counter.get(pid, 0),
+            "favorite_count": agg["product_favorites"].get(pid, 0),
         })
 
     # Top models
-    model_counter: Counter = Counter()
-    for s in retailer_sessions:
-        mid = s.get("model_id")
-        if mid:
-            model_counter[mid] += 1
-
     top_models = []
-    for mid, count in model_counter.most_common(5):
+    for mid, count in agg["models"].most_common(5):
         model = models_map.get(mid, {})
         top_models.append({
             "model_id": mid,
@@ -148,29 +141,26 @@ async def get_dashboard_summary(
 
     # Category distribution
     category_dist: dict[str, int] = defaultdict(int)
-    for s in retailer_sessions:
-        pid = s.get("product_id")
+    for pid, count in agg["products"].items():
         product = products_map.get(pid, {})
         category = product.get("category", "Unknown")
-        category_dist[category] += 1
+        category_dist[category] += count
 
     # AI provider distribution
-    ai_dist: dict[str, int] = defaultdict(int)
-    for s in retailer_sessions:
-        provider = s.get("ai_provider", "unknown")
-        ai_dist[provider] += 1
+    ai_dist = dict(agg["providers"])
 
     return {
+        "version": agg["version"],
         "total_tryons": total_tryons,
         "total_products": len(products_map),
         "total_models": len(models_map),
         "total_favorites": total_favorites,
         "avg_processing_time_ms": round(avg_processing_time, 1),
-        "tryons_by_date": dict(sorted(tryons_by_date.items())),
+        "tryons_by_date": tryons_by_date,
         "top_products": top_products,
         "top_models": top_models,
         "category_distribution": dict(category_dist),
-        "ai_provider_distribution": dict(ai_dist),
+        "ai_provider_distribution": ai_dist,
     }
 
 
@@ -184,86 +174,57 @@ async def get_product_analytics(
     if not product or product.get("retailer_id") != retailer_id:
         return None
 
-    models_map = await _get_retailer_models_map(store, retailer_id)
-
-    all_sessions = await store.find_many("tryon_sessions", {})
-    product_sessions = [s for s in all_sessions if s.get("product_id") == product_id]
-
-    tryon_count = len(product_sessions)
-    favorite_count = sum(1 for s in product_sessions if s.get("is_favorite"))
-
-    processing_times = [s.get("processing_time_ms", 0) for s in product_sessions if s.get("processing_time_ms")]
-    avg_processing_time = sum(processing_times) / len(processing_times) if processing_times else 0.0
-
-    # Model preferences
-    model_counter: Counter = Counter()
-    for s in product_sessions:
-        mid = s.get("model_id")
-        if mid:
-            model_counter[mid] += 1
+    await session_columns.ensure_built(store)
+    agg = session_columns.summarize(session_columns.product_rows(product_id))
 
+    # Model preferences (only the top models are looked up)
     model_preferences = []
-    for mid, count in model_counter.most_common(5):
-        model = models_map.get(mid, {})
+    for mid, count in agg["models"].most_common(5):
+        model = await store.find_one("models", {"_id": mid, "retailer_id": retailer_id}) or {}
         model_preferences.append({
             "model_id": mid,
             "name": model.get("name", "Unknown"),
             "tryon_count": count,
         })
 
-    # Try-ons by date
-    tryons_by_date: dict[str, int] = defaultdict(int)
-    for s in product_sessions:
-        date_str = s.get("created_at", "")[:10]
-        if date_str:
-            tryons_by_date[date_str] += 1
-
-    # Recent try-ons (last 10)
-    sorted_sessions = sorted(product_sessions, key=lambda x: x.get("created_at", ""), reverse=True)
-    recent_tryons = [
-        {
-            "session_id": s.get("_id"),
-            "user_id": s.get("user_id"),
-            "model_name": s.get("model_name", ""),
-            "status": s.get("status", ""),
-            "is_favorite": s.get("is_favorite", False),
-            "created_at": s.get("created_at", ""),
-        }
-        for s in sorted_sessions[:10]
-    ]
-
     return {
         "product_id": product_id,
         "product_name": product.get("name", "Unknown"),
-        "tryon_count": tryon_count,
-        "favorite_count": favorite_count,
-        "avg_processing_time_ms": round(avg_processing_time, 1),
+        "tryon_count": agg["total_tryons"],
+        "favorite_count": agg["total_favorites"],
+        "avg_processing_time_ms": round(agg["avg_processing_time_ms"], 1),
         "model_preferences": model_preferences,
-        "tryons_by_date": dict(sorted(tryons_by_date.items())),
-        "recent_tryons": recent_tryons,
+        "tryons_by_date": agg["tryons_by_date"],
+        "recent_tryons": session_columns.recent(product_id),
     }
 
 
-async def export_analytics_csv(
+async def stream_analytics_csv(
     store: JsonStore,
     retailer_id: str,
     date_from: Optional[str] = None,
     date_to: Optional[str] = None,
-) -> bytes:
-    """Export analytics data as CSV bytes."""
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the analytics CSV in chunks of CSV_CHUNK_ROWS rows, walking the
+    retailer's sessions in date order. Memory stays bounded by one chunk
+    regardless of export size. With `compress`, chunks are gzip-encoded.
+    """
     products_map = await _get_retailer_products_map(store, retailer_id)
     models_map = await _get_retailer_models_map(store, retailer_id)
     product_ids = set(products_map.keys())
 
-    all_sessions = await store.find_many("tryon_sessions", {})
-    retailer_sessions = [s for s in all_sessions if s.get("product_id") in product_ids]
-    retailer_sessions = _filter_sessions_by_date(retailer_sessions, date_from, date_to)
+    gzipper = zlib.compressobj(wbits=31) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
 
-    # Sort by date
-    retailer_sessions.sort(key=lambda x: x.get("created_at", ""))
+    def flush() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return gzipper.compress(data) if gzipper else data
 
-    output = io.StringIO()
-    writer = csv.writer(output)
     writer.writerow([
         "Date",
         "Session ID",
@@ -276,7 +237,13 @@ async def export_analytics_csv(
         "Status",
     ])
 
-    for s in retailer_sessions:
+    rows = 0
+    sessions = store.iter_many(
+        "tryon_sessions", _date_range_query(date_from, date_to), sort_field="created_at", sort_order=1
+    )
+    async for s in sessions:
+        if s.get("product_id") not in product_ids:
+            continue
         product = products_map.get(s.get("product_id", ""), {})
         model = models_map.get(s.get("model_id", ""), {})
         writer.writerow([
@@ -290,99 +257,91 @@ async def export_analytics_csv(
             "Yes" if s.get("is_favorite") else "No",
             s.get("status", ""),
         ])
+        rows += 1
+        if rows % CSV_CHUNK_ROWS == 0:
+            chunk = flush()
+            if chunk:
+                yield chunk
 
-    return output.getvalue().encode("utf-8")
-
+    chunk = flush()
+    if gzipper:
+        chunk += gzipper.flush()
+    if chunk:
+        yield chunk
 
-async def export_analytics_report(
-    store: JsonStore,
-    retailer_id: str,
-    date_from: Optional[str] = None,
-    date_to: Optional[str] = None,
-) -> str:
-    """Export analytics as an HTML report."""
-    summary = await get_dashboard_summary(store, retailer_id, date_from, date_to)
 
-    date_range_text = "All Time"
-    if date_from and date_to:
-        date_range_text = f"{date_from} to {date_to}"
-    elif date_from:
-        date_range_text = f"From {date_from}"
-    elif date_to:
-        date_range_text = f"Until {date_to}"
+_ROW_CELL = '<td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">'
+_ROW_CELL_CENTER = '<td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;text-align:center;">'
 
-    # Build top products rows
-    product_rows = ""
-    for i, p in enumerate(summary["top_products"], 1):
-        product_rows += f"""
+_PRODUCT_ROW = Template(f"""
         <tr>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">{i}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">{p['name']}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;text-align:center;">{p['tryon_count']}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;text-align:center;">{p['favorite_count']}</td>
-        </tr>"""
-
-    model_rows = ""
-    for i, m in enumerate(summary["top_models"], 1):
-        model_rows += f"""
+            {_ROW_CELL}$rank</td>
+            {_ROW_CELL}$name</td>
+            {_ROW_CELL_CENTER}$tryon_count</td>
+            {_ROW_CELL_CENTER}$favorite_count</td>
+        </tr>""")
+
+_MODEL_ROW = Template(f"""
         <tr>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">{i}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">{m['name']}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;text-align:center;">{m['tryon_count']}</td>
-        </tr>"""
-
-    category_rows = ""
-    for cat, count in summary["category_distribution"].items():
-        category_rows += f"""
+            {_ROW_CELL}$rank</td>
+            {_ROW_CELL}$name</td>
+            {_ROW_CELL_CENTER}$tryon_count</td>
+        </tr>""")
+
+_CATEGORY_ROW = Template(f"""
         <tr>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;">{cat}</td>
-            <td style="padding:8px 12px;border-bottom:1px solid #e5e7eb;text-align:center;">{count}</td>
-        </tr>"""
+            {_ROW_CELL}$category</td>
+            {_ROW_CELL_CENTER}$count</td>
+        </tr>""")
+
+_EMPTY_ROW = Template(
+    '<tr><td colspan="$colspan" style="padding:12px;text-align:center;color:#9ca3af;">No data available</td></tr>'
+)
 
-    html = f"""<!DOCTYPE html>
+_REPORT_PAGE = Template("""<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>FitView AI - Analytics Report</title>
     <style>
-        body {{ font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 20px; background: #f9fafb; color: #111827; }}
-        .container {{ max-width: 800px; margin: 0 auto; }}
-        h1 {{ color: #4f46e5; margin-bottom: 4px; }}
-        .subtitle {{ color: #6b7280; margin-bottom: 24px; }}
-        .card {{ background: white; border-radius: 12px; padding: 24px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }}
-        .stats-grid {{ display: grid; grid-template-columns: repeat(2, 1fr); gap: 16px; }}
-        .stat {{ text-align: center; }}
-        .stat-value {{ font-size: 28px; font-weight: 700; color: #4f46e5; }}
-        .stat-label {{ font-size: 13px; color: #6b7280; margin-top: 4px; }}
-        table {{ width: 100%; border-collapse: collapse; }}
-        th {{ padding: 8px 12px; text-align: left; background: #f3f4f6; font-weight: 600; font-size: 13px; color: #374151; }}
-        h2 {{ font-size: 18px; margin-bottom: 12px; color: #1f2937; }}
-        .footer {{ text-align: center; color: #9ca3af; font-size: 12px; margin-top: 32px; }}
+        body { font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif; margin: 0; padding: 20px; background: #f9fafb; color: #111827; }
+        .container { max-width: 800px; margin: 0 auto; }
+        h1 { color: #4f46e5; margin-bottom: 4px; }
+        .subtitle { color: #6b7280; margin-bottom: 24px; }
+        .card { background: white; border-radius: 12px; padding: 24px; margin-bottom: 20px; box-shadow: 0 1px 3px rgba(0,0,0,0.1); }
+        .stats-grid { display: grid; grid-template-columns: repeat(2, 1fr); gap: 16px; }
+        .stat { text-align: center; }
+        .stat-value { font-size: 28px; font-weight: 700; color: #4f46e5; }
+        .stat-label { font-size: 13px; color: #6b7280; margin-top: 4px; }
+        table { width: 100%; border-collapse: collapse; }
+        th { padding: 8px 12px; text-align: left; background: #f3f4f6; font-weight: 600; font-size: 13px; color: #374151; }
+        h2 { font-size: 18px; margin-bottom: 12px; color: #1f2937; }
+        .footer { text-align: center; color: #9ca3af; font-size: 12px; margin-top: 32px; }
     </style>
 </head>
 <body>
     <div class="container">
         <h1>FitView AI Analytics Report</h1>
-        <p class="subtitle">Period: {date_range_text} | Generated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')}</p>
+        <p class="subtitle">Period: $date_range | Generated: $generated_at</p>
 
         <div class="card">
             <h2>Summary</h2>
             <div class="stats-grid">
                 <div class="stat">
-                    <div class="stat-value">{summary['total_tryons']}</div>
+                    <div class="stat-value">$total_tryons</div>
                     <div class="stat-label">Total Try-Ons</div>
                 </div>
                 <div class="stat">
-                    <div class="stat-value">{summary['total_products']}</div>
+                    <div class="stat-value">$total_products</div>
                     <div class="stat-label">Total Products</div>
                 </div>
                 <div class="stat">
-                    <div class="stat-value">{summary['total_favorites']}</div>
+                    <div class="stat-value">$total_favorites</div>
                     <div class="stat-label">Favorites</div>
                 </div>
                 <div class="stat">
-                    <div class="stat-value">{summary['avg_processing_time_ms']:.0f}ms</div>
+                    <div class="stat-value">${avg_processing_time_ms}ms</div>
                     <div class="stat-label">Avg Processing Time</div>
                 </div>
             </div>
@@ -392,7 +351,7 @@ async def export_analytics_report(
             <h2>Top Products</h2>
             <table>
                 <thead><tr><th>#</th><th>Product</th><th style="text-align:center;">Try-Ons</th><th style="text-align:center;">Favorites</th></tr></thead>
-                <tbody>{product_rows if product_rows else '<tr><td colspan="4" style="padding:12px;text-align:center;color:#9ca3af;">No data available</td></tr>'}</tbody>
+                <tbody>$product_rows</tbody>
             </table>
         </div>
 
@@ -400,7 +359,7 @@ async def export_analytics_report(
             <h2>Top Models</h2>
             <table>
                 <thead><tr><th>#</th><th>Model</th><th style="text-align:center;">Try-Ons</th></tr></thead>
-                <tbody>{model_rows if model_rows else '<tr><td colspan="3" style="padding:12px;text-align:center;color:#9ca3af;">No data available</td></tr>'}</tbody>
+                <tbody>$model_rows</tbody>
             </table>
         </div>
 
@@ -408,13 +367,128 @@ async def export_analytics_report(
             <h2>Category Distribution</h2>
             <table>
                 <thead><tr><th>Category</th><th style="text-align:center;">Try-Ons</th></tr></thead>
-                <tbody>{category_rows if category_rows else '<tr><td colspan="2" style="padding:12px;text-align:center;color:#9ca3af;">No data available</td></tr>'}</tbody>
+                <tbody>$category_rows</tbody>
             </table>
         </div>
 
         <p class="footer">FitView AI - AI for Bharat 2025 | Powered by Nano Banana &amp; Gemini Image</p>
     </div>
 </body>
-</html>"""
+</html>""")
+
+REPORT_CACHE_SIZE = 256
+
+# (retailer_id, date_from, date_to) -> (etag, rendered report)
+_report_cache: OrderedDict[tuple, tuple[str, bytes]] = OrderedDict()
+
+
+def _render_rows(template: Template, rows: list[dict], colspan: int) -> str:
+    if not rows:
+        return _EMPTY_ROW.substitute(colspan=colspan)
+    return "".join(template.substitute(row) for row in rows)
+
+
+def render_analytics_report(summary: dict, date_from: Optional[str] = None, date_to: Optional[str] = None) -> str:
+    """Render a dashboard summary into the HTML report."""
+    date_range_text = "All Time"
+    if date_from and date_to:
+        date_range_text = f"{date_from} to {date_to}"
+    elif date_from:
+        date_range_text = f"From {date_from}"
+    elif date_to:
+        date_range_text = f"Until {date_to}"
+
+    product_rows = [
+        {
+            "rank": i,
+            "name": escape(p["name"]),
+            "tryon_count": p["tryon_count"],
+            "favorite_count": p["favorite_count"],
+        }
+        for i, p in enumerate(summary["top_products"], 1)
+    ]
+    model_rows = [
+        {"rank": i, "name": escape(m["name"]), "tryon_count": m["tryon_count"]}
+        for i, m in enumerate(summary["top_models"], 1)
+    ]
+    category_rows = [
+        {"category": escape(str(cat)), "count": count}
+        for cat, count in summary["category_distribution"].items()
+    ]
 
-    return html
+    return _REPORT_PAGE.substitute(
+        date_range=escape(date_range_text),
+        generated_at=datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC"),
+        total_tryons=summary["total_tryons"],
+        total_products=summary["total_products"],
+        total_favorites=summary["total_favorites"],
+        avg_processing_time_ms=f"{summary['avg_processing_time_ms']:.0f}",
+        product_rows=_render_rows(_PRODUCT_ROW, product_rows, 4),
+        model_rows=_render_rows(_MODEL_ROW, model_rows, 3),
+        category_rows=_render_rows(_CATEGORY_ROW, category_rows, 2),
+    )
+
+
+# Bumped on product / model writes, which change report names and counts
+_catalog_version = 0
+
+
+@events.subscribe(events.CATALOG_CHANGED)
+@events.subscribe(events.MODEL_CHANGED)
+def _on_catalog_changed(**_) -> None:
+    global _catalog_version
+    _catalog_version += 1
+
+
+async def analytics_report_etag(
+    store: JsonStore,
+    retailer_id: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+) -> str:
+    """
+    ETag of the HTML report, from versions only: the aggregate version of
+    the range (the same source get_dashboard_summary reads) and the catalog
+    version. Cheap enough to answer a conditional GET without building the
+    summary.
+    """
+    if _has_time(date_from) or _has_time(date_to):
+        await session_columns.ensure_built(store)
+        aggregate_version = session_columns.version
+    else:
+        await analytics_rollups.ensure_built(store)
+        aggregate_version = analytics_rollups.range_version(retailer_id, date_from, date_to)
+    key = json.dumps([retailer_id, date_from, date_to, aggregate_version, _catalog_version])
+    return f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]}"'
+
+
+async def export_analytics_report(
+    store: JsonStore,
+    retailer_id: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    etag: Optional[str] = None,
+) -> tuple[str, bytes]:
+    """
+    Export analytics as an HTML report. Returns (etag, html bytes).
+
+    Pass `etag` when it was already computed by analytics_report_etag.
+    Unchanged reports are served from the render cache without building
+    the summary.
+    """
+    if etag is None:
+        etag = await analytics_report_etag(store, retailer_id, date_from, date_to)
+
+    key = (retailer_id, date_from, date_to)
+    cached = _report_cache.get(key)
+    record_cache("analytics_report", cached is not None and cached[0] == etag)
+    if cached is not None and cached[0] == etag:
+        _report_cache.move_to_end(key)
+        return cached
+
+    summary = await get_dashboard_summary(store, retailer_id, date_from, date_to)
+    html = render_analytics_report(summary, date_from, date_to).encode("utf-8")
+    _report_cache[key] = (etag, html)
+    if len(_report_cache) > REPORT_CACHE_SIZE:
+        _report_cache.popitem(last=False)
+    return etag, html
@@ -4,65 +4,149 @@ Phase 4: Intelligence Layer.
 
 Manages shopping cart operations using the JsonStore.
 Cart is stored as a single document per user with an items array.
+
+Reads are served from a denormalized per-user cart view (items with product
+name, price, image and latest try-on URL). Mutations update the cached view
+in place instead of re-enriching the whole cart; product changes and new
+try-ons drop the affected views so they are rebuilt on the next read.
 """
 
 import logging
+from collections import OrderedDict
 from datetime import datetime, timezone
 from typing import Optional
 
+from app.core import events
 from app.models.cart import CartItemResponse, CartResponse
+from app.services.analytics_service import track_event
+from app.services.product_stats import product_stats
 from app.utils.json_store import JsonStore
 
 logger = logging.getLogger(__name__)
 
 CARTS_COLLECTION = "carts"
+CART_VIEW_CACHE_SIZE = 5000
+
+# Denormalized cart read model: user_id -> enriched cart response
+_cart_views: OrderedDict[str, CartResponse] = OrderedDict()
 
 
 async def get_cart(store: JsonStore, user_id: str) -> CartResponse:
     """Get the user's cart with enriched product details."""
+    view = _cart_views.get(user_id)
+    if view is None:
+        view = await _build_cart_view(store, user_id)
+        _cart_views[user_id] = view
+        if len(_cart_views) > CART_VIEW_CACHE_SIZE:
+            _cart_views.popitem(last=False)
+    else:
+        _cart_views.move_to_end(user_id)
+    return view.model_copy(deep=True)
+
+
+async def _build_cart_view(store: JsonStore, user_id: str) -> CartResponse:
+    """Enrich the stored cart with product details and try-on images."""
     cart = await store.find_one(CARTS_COLLECTION, {"user_id": user_id})
     if not cart:
         return CartResponse(items=[], total_items=0, total_price=0)
 
     items = cart.get("items", [])
     enriched_items: list[CartItemResponse] = []
-    total_price = 0.0
+
+    # Fetch all referenced products and try-on sessions up front
+    product_ids = [item["product_id"] for item in items]
+    products = await store.find_by_ids("products", product_ids, {"is_deleted": False})
+    tryon_sessions = await store.find_many(
+        "tryon_sessions",
+        {"user_id": user_id, "product_id": {"$in": set(product_ids)}},
+        sort_field="created_at",
+        sort_order=-1,
+    )
+    tryon_by_product: dict[str, dict] = {}
+    for session in tryon_sessions:
+        tryon_by_product.setdefault(session["product_id"], session)
 
     for item in items:
-        product = await store.find_one("products", {"_id": item["product_id"], "is_deleted": False})
-        product_name = product.get("name", "Unknown Product") if product else "Unknown Product"
-        product_price = product.get("price", 0) if product else 0
-        product_images = product.get("images", []) if product else []
-        product_image = product_images[0] if product_images else ""
-
-        # Check for try-on image
-        tryon_image_url = ""
-        tryon_session = await store.find_one(
-            "tryon_sessions",
-            {"user_id": user_id, "product_id": item["product_id"]},
-        )
-        if tryon_session:
-            tryon_image_url = tryon_session.get("result_url", "")
-
-        item_total = product_price * item.get("quantity", 1)
-        total_price += item_total
-
-        enriched_items.append(CartItemResponse(
-            product_id=item["product_id"],
-            size=item.get("size", ""),
-            quantity=item.get("quantity", 1),
-            added_at=item.get("added_at", ""),
-            product_name=product_name,
-            product_price=product_price,
-            product_image=product_image,
-            tryon_image_url=tryon_image_url,
-        ))
-
-    return CartResponse(
-        items=enriched_items,
-        total_items=sum(i.quantity for i in enriched_items),
-        total_price=round(total_price, 2),
+        # Latest try-on image for this product
+        tryon_session = tryon_by_product.get(item["product_id"])
+        tryon_image_url = tryon_session.get("result_url", "") if tryon_session else ""
+        enriched_items.append(_enrich_item(item, products.get(item["product_id"]), tryon_image_url))
+
+    view = CartResponse(items=enriched_items)
+    _update_totals(view)
+    return view
+
+
+def _enrich_item(item: dict, product: Optional[dict], tryon_image_url: str) -> CartItemResponse:
+    product_images = product.get("images", []) if product else []
+    return CartItemResponse(
+        product_id=item["product_id"],
+        size=item.get("size", ""),
+        quantity=item.get("quantity", 1),
+        added_at=item.get("added_at", ""),
+        product_name=product.get("name", "Unknown Product") if product else "Unknown Product",
+        product_price=product.get("price", 0) if product else 0,
+        product_image=product_images[0] if product_images else "",
+        tryon_image_url=tryon_image_url,
+    )
+
+
+def _update_totals(view: CartResponse) -> None:
+    view.total_items = sum(i.quantity for i in view.items)
+    view.total_price = round(sum(i.product_price * i.quantity for i in view.items), 2)
+
+
+async def _latest_tryon_url(store: JsonStore, user_id: str, product_id: str, view: CartResponse) -> str:
+    """Try-on image for a product joining the cart, reusing the view's when present."""
+    for existing in view.items:
+        if existing.product_id == product_id:
+            return existing.tryon_image_url
+    sessions = await store.find_many(
+        "tryon_sessions",
+        {"user_id": user_id, "product_id": product_id},
+        sort_field="created_at",
+        sort_order=-1,
+        limit=1,
     )
+    return sessions[0].get("result_url", "") if sessions else ""
+
+
+async def _add_item(
+    store: JsonStore,
+    user_id: str,
+    product_id: str,
+    size: str,
+    quantity: int,
+    now: str,
+) -> bool:
+    """
+    Atomically add quantity to the cart line for (product, size), appending
+    the line if the cart has none. Returns True if an existing line was
+    incremented.
+    """
+    line = {"$elemMatch": {"product_id": product_id, "size": size}}
+    item = {"product_id": product_id, "size": size, "quantity": quantity, "added_at": now}
+
+    # Retry if a concurrent request adds the same line between the two updates
+    for _ in range(3):
+        if await store.update_one(
+            CARTS_COLLECTION,
+            {"user_id": user_id, "items": line},
+            {"$inc": {"items.$.quantity": quantity}, "$set": {"items.$.added_at": now, "updated_at": now}},
+        ):
+            return True
+        if await store.update_one(
+            CARTS_COLLECTION,
+            {"user_id": user_id, "items": {"$not": line}},
+            {"$push": {"items": item}, "$set": {"updated_at": now}},
+        ):
+            return False
+        if not await store.find_one(CARTS_COLLECTION, {"user_id": user_id}):
+            await store.insert_one(
+                CARTS_COLLECTION, {"user_id": user_id, "items": [item], "updated_at": now}
+            )
+            return False
+    raise CartServiceError("Cart is being updated concurrently, please retry")
 
 
 async def add_to_cart(
@@ -92,47 +176,30 @@ async def add_to_cart(
 
     now = datetime.now(timezone.utc).isoformat()
 
-    cart = await store.find_one(CARTS_COLLECTION, {"user_id": user_id})
-    if not cart:
-        # Create new cart
-        cart_doc = {
-            "user_id": user_id,
-            "items": [{
-                "product_id": product_id,
-                "size": size,
-                "quantity": quantity,
-                "added_at": now,
-            }],
-            "updated_at": now,
-        }
-        await store.insert_one(CARTS_COLLECTION, cart_doc)
-    else:
-        items = cart.get("items", [])
-        # Check if item already exists (same product + size)
-        existing_idx = None
-        for i, item in enumerate(items):
-            if item["product_id"] == product_id and item.get("size") == size:
-                existing_idx = i
-                break
-
-        if existing_idx is not None:
-            items[existing_idx]["quantity"] += quantity
-            items[existing_idx]["added_at"] = now
-        else:
-            items.append({
-                "product_id": product_id,
-                "size": size,
-                "quantity": quantity,
-                "added_at": now,
-            })
-
-        await store.update_one(
-            CARTS_COLLECTION,
-            {"user_id": user_id},
-            {"$set": {"items": items, "updated_at": now}},
-        )
+    merged = await _add_item(store, user_id, product_id, size, quantity, now)
 
-    return await get_cart(store, user_id)
+    product_stats.record_cart_change(product_id, size, quantity)
+    track_event("cart_added", user_id, product_id, {"size": size, "quantity": quantity})
+
+    view = _cart_views.get(user_id)
+    if view is None:
+        return await get_cart(store, user_id)
+    existing = next(
+        (i for i in view.items if i.product_id == product_id and i.size == size), None
+    )
+    if merged and existing is not None:
+        existing.quantity += quantity
+        existing.added_at = now
+    elif merged or existing is not None:
+        # The view missed a concurrent write; rebuild it from the store
+        _cart_views.pop(user_id, None)
+        return await get_cart(store, user_id)
+    else:
+        tryon_image_url = await _latest_tryon_url(store, user_id, product_id, view)
+        item = {"product_id": product_id, "size": size, "quantity": quantity, "added_at": now}
+        view.items.append(_enrich_item(item, product, tryon_image_url))
+    _update_totals(view)
+    return view.model_copy(deep=True)
 
 
 async def update_cart_item(
@@ -143,32 +210,44 @@ async def update_cart_item(
     quantity: Optional[int] = None,
 ) -> CartResponse:
     """Update a cart item's size or quantity."""
-    cart = await store.find_one(CARTS_COLLECTION, {"user_id": user_id})
-    if not cart:
-        raise CartServiceError("Cart not found")
-
-    items = cart.get("items", [])
-    found = False
-    for item in items:
-        if item["product_id"] == product_id:
-            if size is not None:
-                item["size"] = size
-            if quantity is not None:
-                item["quantity"] = quantity
-            found = True
-            break
-
-    if not found:
-        raise CartServiceError("Item not found in cart")
-
     now = datetime.now(timezone.utc).isoformat()
-    await store.update_one(
+    changes: dict = {"updated_at": now}
+    if size is not None:
+        changes["items.$.size"] = size
+    if quantity is not None:
+        changes["items.$.quantity"] = quantity
+
+    before = await store.find_one_and_update(
         CARTS_COLLECTION,
-        {"user_id": user_id},
-        {"$set": {"items": items, "updated_at": now}},
+        {"user_id": user_id, "items": {"$elemMatch": {"product_id": product_id}}},
+        {"$set": changes},
+        return_document="before",
+    )
+    if not before:
+        await _raise_missing(store, user_id)
+
+    # The positional update changed the first line of this product
+    old = next(i for i in before["items"] if i.get("product_id") == product_id)
+    old_size, old_quantity = old.get("size", ""), old.get("quantity", 1)
+    product_stats.record_cart_change(product_id, old_size, -old_quantity)
+    product_stats.record_cart_change(
+        product_id,
+        old_size if size is None else size,
+        old_quantity if quantity is None else quantity,
     )
 
-    return await get_cart(store, user_id)
+    view = _cart_views.get(user_id)
+    if view is None:
+        return await get_cart(store, user_id)
+    for existing in view.items:
+        if existing.product_id == product_id:
+            if size is not None:
+                existing.size = size
+            if quantity is not None:
+                existing.quantity = quantity
+            break
+    _update_totals(view)
+    return view.model_copy(deep=True)
 
 
 async def remove_from_cart(
@@ -177,37 +256,76 @@ async def remove_from_cart(
     product_id: str,
 ) -> CartResponse:
     """Remove an item from the cart."""
-    cart = await store.find_one(CARTS_COLLECTION, {"user_id": user_id})
-    if not cart:
-        raise CartServiceError("Cart not found")
-
-    items = cart.get("items", [])
-    new_items = [item for item in items if item["product_id"] != product_id]
-
-    if len(new_items) == len(items):
-        raise CartServiceError("Item not found in cart")
-
     now = datetime.now(timezone.utc).isoformat()
-    await store.update_one(
+    before = await store.find_one_and_update(
         CARTS_COLLECTION,
-        {"user_id": user_id},
-        {"$set": {"items": new_items, "updated_at": now}},
+        {"user_id": user_id, "items": {"$elemMatch": {"product_id": product_id}}},
+        {"$pull": {"items": {"product_id": product_id}}, "$set": {"updated_at": now}},
+        return_document="before",
     )
+    if not before:
+        await _raise_missing(store, user_id)
+    product_stats.record_cart_lines(
+        [i for i in before["items"] if i.get("product_id") == product_id], sign=-1
+    )
+
+    view = _cart_views.get(user_id)
+    if view is None:
+        return await get_cart(store, user_id)
+    view.items = [i for i in view.items if i.product_id != product_id]
+    _update_totals(view)
+    return view.model_copy(deep=True)
 
-    return await get_cart(store, user_id)
+
+async def _raise_missing(store: JsonStore, user_id: str) -> None:
+    """Raise the right error after an item update matched nothing."""
+    if not await store.find_one(CARTS_COLLECTION, {"user_id": user_id}):
+        raise CartServiceError("Cart not found")
+    raise CartServiceError("Item not found in cart")
 
 
 async def clear_cart(store: JsonStore, user_id: str) -> CartResponse:
     """Clear all items from the cart."""
     now = datetime.now(timezone.utc).isoformat()
-    await store.update_one(
+    before = await store.find_one_and_update(
         CARTS_COLLECTION,
         {"user_id": user_id},
         {"$set": {"items": [], "updated_at": now}},
+        return_document="before",
     )
+    if before:
+        product_stats.record_cart_lines(before.get("items", []), sign=-1)
+    _cart_views[user_id] = CartResponse(items=[], total_items=0, total_price=0)
     return CartResponse(items=[], total_items=0, total_price=0)
 
 
+# -------------------------------------------------------------------
+# Read model invalidation (internal event bus)
+# -------------------------------------------------------------------
+
+@events.subscribe(events.CATALOG_CHANGED)
+def _on_catalog_changed(product_id: str) -> None:
+    """Drop views showing the changed product; they are rebuilt on next read."""
+    stale = [
+        user_id for user_id, view in _cart_views.items()
+        if any(i.product_id == product_id for i in view.items)
+    ]
+    for user_id in stale:
+        del _cart_views[user_id]
+
+
+@events.subscribe(events.TRYON_CREATED)
+def _on_tryon_created(user_id: str, product_id: str, **_) -> None:
+    view = _cart_views.get(user_id)
+    if view is not None and any(i.product_id == product_id for i in view.items):
+        del _cart_views[user_id]
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(user_id: str, **_) -> None:
+    _cart_views.pop(user_id, None)
+
+
 class CartServiceError(Exception):
     """Custom exception for cart service errors."""
     pass
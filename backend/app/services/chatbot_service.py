@@ -1,15 +1,20 @@
 """
 Chatbot service using AWS Bedrock (Claude 3.5 Haiku).
-Manages conversation sessions in Redis with product context.
+Manages conversation sessions in Redis (with an in-memory fallback) with product context.
 """
+import asyncio
 import json
 import logging
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Any, Optional
 
+from app.core import events
 from app.models.chatbot import ChatMessage, MessageRole
 from app.utils.bedrock_client import bedrock_chat_client, BedrockError
+from app.utils.product_index import ProductIndex
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -18,34 +23,23 @@ logger = logging.getLogger(__name__)
 CHAT_SESSION_TTL = 86400
 MAX_HISTORY_MESSAGES = 20
 
+# In-memory fallback for chat history when Redis is unavailable (LRU by session)
+_memory_history: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+MAX_MEMORY_SESSIONS = 1000
 
-def _build_system_prompt(user: dict, context: dict) -> str:
-    """Build a context-aware system prompt for the chatbot."""
-    cart_items = context.get("cart_items", [])
-    recent_tryons = context.get("recent_tryons", [])
-    top_products = context.get("top_products", [])
-
-    cart_text = ""
-    if cart_items:
-        items = [f"- {item.get('name', 'item')} (size {item.get('size', '?')})" for item in cart_items[:5]]
-        cart_text = f"\nUser's cart:\n" + "\n".join(items)
-
-    tryon_text = ""
-    if recent_tryons:
-        items = [f"- {t.get('product_name', 'item')}" for t in recent_tryons[:3]]
-        tryon_text = f"\nRecent try-ons:\n" + "\n".join(items)
 
-    product_text = ""
-    if top_products:
-        items = [f"- {p.get('name', '')} ({p.get('category', '')}, \u20b9{p.get('price', 0)})" for p in top_products[:10]]
-        product_text = f"\nAvailable products (sample):\n" + "\n".join(items)
+# Catalog caches, dropped on product writes: the "available products" block
+# (a full products sort to rebuild) and the TF-IDF index used to pick products
+# relevant to each message. The version guards against a rebuild that raced
+# with an invalidation.
+_catalog_snippet: Optional[str] = None
+_product_index: Optional[ProductIndex] = None
+_catalog_version = 0
+CATALOG_SNIPPET_SIZE = 10
+RELEVANT_PRODUCTS_LIMIT = 5
+SUGGESTED_PRODUCTS_LIMIT = 3
 
-    return f"""You are FitView AI Assistant, an AI-powered fashion stylist and shopping guide for FitView — an Indian virtual try-on platform.
-
-User: {user.get('name', 'Customer')} (role: {user.get('role', 'customer')})
-{cart_text}
-{tryon_text}
-{product_text}
+_STATIC_PROMPT = """You are FitView AI Assistant, an AI-powered fashion stylist and shopping guide for FitView — an Indian virtual try-on platform.
 
 Your capabilities:
 - Help users find the right clothes for occasions (wedding, office, casual, party, festival)
@@ -65,106 +59,252 @@ Guidelines:
 """
 
 
-async def get_or_create_session(redis_client, session_id: Optional[str]) -> str:
-    """Get existing session or create new one."""
-    if session_id:
-        # Verify session exists
-        if redis_client:
-            exists = await redis_client.exists(f"chat:{session_id}:history")
-            if exists:
-                return session_id
-    return str(uuid.uuid4())
+@events.subscribe(events.CATALOG_CHANGED)
+def _on_catalog_changed(product_id: str) -> None:
+    """Drop the cached catalog block and product index after a product write."""
+    global _catalog_snippet, _product_index, _catalog_version
+    _catalog_snippet = None
+    _product_index = None
+    _catalog_version += 1
 
 
-async def get_session_history(redis_client, session_id: str) -> list[dict]:
-    """Get conversation history from Redis."""
-    if not redis_client:
-        return []
+def _format_products(products: list[dict], heading: str) -> str:
+    if not products:
+        return ""
+    items = [f"- {p.get('name', '')} ({p.get('category', '')}, \u20b9{p.get('price', 0)})" for p in products]
+    return f"\n{heading}:\n" + "\n".join(items)
+
+
+async def _get_catalog_snippet(store) -> str:
+    """Return the cached "available products" block, rebuilding it on a miss."""
+    global _catalog_snippet
+    if _catalog_snippet is not None:
+        return _catalog_snippet
+    version = _catalog_version
+    try:
+        products = await store.find_many(
+            "products",
+            {"is_deleted": False},
+            limit=CATALOG_SNIPPET_SIZE,
+            sort_field="created_at",
+            sort_order=-1,
+        )
+    except Exception:
+        return ""
+    snippet = _format_products(products, "Available products (sample)")
+    if version == _catalog_version:
+        _catalog_snippet = snippet
+    return snippet
+
+
+async def _get_product_index(store) -> ProductIndex:
+    """Return the cached product index, building it from active products on a miss."""
+    global _product_index
+    if _product_index is not None:
+        return _product_index
+    version = _catalog_version
+    products = await store.find_many("products", {"is_deleted": False})
+    index = ProductIndex(products)
+    if version == _catalog_version:
+        _product_index = index
+    return index
+
+
+async def _get_relevant_products(store, message: str) -> list[dict]:
+    """Retrieve the products most relevant to the chat message."""
     try:
-        raw = await redis_client.lrange(f"chat:{session_id}:history", 0, -1)
-        return [json.loads(msg) for msg in raw]
+        index = await _get_product_index(store)
     except Exception as e:
-        logger.warning(f"Failed to get chat history: {e}")
+        logger.warning(f"Failed to build product index: {e}")
         return []
+    return index.search(message, limit=RELEVANT_PRODUCTS_LIMIT)
 
 
-async def append_message(redis_client, session_id: str, role: str, content: str):
-    """Append a message to the session history in Redis."""
-    if not redis_client:
-        return
-    key = f"chat:{session_id}:history"
-    msg = json.dumps({"role": role, "content": content, "timestamp": datetime.now(timezone.utc).isoformat()})
+def _build_user_prompt(user: dict, context: dict) -> str:
+    """Build the per-request part of the system prompt (profile, cart, try-ons, products)."""
+    cart_items = context.get("cart_items", [])
+    recent_tryons = context.get("recent_tryons", [])
+    relevant_products = context.get("relevant_products", [])
+
+    cart_text = ""
+    if cart_items:
+        items = [f"- {item.get('name', 'item')} (size {item.get('size', '?')})" for item in cart_items[:5]]
+        cart_text = f"\nUser's cart:\n" + "\n".join(items)
+
+    tryon_text = ""
+    if recent_tryons:
+        items = [f"- {t.get('product_name', 'item')}" for t in recent_tryons[:3]]
+        tryon_text = f"\nRecent try-ons:\n" + "\n".join(items)
+
+    # The newest-products block is part of the shared (cacheable) prefix
+    product_text = _format_products(relevant_products, "Products relevant to this message")
+
+    return f"""User: {user.get('name', 'Customer')} (role: {user.get('role', 'customer')})
+{cart_text}
+{tryon_text}
+{product_text}
+"""
+
+
+async def _get_cart_items(store, user_id: str) -> list[dict]:
     try:
-        await redis_client.rpush(key, msg)
-        # Keep only last MAX_HISTORY_MESSAGES
-        length = await redis_client.llen(key)
-        if length > MAX_HISTORY_MESSAGES * 2:  # *2 because user+assistant pairs
-            await redis_client.ltrim(key, -MAX_HISTORY_MESSAGES * 2, -1)
-        await redis_client.expire(key, CHAT_SESSION_TTL)
-    except Exception as e:
-        logger.warning(f"Failed to append chat message: {e}")
+        cart = await store.find_one("carts", {"user_id": user_id})
+    except Exception:
+        return []
+    return cart.get("items", [])[:5] if cart else []
+
+
+async def _get_recent_tryons(store, user_id: str) -> list[dict]:
+    try:
+        return await store.find_many(
+            "tryon_sessions",
+            {"user_id": user_id},
+            limit=3,
+            sort_field="created_at",
+            sort_order=-1,
+        )
+    except Exception:
+        return []
+
+
+def _history_key(session_id: str) -> str:
+    return f"chat:{session_id}:history"
+
+
+def _memory_get(session_id: str) -> Optional[list[dict]]:
+    entry = _memory_history.get(session_id)
+    if entry is None:
+        return None
+    if time.time() >= entry["expires_at"]:
+        del _memory_history[session_id]
+        return None
+    return list(entry["messages"])
+
+
+def _memory_append(session_id: str, messages: list[dict]) -> None:
+    existing = _memory_get(session_id) or []
+    _memory_history.pop(session_id, None)
+    _memory_history[session_id] = {
+        "messages": (existing + messages)[-MAX_HISTORY_MESSAGES * 2:],
+        "expires_at": time.time() + CHAT_SESSION_TTL,
+    }
+    while len(_memory_history) > MAX_MEMORY_SESSIONS:
+        _memory_history.popitem(last=False)
+
+
+async def _load_history(redis_client, session_id: str) -> Optional[list[dict]]:
+    """
+    Load a session's history with a single LRANGE.
+    Returns None when the session does not exist in Redis or the memory fallback.
+    """
+    if redis_client:
+        try:
+            raw = await redis_client.lrange(_history_key(session_id), 0, -1)
+            if raw:
+                return [json.loads(msg) for msg in raw]
+        except Exception as e:
+            logger.warning(f"Failed to get chat history from Redis, using memory fallback: {e}")
+    return _memory_get(session_id)
+
+
+async def load_or_create_session(
+    redis_client, session_id: Optional[str]
+) -> tuple[str, list[dict]]:
+    """
+    Resolve the session and return (session_id, history) in one read.
+    Unknown or expired session IDs get a fresh session with empty history.
+    """
+    if session_id:
+        history = await _load_history(redis_client, session_id)
+        if history is not None:
+            return session_id, history
+    return str(uuid.uuid4()), []
+
+
+async def get_session_history(redis_client, session_id: str) -> list[dict]:
+    """Get conversation history from Redis (or the in-memory fallback)."""
+    return await _load_history(redis_client, session_id) or []
+
+
+async def append_turn(
+    redis_client, session_id: str, user_message: str, assistant_message: str
+) -> None:
+    """
+    Append a user/assistant exchange to the session history.
+    RPUSH, LTRIM and EXPIRE go out as one MULTI/EXEC pipeline, so a turn costs a
+    single Redis round trip. Falls back to in-memory history if Redis is down.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    messages = [
+        {"role": "user", "content": user_message, "timestamp": now},
+        {"role": "assistant", "content": assistant_message, "timestamp": now},
+    ]
+    if redis_client:
+        key = _history_key(session_id)
+        try:
+            async with redis_client.pipeline(transaction=True) as pipe:
+                # Keep only last MAX_HISTORY_MESSAGES (*2 because user+assistant pairs)
+                await (
+                    pipe.rpush(key, *(json.dumps(m) for m in messages))
+                    .ltrim(key, -MAX_HISTORY_MESSAGES * 2, -1)
+                    .expire(key, CHAT_SESSION_TTL)
+                    .execute()
+                )
+            return
+        except Exception as e:
+            logger.warning(f"Failed to append chat turn to Redis, using memory fallback: {e}")
+    _memory_append(session_id, messages)
 
 
 async def send_message(
     message: str,
-    session_id: str,
+    session_id: Optional[str],
     user: dict,
     redis_client=None,
     store=None,
-) -> tuple[str, list[dict] | None]:
+) -> tuple[str, str, list[dict] | None]:
     """
     Send a user message and get AI response.
-    Returns (response_text, suggested_products_or_None).
+    The session (and its history) is resolved alongside the prompt context
+    queries; unknown or missing session IDs start a new session.
+    Returns (session_id, response_text, suggested_products_or_None).
     """
-    # Get conversation history
-    history = await get_session_history(redis_client, session_id)
+    user_id = user.get("_id", "")
+
+    cart_items: list[dict] = []
+    recent_tryons: list[dict] = []
+    relevant_products: list[dict] = []
+    catalog_snippet = ""
 
-    # Save user message
-    await append_message(redis_client, session_id, "user", message)
+    # Gather conversation history and prompt context concurrently
+    if store:
+        (session_id, history), cart_items, recent_tryons, relevant_products, catalog_snippet = await asyncio.gather(
+            load_or_create_session(redis_client, session_id),
+            _get_cart_items(store, user_id),
+            _get_recent_tryons(store, user_id),
+            _get_relevant_products(store, message),
+            _get_catalog_snippet(store),
+        )
+    else:
+        session_id, history = await load_or_create_session(redis_client, session_id)
 
     # Build messages list for Bedrock
     messages = [{"role": h["role"], "content": h["content"]} for h in history]
     messages.append({"role": "user", "content": message})
 
-    # Build context
-    context = {}
-    if store:
-        try:
-            cart = await store.find_one("carts", {"user_id": user.get("_id", "")})
-            if cart:
-                context["cart_items"] = cart.get("items", [])[:5]
-        except Exception:
-            pass
-        try:
-            tryons = await store.find_many(
-                "tryon_sessions",
-                {"user_id": user.get("_id", "")},
-                limit=3,
-                sort_field="created_at",
-                sort_order=-1,
-            )
-            context["recent_tryons"] = tryons
-        except Exception:
-            pass
-        try:
-            products = await store.find_many(
-                "products",
-                {"is_deleted": False},
-                limit=10,
-                sort_field="created_at",
-                sort_order=-1,
-            )
-            context["top_products"] = products
-        except Exception:
-            pass
-
-    system_prompt = _build_system_prompt(user, context)
+    context = {
+        "cart_items": cart_items,
+        "recent_tryons": recent_tryons,
+        "relevant_products": relevant_products,
+    }
 
     # Get AI response
     try:
         response_text = await bedrock_chat_client.chat(
             messages=messages,
-            system_prompt=system_prompt,
+            system_prompt=_build_user_prompt(user, context),
+            # Stable until the next CATALOG_CHANGED, so it can share a cache point
+            system_prefix=_STATIC_PROMPT + catalog_snippet,
             max_tokens=512,
         )
     except BedrockError as e:
@@ -175,35 +315,27 @@ async def send_message(
             "or browse our product catalog directly!"
         )
 
-    # Save assistant response
-    await append_message(redis_client, session_id, "assistant", response_text)
+    # Save the user message and assistant response in one round trip
+    await append_turn(redis_client, session_id, message, response_text)
 
     # Extract product suggestions if any
     suggested_products = None
-    if store and any(word in message.lower() for word in ["show", "find", "recommend", "suggest", "looking for"]):
-        try:
-            products = await store.find_many(
-                "products",
-                {"is_deleted": False},
-                limit=3,
-            )
-            if products:
-                suggested_products = [
-                    {"id": p["_id"], "name": p["name"], "price": p["price"], "category": p["category"]}
-                    for p in products
-                ]
-        except Exception:
-            pass
-
-    return response_text, suggested_products
+    if relevant_products and any(word in message.lower() for word in ["show", "find", "recommend", "suggest", "looking for"]):
+        suggested_products = [
+            {"id": p["_id"], "name": p["name"], "price": p["price"], "category": p["category"]}
+            for p in relevant_products[:SUGGESTED_PRODUCTS_LIMIT]
+        ]
+
+    return session_id, response_text, suggested_products
 
 
 async def clear_session(redis_client, session_id: str) -> bool:
     """Clear a chat session."""
+    cleared = _memory_history.pop(session_id, None) is not None
     if not redis_client:
-        return False
+        return cleared
     try:
-        await redis_client.delete(f"chat:{session_id}:history")
+        await redis_client.delete(_history_key(session_id))
         return True
     except Exception:
-        return False
+        return cleared
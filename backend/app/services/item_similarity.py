@@ -0,0 +1,178 @@
+"""
+Item-to-item collaborative filtering for FitView AI.
+Phase 4: Intelligence Layer.
+
+An offline job (scripts/build_item_similarity.py) turns the user x product
+interaction graph (try-ons, wishlists, carts) into cosine similarities over
+user sets, keeps the top-N neighbors per product, and saves them as a CSR
+style .npz artifact:
+
+    product_ids  str[n]      row -> product id
+    indptr       int32[n+1]  neighbors of row i are indptr[i]:indptr[i+1]
+    neighbors    int32[nnz]  neighbor rows, best first
+    scores       float32[nnz]
+
+The API loads the artifact once at startup; "also tried" lookups are a dict
+hit plus an array slice.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Users with more interactions than this contribute only their most recent
+# ones, bounding the quadratic pair count per user
+MAX_ITEMS_PER_USER = 200
+
+
+def collect_interactions(
+    sessions: Iterable[dict],
+    wishlists: Iterable[dict],
+    carts: Iterable[dict],
+) -> dict[str, list[str]]:
+    """
+    User id -> distinct product ids they tried, wishlisted or carted, oldest
+    first by their latest interaction (session created_at, wishlist and
+    cart item added_at).
+    """
+    by_user: dict[str, dict[str, str]] = defaultdict(dict)
+
+    def add(user_id: str, product_id: str, at: str) -> None:
+        items = by_user[user_id]
+        if product_id not in items or at > items[product_id]:
+            items[product_id] = at
+
+    for session in sessions:
+        pid = session.get("product_id", "")
+        if session.get("user_id") and pid and "," not in pid:
+            add(session["user_id"], pid, session.get("created_at", ""))
+    for item in wishlists:
+        if item.get("user_id") and item.get("product_id"):
+            add(item["user_id"], item["product_id"], item.get("added_at", ""))
+    for cart in carts:
+        for item in cart.get("items", []):
+            if cart.get("user_id") and item.get("product_id"):
+                add(cart["user_id"], item["product_id"], item.get("added_at", ""))
+    return {
+        user: sorted(items, key=items.__getitem__)
+        for user, items in by_user.items()
+    }
+
+
+def compute_similarity(
+    interactions: dict[str, list[str]],
+    top_n: int = 20,
+) -> dict[str, np.ndarray]:
+    """
+    Cosine similarity over user sets, |U_a & U_b| / sqrt(|U_a| * |U_b|),
+    keeping the top_n neighbors per product. Returns the artifact arrays.
+    """
+    product_ids = sorted({pid for items in interactions.values() for pid in items})
+    row_of = {pid: i for i, pid in enumerate(product_ids)}
+    users_per_product = np.zeros(len(product_ids), dtype=np.int64)
+    co_counts: list[dict[int, int]] = [defaultdict(int) for _ in product_ids]
+
+    for items in interactions.values():
+        # items are oldest first, so this keeps the most recent ones
+        rows = [row_of[pid] for pid in items[-MAX_ITEMS_PER_USER:]]
+        for a in rows:
+            users_per_product[a] += 1
+            counts = co_counts[a]
+            for b in rows:
+                if a != b:
+                    counts[b] += 1
+
+    indptr = [0]
+    neighbors: list[int] = []
+    scores: list[float] = []
+    for a, counts in enumerate(co_counts):
+        ranked = sorted(
+            ((co / math.sqrt(users_per_product[a] * users_per_product[b]), b) for b, co in counts.items()),
+            key=lambda sb: (-sb[0], sb[1]),
+        )[:top_n]
+        neighbors.extend(b for _, b in ranked)
+        scores.extend(s for s, _ in ranked)
+        indptr.append(len(neighbors))
+
+    return {
+        "product_ids": np.asarray(product_ids, dtype=str),
+        "indptr": np.asarray(indptr, dtype=np.int32),
+        "neighbors": np.asarray(neighbors, dtype=np.int32),
+        "scores": np.asarray(scores, dtype=np.float32),
+    }
+
+
+def save_artifact(path: str, arrays: dict[str, np.ndarray]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+
+
+class ItemNeighbors:
+    """Read side of the similarity artifact."""
+
+    def __init__(self):
+        self._product_ids: list[str] = []
+        self._row_of: dict[str, int] = {}
+        self._indptr = np.zeros(1, dtype=np.int32)
+        self._neighbors = np.empty(0, dtype=np.int32)
+        self._scores = np.empty(0, dtype=np.float32)
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._product_ids)
+
+    def load(self, path: str) -> bool:
+        """Load the artifact; returns False (and stays empty) if it is missing or invalid."""
+        try:
+            with np.load(path) as data:
+                self.set_arrays({key: data[key] for key in data.files})
+        except FileNotFoundError:
+            logger.info(f"No item similarity artifact at {path}; also-tried disabled")
+            return False
+        except (OSError, KeyError, ValueError) as e:
+            logger.error(f"Loading item similarity artifact failed: {e}")
+            return False
+        logger.info(f"Item similarity loaded: {len(self._product_ids)} products, {self._neighbors.size} pairs")
+        return True
+
+    def set_arrays(self, arrays: dict[str, np.ndarray]) -> None:
+        self._product_ids = [str(pid) for pid in arrays["product_ids"]]
+        self._row_of = {pid: i for i, pid in enumerate(self._product_ids)}
+        self._indptr = arrays["indptr"]
+        self._neighbors = arrays["neighbors"]
+        self._scores = arrays["scores"]
+
+    def similar(self, product_id: str, limit: Optional[int] = None) -> list[tuple[str, float]]:
+        """Nearest neighbors of a product as (product_id, score), best first."""
+        row = self._row_of.get(product_id)
+        if row is None:
+            return []
+        start, end = int(self._indptr[row]), int(self._indptr[row + 1])
+        if limit is not None:
+            end = min(end, start + limit)
+        return [
+            (self._product_ids[n], float(s))
+            for n, s in zip(self._neighbors[start:end], self._scores[start:end])
+        ]
+
+    def blend(self, product_ids: Iterable[str]) -> dict[str, float]:
+        """Summed neighbor similarity over a set of products (e.g. a user's try-ons)."""
+        totals: dict[str, float] = defaultdict(float)
+        for pid in product_ids:
+            for neighbor, score in self.similar(pid):
+                totals[neighbor] += score
+        return totals
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+item_neighbors = ItemNeighbors()
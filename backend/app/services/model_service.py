@@ -7,6 +7,7 @@ Handles CRUD operations for fashion models.
 from datetime import datetime, timezone
 from typing import Any, Optional
 
+from app.core import events
 from app.models.model import (
     ModelCreate,
     ModelListResponse,
@@ -39,6 +40,7 @@ async def create_model(
 
     inserted_id = await store.insert_one(MODEL_COLLECTION, model_dict)
     model_dict["_id"] = inserted_id
+    await events.publish(events.MODEL_CHANGED, model_id=inserted_id)
     return ModelResponse(**model_dict)
 
 
@@ -112,6 +114,7 @@ async def update_model(
     )
     if not result:
         return None
+    await events.publish(events.MODEL_CHANGED, model_id=model_id)
     return ModelResponse(**result)
 
 
@@ -130,6 +133,8 @@ async def delete_model(
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }},
     )
+    if modified:
+        await events.publish(events.MODEL_CHANGED, model_id=model_id)
     return modified > 0
 
 
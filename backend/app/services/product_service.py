@@ -7,6 +7,7 @@ Handles CRUD operations and search for products.
 from datetime import datetime, timezone
 from typing import Any, Optional
 
+from app.core import events
 from app.models.product import (
     ProductCreate,
     ProductListResponse,
@@ -36,18 +37,12 @@ async def create_product(
 
     inserted_id = await store.insert_one(PRODUCT_COLLECTION, product_dict)
     product_dict["_id"] = inserted_id
+    await events.publish(events.CATALOG_CHANGED, product_id=inserted_id)
     return ProductResponse(**product_dict)
 
 
-async def get_products(
-    store: JsonStore,
-    filters: Optional[dict[str, Any]] = None,
-    page: int = 1,
-    limit: int = 20,
-    sort_by: str = "created_at",
-    sort_order: int = -1,
-) -> ProductListResponse:
-    """Get products with filters, pagination, and sorting."""
+def build_product_query(filters: Optional[dict[str, Any]] = None) -> dict[str, Any]:
+    """Translate product-list filters into a store query for active products."""
     query: dict[str, Any] = {"is_deleted": False}
     filters = filters or {}
 
@@ -66,7 +61,19 @@ async def get_products(
         query["price"] = price_filter
     if filters.get("search"):
         query["$text"] = {"$search": filters["search"]}
+    return query
+
 
+async def get_products(
+    store: JsonStore,
+    filters: Optional[dict[str, Any]] = None,
+    page: int = 1,
+    limit: int = 20,
+    sort_by: str = "created_at",
+    sort_order: int = -1,
+) -> ProductListResponse:
+    """Get products with filters, pagination, and sorting."""
+    query = build_product_query(filters)
     total = await store.count(PRODUCT_COLLECTION, query)
 
     skip = (page - 1) * limit
@@ -81,6 +88,24 @@ async def get_products(
     return ProductListResponse(products=products, total=total, page=page, limit=limit)
 
 
+async def get_product_ids(
+    store: JsonStore,
+    filters: Optional[dict[str, Any]] = None,
+    page: int = 1,
+    limit: int = 20,
+    sort_by: str = "created_at",
+    sort_order: int = -1,
+) -> list[str]:
+    """IDs of the page get_products returns for the same filters and sorting."""
+    sort_field = sort_by if sort_by in ("created_at", "price", "name") else "created_at"
+    products_data = await store.find_many(
+        PRODUCT_COLLECTION, build_product_query(filters),
+        sort_field=sort_field, sort_order=sort_order,
+        skip=(page - 1) * limit, limit=limit,
+    )
+    return [doc["_id"] for doc in products_data]
+
+
 async def get_product_by_id(
     store: JsonStore,
     product_id: str,
@@ -119,6 +144,7 @@ async def update_product(
     )
     if not result:
         return None
+    await events.publish(events.CATALOG_CHANGED, product_id=product_id)
     return ProductResponse(**result)
 
 
@@ -133,6 +159,8 @@ async def delete_product(
         {"_id": product_id, "retailer_id": retailer_id, "is_deleted": False},
         {"$set": {"is_deleted": True, "updated_at": datetime.now(timezone.utc).isoformat()}},
     )
+    if modified:
+        await events.publish(events.CATALOG_CHANGED, product_id=product_id)
     return modified > 0
 
 
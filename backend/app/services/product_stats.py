@@ -0,0 +1,119 @@
+"""
+Per-product Statistics for FitView AI.
+Phase 4: Intelligence Layer.
+
+Keeps a small table of per-product counters used by size recommendations:
+try-on session count and units currently in carts per size. The table is
+built once from the store (sessions and current cart contents) and then
+kept equal to what a rebuild would produce: sessions are counted as they
+are created (TRYON_CREATED), every cart add, quantity / size change,
+removal and clear applies its delta, and a deleted account's sessions and
+cart lines are subtracted (USER_DELETED). Reading a product's stats is a dict lookup instead of a
+scan of tryon_sessions.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+
+from app.core import events
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+
+class ProductSizeStats:
+    """Counters for one product."""
+
+    __slots__ = ("tryons", "cart_sizes")
+
+    def __init__(self):
+        self.tryons = 0
+        self.cart_sizes: Counter = Counter()
+
+    def size_share(self, size: str) -> float:
+        """Fraction of this product's units in carts that are in `size`."""
+        total = sum(self.cart_sizes.values())
+        return self.cart_sizes[size] / total if total else 0.0
+
+
+class ProductStats:
+    """In-process stats table keyed by product_id."""
+
+    def __init__(self):
+        self._products: dict[str, ProductSizeStats] = {}
+        self._built = False
+        self._lock = asyncio.Lock()
+
+    def invalidate(self) -> None:
+        """Force a rebuild on next read (e.g. after sessions or carts are bulk-deleted)."""
+        self._built = False
+
+    async def ensure_built(self, store: JsonStore) -> None:
+        if self._built:
+            return
+        async with self._lock:
+            if self._built:
+                return
+            self._products = {}
+            sessions = await store.find_many("tryon_sessions", {})
+            carts = await store.find_many("carts", {})
+            for session in sessions:
+                self._stats(session.get("product_id", "")).tryons += 1
+            for cart in carts:
+                for item in cart.get("items", []):
+                    self._stats(item.get("product_id", "")).cart_sizes[item.get("size", "")] += item.get("quantity", 1)
+            self._built = True
+            logger.info(f"Product stats built for {len(self._products)} products")
+
+    def _stats(self, product_id: str) -> ProductSizeStats:
+        stats = self._products.get(product_id)
+        if stats is None:
+            stats = self._products[product_id] = ProductSizeStats()
+        return stats
+
+    async def get(self, store: JsonStore, product_id: str) -> ProductSizeStats:
+        await self.ensure_built(store)
+        return self.lookup(product_id)
+
+    def lookup(self, product_id: str) -> ProductSizeStats:
+        """Stats for a product from the built table (empty if it has none)."""
+        return self._products.get(product_id) or ProductSizeStats()
+
+    def record_tryon(self, product_id: str, delta: int = 1) -> None:
+        if self._built:
+            self._stats(product_id).tryons += delta
+
+    def record_cart_change(self, product_id: str, size: str, delta: int) -> None:
+        """Apply a change in units of (product, size) held in carts (negative for removals)."""
+        if self._built and delta:
+            cart_sizes = self._stats(product_id).cart_sizes
+            cart_sizes[size] += delta
+            if cart_sizes[size] <= 0:
+                del cart_sizes[size]
+
+    def record_cart_lines(self, items: list[dict], sign: int = 1) -> None:
+        """Apply whole cart lines, e.g. sign=-1 for lines that were removed."""
+        for item in items:
+            self.record_cart_change(
+                item.get("product_id", ""), item.get("size", ""), sign * item.get("quantity", 1)
+            )
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+product_stats = ProductStats()
+
+
+@events.subscribe(events.TRYON_CREATED)
+def _on_tryon_created(product_id: str, **_) -> None:
+    product_stats.record_tryon(product_id)
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(sessions: list[dict], cart_items: list[dict], **_) -> None:
+    for session in sessions:
+        product_stats.record_tryon(session.get("product_id", ""), -1)
+    product_stats.record_cart_lines(cart_items, sign=-1)
@@ -0,0 +1,149 @@
+"""
+Recommendation Result Cache for FitView AI.
+Phase 4: Intelligence Layer.
+
+Caches style and size recommendation responses per user: an in-process LRU
+over users (each holding that user's entries), or Redis alone when
+RECOMMENDATION_CACHE_REDIS is on. With Redis the local LRU is skipped, as
+the internal bus only reaches this worker and a local copy would outlive an
+invalidation made by another one. Entries are dropped by events on the
+internal bus: a user's entries when they create a try-on or delete their
+account, everything when the catalog changes. A TTL bounds staleness from
+inputs that are not evented (e.g. other shoppers' cart sizes).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, TypeVar
+
+from pydantic import BaseModel
+
+from app.core import events
+from app.core.cache import (
+    cache_delete_pattern,
+    cache_get,
+    cache_get_many,
+    cache_set,
+    cache_set_many,
+)
+from app.core.config import settings
+from app.core.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def _redis_key(user_id: str, key: str) -> str:
+    return f"rec:{user_id}:{key}"
+
+
+class RecommendationCache:
+    """Per-user LRU of recommendation responses with optional Redis backing."""
+
+    def __init__(self):
+        # user_id -> {key: (expires_at, response)}
+        self._users: OrderedDict[str, dict[str, tuple[float, BaseModel]]] = OrderedDict()
+
+    async def get(self, user_id: str, key: str, model: type[ModelT]) -> Optional[ModelT]:
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            data = await cache_get(_redis_key(user_id, key))
+            response = model(**data) if data is not None else None
+        else:
+            response = self._lookup(user_id, key)
+        record_cache("recommendations", response is not None)
+        return response
+
+    async def get_many(self, user_id: str, keys: list[str], model: type[ModelT]) -> dict[str, ModelT]:
+        """Cached responses for several keys (one MGET with Redis); misses are left out."""
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            values = await cache_get_many([_redis_key(user_id, key) for key in keys])
+            found = {key: model(**data) for key, data in zip(keys, values) if data is not None}
+        else:
+            found = {}
+            for key in keys:
+                response = self._lookup(user_id, key)
+                if response is not None:
+                    found[key] = response
+        for key in keys:
+            record_cache("recommendations", key in found)
+        return found
+
+    async def set(self, user_id: str, key: str, response: BaseModel) -> None:
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            await cache_set(
+                _redis_key(user_id, key),
+                response.model_dump(by_alias=True),
+                ttl=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+            )
+        else:
+            self._put(user_id, key, response)
+
+    async def set_many(self, user_id: str, responses: dict[str, BaseModel]) -> None:
+        """Cache several responses (one pipelined write with Redis)."""
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            await cache_set_many(
+                {
+                    _redis_key(user_id, key): response.model_dump(by_alias=True)
+                    for key, response in responses.items()
+                },
+                ttl=settings.RECOMMENDATION_CACHE_TTL_SECONDS,
+            )
+        else:
+            for key, response in responses.items():
+                self._put(user_id, key, response)
+
+    def _lookup(self, user_id: str, key: str) -> Optional[BaseModel]:
+        entries = self._users.get(user_id)
+        if entries is None:
+            return None
+        self._users.move_to_end(user_id)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] > time.monotonic():
+            return entry[1]
+        del entries[key]
+        return None
+
+    def _put(self, user_id: str, key: str, response: BaseModel) -> None:
+        entries = self._users.get(user_id)
+        if entries is None:
+            entries = self._users[user_id] = {}
+            if len(self._users) > settings.RECOMMENDATION_CACHE_SIZE:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        entries[key] = (time.monotonic() + settings.RECOMMENDATION_CACHE_TTL_SECONDS, response)
+
+    async def invalidate_user(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            await cache_delete_pattern(_redis_key(user_id, "*"))
+
+    async def clear(self) -> None:
+        self._users.clear()
+        if settings.RECOMMENDATION_CACHE_REDIS:
+            await cache_delete_pattern("rec:*")
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+recommendation_cache = RecommendationCache()
+
+
+@events.subscribe(events.TRYON_CREATED)
+async def _on_tryon_created(user_id: str, product_id: str, **_) -> None:
+    await recommendation_cache.invalidate_user(user_id)
+
+
+@events.subscribe(events.USER_DELETED)
+async def _on_user_deleted(user_id: str, **_) -> None:
+    await recommendation_cache.invalidate_user(user_id)
+
+
+@events.subscribe(events.CATALOG_CHANGED)
+async def _on_catalog_changed(product_id: str) -> None:
+    await recommendation_cache.clear()
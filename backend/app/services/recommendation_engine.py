@@ -0,0 +1,232 @@
+"""
+Style Recommendation Engine for FitView AI.
+Phase 4: Intelligence Layer.
+
+Keeps the catalog as a sparse product x feature matrix (COO arrays; one
+feature per tag with weight 1 and one per category with weight 2) and a
+sparse per-user affinity (tag / category counts over the user's try-ons).
+Scoring a user is a single sparse mat-vec (np.bincount over the non-zeros)
+followed by a top-K argpartition, instead of a Python loop over every
+product.
+
+User affinities are built lazily from the user's sessions and then updated
+as new sessions are created. Product writes (CATALOG_CHANGED on the event
+bus) invalidate the matrix and the affinities (tags of tried products may
+have changed).
+"""
+
+import asyncio
+import logging
+from collections import Counter, OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.core import events
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+TAG_WEIGHT = 1.0
+CATEGORY_WEIGHT = 2.0
+MAX_CACHED_PROFILES = 10000
+
+
+class UserAffinity:
+    """Sparse tag / category counts over a user's try-on sessions."""
+
+    __slots__ = ("tags", "categories", "tried")
+
+    def __init__(self):
+        self.tags: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.tried: set[str] = set()
+
+    def add(self, product_id: str, product: Optional[dict]) -> None:
+        self.tried.add(product_id)
+        if product:
+            for tag in product.get("tags", []):
+                self.tags[tag] += 1
+            self.categories[product.get("category", "")] += 1
+
+
+class RecommendationEngine:
+    """In-process sparse scoring of active products against user affinities."""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._built = False
+        self._products: list[dict] = []
+        self._row_of: dict[str, int] = {}
+        self._features: dict[str, int] = {}
+        # Non-zeros of the product x feature matrix
+        self._rows = np.empty(0, dtype=np.int32)
+        self._cols = np.empty(0, dtype=np.int32)
+        self._data = np.empty(0, dtype=np.float32)
+        self._profiles: OrderedDict[str, UserAffinity] = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Build / invalidation
+    # ------------------------------------------------------------------
+
+    def invalidate(self) -> None:
+        """Rebuild the matrix and user affinities on next use (after product writes)."""
+        self._built = False
+        self._profiles.clear()
+
+    def forget_user(self, user_id: str) -> None:
+        self._profiles.pop(user_id, None)
+
+    async def ensure_built(self, store: JsonStore) -> None:
+        if self._built:
+            return
+        async with self._lock:
+            if self._built:
+                return
+            products = await store.find_many("products", {"is_deleted": False})
+            self.load(products)
+            self._built = True
+            logger.info(
+                f"Recommendation matrix built: {len(products)} products x {len(self._features)} features"
+            )
+
+    def load(self, products: list[dict]) -> None:
+        """Build the product x feature matrix from active products."""
+        features: dict[str, int] = {}
+        rows: list[int] = []
+        cols: list[int] = []
+        data: list[float] = []
+        for row, product in enumerate(products):
+            for tag in set(product.get("tags", [])):
+                rows.append(row)
+                cols.append(features.setdefault(f"tag:{tag}", len(features)))
+                data.append(TAG_WEIGHT)
+            rows.append(row)
+            cols.append(features.setdefault(f"category:{product.get('category', '')}", len(features)))
+            data.append(CATEGORY_WEIGHT)
+
+        self._products = products
+        self._row_of = {p.get("_id", ""): i for i, p in enumerate(products)}
+        self._features = features
+        self._rows = np.asarray(rows, dtype=np.int32)
+        self._cols = np.asarray(cols, dtype=np.int32)
+        self._data = np.asarray(data, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # User affinities
+    # ------------------------------------------------------------------
+
+    async def user_affinity(self, store: JsonStore, user_id: str) -> UserAffinity:
+        """Return the user's affinity, building it from their sessions on first use."""
+        affinity = self._profiles.get(user_id)
+        if affinity is not None:
+            self._profiles.move_to_end(user_id)
+            return affinity
+
+        sessions = await store.find_many(
+            "tryon_sessions",
+            {"user_id": user_id},
+            sort_field="created_at",
+            sort_order=-1,
+        )
+        affinity = UserAffinity()
+        for session in sessions:
+            pid = session.get("product_id", "")
+            affinity.add(pid, self._product(pid))
+
+        self._profiles[user_id] = affinity
+        if len(self._profiles) > MAX_CACHED_PROFILES:
+            self._profiles.popitem(last=False)
+        return affinity
+
+    def record_session(self, session: dict) -> None:
+        """Fold a new try-on session into the user's affinity if it is cached."""
+        affinity = self._profiles.get(session.get("user_id"))
+        if affinity is None or not self._built:
+            return
+        pid = session.get("product_id", "")
+        affinity.add(pid, self._product(pid))
+
+    def _product(self, product_id: str) -> Optional[dict]:
+        row = self._row_of.get(product_id)
+        return self._products[row] if row is not None else None
+
+    # ------------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------------
+
+    def _user_vector(self, affinity: UserAffinity) -> np.ndarray:
+        vec = np.zeros(len(self._features), dtype=np.float32)
+        for prefix, counts in (("tag:", affinity.tags), ("category:", affinity.categories)):
+            for value, count in counts.items():
+                col = self._features.get(prefix + str(value))
+                if col is not None:
+                    vec[col] += count
+        return vec
+
+    def score(self, affinity: UserAffinity) -> np.ndarray:
+        """Score every product: one sparse mat-vec over the non-zeros."""
+        vec = self._user_vector(affinity)
+        return np.bincount(
+            self._rows, weights=self._data * vec[self._cols], minlength=len(self._products)
+        )
+
+    def top_products(
+        self,
+        affinity: UserAffinity,
+        limit: int,
+        boost: Optional[dict[str, float]] = None,
+    ) -> list[dict]:
+        """
+        Highest-scoring untried products (score > 0), ties in catalog order.
+        `boost` adds extra per-product scores (e.g. collaborative filtering).
+        """
+        if not self._products or limit <= 0:
+            return []
+        scores = self.score(affinity)
+        for pid, value in (boost or {}).items():
+            row = self._row_of.get(pid)
+            if row is not None:
+                scores[row] += value
+        tried_rows = [self._row_of[pid] for pid in affinity.tried if pid in self._row_of]
+        scores[tried_rows] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size > limit:
+            # Keep everything tied with the limit-th score so catalog order breaks ties
+            kth = np.partition(scores[candidates], -limit)[-limit]
+            candidates = candidates[scores[candidates] >= kth]
+        order = np.lexsort((candidates, -scores[candidates]))
+        return [self._products[r] for r in candidates[order][:limit]]
+
+    def padding(self, exclude: set[str], limit: int) -> list[dict]:
+        """First `limit` active products in catalog order not in `exclude`."""
+        padded = []
+        for product in self._products:
+            if len(padded) >= limit:
+                break
+            if product.get("_id", "") not in exclude:
+                padded.append(product)
+        return padded
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+recommendation_engine = RecommendationEngine()
+
+
+@events.subscribe(events.CATALOG_CHANGED)
+def _on_catalog_changed(product_id: str) -> None:
+    recommendation_engine.invalidate()
+
+
+@events.subscribe(events.TRYON_CREATED)
+def _on_tryon_created(session: dict, **_) -> None:
+    recommendation_engine.record_session(session)
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(user_id: str, **_) -> None:
+    recommendation_engine.forget_user(user_id)
@@ -2,15 +2,23 @@
 Recommendation Service for FitView AI.
 Phase 4: Intelligence Layer.
 
-Provides size and style recommendations using rule-based matching
-and content-based filtering via tag overlap scoring.
+Provides size and style recommendations using rule-based matching,
+content-based filtering via tag overlap scoring (see
+recommendation_engine for the sparse scoring) and item-item
+collaborative filtering (see item_similarity).
 """
 
 import logging
-from collections import Counter
 from typing import Optional
 
+import numpy as np
+
+from app.core.config import settings
 from app.models.recommendation import SizeRecommendation, StyleRecommendation
+from app.services.item_similarity import item_neighbors
+from app.services.product_stats import ProductSizeStats, product_stats
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_engine import recommendation_engine
 from app.utils.json_store import JsonStore
 
 logger = logging.getLogger(__name__)
@@ -26,6 +34,11 @@ SIZE_MEASUREMENTS = {
     "XXL": {"chest": (112, 119), "waist": (97, 104), "hip": (119, 127)},
 }
 
+# SIZE_MEASUREMENTS as (size x measurement) bound arrays for vectorized matching
+_MEASURE_KEYS = ("chest", "waist", "hip")
+_SIZE_LOW = np.array([[SIZE_MEASUREMENTS[s][k][0] for k in _MEASURE_KEYS] for s in SIZE_MEASUREMENTS], dtype=float)
+_SIZE_HIGH = np.array([[SIZE_MEASUREMENTS[s][k][1] for k in _MEASURE_KEYS] for s in SIZE_MEASUREMENTS], dtype=float)
+
 
 async def recommend_size(
     store: JsonStore,
@@ -38,11 +51,85 @@ async def recommend_size(
     Strategy:
     1. Check user measurements if available
     2. Match against product size chart or default size chart
-    3. Check try-on history for similar products
+    3. Add popularity from the product's try-on count and cart size mix
     4. Return best size with confidence score
     """
-    # Get product
+    cache_key = f"size:{product_id}"
+    cached = await recommendation_cache.get(user_id, cache_key, SizeRecommendation)
+    if cached is not None:
+        return cached
+
     product = await store.find_one("products", {"_id": product_id, "is_deleted": False})
+    user = await store.find_one("users", {"_id": user_id})
+    measurement_scores = _measurement_scores(user.get("measurements", {}) if user else {})
+    stats = await product_stats.get(store, product_id)
+    result = _size_for_product(product, measurement_scores, stats)
+    await recommendation_cache.set(user_id, cache_key, result)
+    return result
+
+
+async def recommend_sizes_bulk(
+    store: JsonStore,
+    user_id: str,
+    product_ids: list[str],
+) -> dict[str, SizeRecommendation]:
+    """
+    Size recommendations for many products at once (e.g. a listing page).
+    Cached products are served from the recommendation cache; for the rest
+    the user's measurements are matched against every size label once and
+    the products are fetched in one lookup.
+    """
+    unique = list(dict.fromkeys(product_ids))
+    cached = await recommendation_cache.get_many(
+        user_id, [f"size:{pid}" for pid in unique], SizeRecommendation
+    )
+    results: dict[str, SizeRecommendation] = {
+        pid: cached[f"size:{pid}"] for pid in unique if f"size:{pid}" in cached
+    }
+    missing = [pid for pid in unique if pid not in results]
+
+    if missing:
+        user = await store.find_one("users", {"_id": user_id})
+        measurement_scores = _measurement_scores(user.get("measurements", {}) if user else {})
+        products = await store.find_by_ids("products", missing, {"is_deleted": False})
+        await product_stats.ensure_built(store)
+        for pid in missing:
+            results[pid] = _size_for_product(products.get(pid), measurement_scores, product_stats.lookup(pid))
+        await recommendation_cache.set_many(
+            user_id, {f"size:{pid}": results[pid] for pid in missing}
+        )
+
+    return {pid: results[pid] for pid in unique}
+
+
+def _measurement_scores(measurements: dict) -> dict[str, float]:
+    """
+    Measurement match score (0-0.6) per size label, matching the user's
+    chest / waist / hip against every SIZE_MEASUREMENTS range at once.
+    Empty when the user has no measurements.
+    """
+    measurements = measurements or {}
+    values = np.array(
+        [measurements.get(key) if measurements.get(key) is not None else np.nan for key in _MEASURE_KEYS],
+        dtype=float,
+    )
+    present = ~np.isnan(values)
+    if not present.any():
+        return {}
+
+    in_range = (_SIZE_LOW <= values) & (values <= _SIZE_HIGH)
+    near = (np.abs(values - _SIZE_LOW) <= 3) | (np.abs(values - _SIZE_HIGH) <= 3)
+    matches = np.where(in_range, 1.0, np.where(near, 0.5, 0.0))[:, present].sum(axis=1)
+    scores = matches / present.sum() * 0.6
+    return dict(zip(SIZE_MEASUREMENTS, scores.tolist()))
+
+
+def _size_for_product(
+    product: Optional[dict],
+    measurement_scores: dict[str, float],
+    stats: ProductSizeStats,
+) -> SizeRecommendation:
+    """Score a product's in-stock sizes and pick the best one."""
     if not product:
         return SizeRecommendation(
             recommended_size="M",
@@ -60,10 +147,6 @@ async def recommend_size(
             all_sizes=[],
         )
 
-    # Get user profile for measurements
-    user = await store.find_one("users", {"_id": user_id})
-    user_measurements = user.get("measurements", {}) if user else {}
-
     # Get product size chart
     size_chart = product.get("size_chart", {})
 
@@ -81,38 +164,23 @@ async def recommend_size(
         reasons = []
 
         # Rule-based scoring from user measurements
-        if user_measurements and size_label in SIZE_MEASUREMENTS:
-            measurement_range = SIZE_MEASUREMENTS[size_label]
-            match_count = 0
-            total_checks = 0
-
-            for measure_key in ["chest", "waist", "hip"]:
-                user_val = user_measurements.get(measure_key)
-                if user_val is not None:
-                    total_checks += 1
-                    low, high = measurement_range[measure_key]
-                    if low <= user_val <= high:
-                        match_count += 1
-                    elif abs(user_val - low) <= 3 or abs(user_val - high) <= 3:
-                        match_count += 0.5
-
-            if total_checks > 0:
-                score += (match_count / total_checks) * 0.6
-                reasons.append("Based on your body measurements")
+        if size_label in measurement_scores:
+            score += measurement_scores[size_label]
+            reasons.append("Based on your body measurements")
 
         # Size chart matching
         if size_chart and size_label in size_chart:
             score += 0.1
             reasons.append("Matches product size chart")
 
-        # Popularity scoring - check what sizes other users tried with this product
-        tryon_sessions = await store.find_many(
-            "tryon_sessions", {"product_id": product_id}
-        )
-        if tryon_sessions:
-            # Count try-ons (as a proxy for popular sizes)
+        # Popularity scoring - products other users tried, and the sizes they carted
+        if stats.tryons:
             score += 0.1
             reasons.append("Popular choice for this product")
+        share = stats.size_share(size_label)
+        if share > 0:
+            score += share * 0.2
+            reasons.append(f"{int(share * 100)}% of cart adds for this product are this size")
 
         # Default scoring for common sizes (M and L tend to be safest)
         default_preference = {"M": 0.15, "L": 0.12, "XL": 0.10, "S": 0.08, "XXL": 0.05, "XS": 0.03}
@@ -169,21 +237,31 @@ async def recommend_style(
     Recommend products based on user's try-on history.
 
     Strategy (content-based filtering via tag overlap):
-    1. Get user's try-on history
-    2. Collect tags/categories from tried products
-    3. Find products with overlapping tags that user hasn't tried
-    4. Score by tag overlap count
-    5. Return top recommendations
+    1. Get the user's tag/category affinity (cached, updated per try-on)
+    2. Score every product with one sparse mat-vec against the catalog matrix
+    3. Drop products the user already tried
+    4. Add weighted item-item similarity to the user's tried products
+    5. Return the top-K by score, padded with catalog products
     """
-    # Get user's try-on history
-    tryon_sessions = await store.find_many(
-        "tryon_sessions",
-        {"user_id": user_id},
-        sort_field="created_at",
-        sort_order=-1,
-    )
+    cache_key = f"style:{limit}"
+    cached = await recommendation_cache.get(user_id, cache_key, StyleRecommendation)
+    if cached is not None:
+        return cached
+
+    result = await _recommend_style(store, user_id, limit)
+    await recommendation_cache.set(user_id, cache_key, result)
+    return result
+
+
+async def _recommend_style(
+    store: JsonStore,
+    user_id: str,
+    limit: int,
+) -> StyleRecommendation:
+    await recommendation_engine.ensure_built(store)
+    affinity = await recommendation_engine.user_affinity(store, user_id)
 
-    if not tryon_sessions:
+    if not affinity.tried:
         # No history - return popular/recent products
         all_products = await store.find_many(
             "products",
@@ -198,74 +276,31 @@ async def recommend_style(
             total=len(all_products),
         )
 
-    # Collect tried product IDs and their features
-    tried_product_ids = set()
-    tag_counter: Counter = Counter()
-    category_counter: Counter = Counter()
-
-    for session in tryon_sessions:
-        pid = session.get("product_id", "")
-        tried_product_ids.add(pid)
+    # Blend in "also tried" similarity from the offline item-item artifact
+    boost = None
+    if settings.STYLE_CF_WEIGHT > 0 and item_neighbors.loaded:
+        boost = {
+            pid: settings.STYLE_CF_WEIGHT * score
+            for pid, score in item_neighbors.blend(affinity.tried).items()
+        }
 
-        # Fetch product details for tags
-        product = await store.find_one("products", {"_id": pid, "is_deleted": False})
-        if product:
-            for tag in product.get("tags", []):
-                tag_counter[tag] += 1
-            category_counter[product.get("category", "")] += 1
-
-    # Get all active products
-    all_products = await store.find_many("products", {"is_deleted": False})
-
-    # Score products user hasn't tried
-    scored_products: list[tuple[float, dict]] = []
-
-    for product in all_products:
-        pid = product.get("_id", "")
-        if pid in tried_product_ids:
-            continue
-
-        score = 0.0
-
-        # Tag overlap scoring
-        product_tags = set(product.get("tags", []))
-        for tag in product_tags:
-            if tag in tag_counter:
-                score += tag_counter[tag]
-
-        # Category overlap scoring (weighted higher)
-        product_category = product.get("category", "")
-        if product_category in category_counter:
-            score += category_counter[product_category] * 2
-
-        if score > 0:
-            scored_products.append((score, product))
-
-    # Sort by score descending
-    scored_products.sort(key=lambda x: x[0], reverse=True)
-
-    # Take top N
-    recommended = [p for _, p in scored_products[:limit]]
+    recommended = recommendation_engine.top_products(affinity, limit, boost)
 
     # If we don't have enough recommendations, pad with recent products
     if len(recommended) < limit:
-        remaining = limit - len(recommended)
-        recommended_ids = {p.get("_id") for p in recommended}
-        for product in all_products:
-            pid = product.get("_id", "")
-            if pid not in tried_product_ids and pid not in recommended_ids:
-                recommended.append(product)
-                if len(recommended) >= limit:
-                    break
+        exclude = affinity.tried | {p.get("_id") for p in recommended}
+        recommended += recommendation_engine.padding(exclude, limit - len(recommended))
 
     # Build basis description
-    top_tags = [tag for tag, _ in tag_counter.most_common(3)]
-    top_categories = [cat for cat, _ in category_counter.most_common(2)]
+    top_tags = [tag for tag, _ in affinity.tags.most_common(3)]
+    top_categories = [cat for cat, _ in affinity.categories.most_common(2)]
     basis_parts = []
     if top_tags:
         basis_parts.append(f"your interest in {', '.join(top_tags)}")
     if top_categories:
         basis_parts.append(f"products in {', '.join(top_categories)}")
+    if boost:
+        basis_parts.append("what shoppers with similar try-ons liked")
     based_on = f"Based on {' and '.join(basis_parts)}" if basis_parts else "Trending products"
 
     return StyleRecommendation(
@@ -275,6 +310,26 @@ async def recommend_style(
     )
 
 
+async def recommend_also_tried(
+    store: JsonStore,
+    product_id: str,
+    limit: int = 10,
+) -> StyleRecommendation:
+    """
+    "Customers who tried this also tried": nearest neighbors of a product
+    from the offline item-item similarity artifact, active products only.
+    """
+    neighbors = [pid for pid, _ in item_neighbors.similar(product_id)]
+    products = await store.find_by_ids("products", neighbors, {"is_deleted": False})
+    recommended = [products[pid] for pid in neighbors if pid in products][:limit]
+
+    return StyleRecommendation(
+        products=_format_products(recommended),
+        based_on="Customers who tried this also tried",
+        total=len(recommended),
+    )
+
+
 def _format_products(products: list[dict]) -> list[dict]:
     """Format product dicts for the response."""
     formatted = []
@@ -19,11 +19,19 @@ import logging
 import os
 import time
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
+from app.core import events
 from app.core.config import settings
+from app.core.metrics import TRYON_PROVIDER_SECONDS, TRYON_STAGE_SECONDS, record_cache
+from app.core.tracing import span, traced
 from app.models.tryon import BatchTryOnResponse, TryOnHistoryResponse, TryOnResponse
+from app.services.analytics_columnar import session_columns
+from app.services.analytics_rollups import analytics_rollups
+from app.services.analytics_service import track_event
 from app.utils.ai_clients import (
     GeminiImageError,
     gemini_image_client,
@@ -40,9 +48,29 @@ logger = logging.getLogger(__name__)
 
 TRYON_COLLECTION = "tryon_sessions"
 
-# In-memory cache for try-on results (simulates Redis)
-_tryon_cache: dict[str, dict[str, Any]] = {}
+# In-memory LRU cache for try-on results (simulates Redis)
+_tryon_cache: OrderedDict[str, dict[str, Any]] = OrderedDict()
 CACHE_TTL_SECONDS = 3600  # 1 hour
+CACHE_MAX_ENTRIES = 2000
+
+
+@contextmanager
+def _stage(stage: str) -> Iterator[None]:
+    """Time a pipeline stage as both a trace span and a metrics observation."""
+    with span(f"tryon.{stage}"), TRYON_STAGE_SECONDS.time(stage=stage):
+        yield
+
+
+@contextmanager
+def _provider(provider: str) -> Iterator[None]:
+    """Time one AI provider attempt; the outcome is "error" if the block raised."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        TRYON_PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=provider, outcome=outcome)
 
 
 def _cache_key(model_id: str, product_id: str) -> str:
@@ -53,16 +81,31 @@ def _get_cached(key: str) -> Optional[dict]:
     if key in _tryon_cache:
         entry = _tryon_cache[key]
         if time.time() < entry["expires_at"]:
+            _tryon_cache.move_to_end(key)
+            record_cache("tryon", True)
             return entry["data"]
         del _tryon_cache[key]
+    record_cache("tryon", False)
     return None
 
 
-def _set_cache(key: str, data: dict) -> None:
+def _set_cache(key: str, data: dict, ttl: int = CACHE_TTL_SECONDS) -> None:
     _tryon_cache[key] = {
         "data": data,
-        "expires_at": time.time() + CACHE_TTL_SECONDS,
+        "expires_at": time.time() + ttl,
     }
+    _tryon_cache.move_to_end(key)
+    while len(_tryon_cache) > CACHE_MAX_ENTRIES:
+        _tryon_cache.popitem(last=False)
+
+
+def peek_cached(model_id: str, product_id: str) -> bool:
+    """
+    Check whether a live try-on result for this pair is cached, without
+    recording a cache hit/miss or touching LRU order (used by the warmer).
+    """
+    entry = _tryon_cache.get(_cache_key(model_id, product_id))
+    return entry is not None and time.time() < entry["expires_at"]
 
 
 async def generate_tryon(
@@ -101,6 +144,76 @@ async def generate_tryon(
     if not product_doc:
         raise TryOnError("Product not found or has been deleted")
 
+    # Steps 3-7: Load, preprocess, generate, postprocess and upload
+    cache_entry, ai_provider = await _render_tryon(model_doc, product_doc)
+
+    # Step 8: Cache the result
+    _set_cache(cache_key, cache_entry)
+    model_name = cache_entry["model_name"]
+    product_name = cache_entry["product_name"]
+    model_image_url = cache_entry["model_image_url"]
+    product_image_url = cache_entry["product_image_url"]
+    result_url = cache_entry["result_url"]
+
+    # Step 9: Increment model usage count
+    await store.update_one(
+        "models", {"_id": model_id}, {"$inc": {"usage_count": 1}}
+    )
+
+    # Step 10: Save session and return
+    elapsed_ms = int((time.time() - start_time) * 1000)
+    session = await _create_session(
+        store, user_id, model_id, product_id,
+        result_url, model_name, product_name,
+        model_image_url, product_image_url,
+        elapsed_ms,
+        ai_provider=ai_provider,
+    )
+
+    logger.info(
+        f"Try-on generated in {elapsed_ms}ms via {ai_provider} for model={model_id}, product={product_id}"
+    )
+    return session
+
+
+async def warm_tryon(
+    store: JsonStore,
+    model_id: str,
+    product_id: str,
+    ttl: int = CACHE_TTL_SECONDS,
+) -> Optional[str]:
+    """
+    Generate and cache a try-on for a model/product pair ahead of demand.
+
+    No session is recorded and the model's usage_count is left alone.
+    Returns the AI provider used, or None if the pair was already cached.
+    A "fallback" composite (both AI providers failed) is not cached.
+    """
+    if peek_cached(model_id, product_id):
+        return None
+    cache_key = _cache_key(model_id, product_id)
+
+    model_doc = await store.find_one("models", {"_id": model_id, "is_deleted": False})
+    if not model_doc:
+        raise TryOnError("Model not found or has been deleted")
+
+    product_doc = await store.find_one("products", {"_id": product_id, "is_deleted": False})
+    if not product_doc:
+        raise TryOnError("Product not found or has been deleted")
+
+    cache_entry, ai_provider = await _render_tryon(model_doc, product_doc)
+    if ai_provider != "fallback":
+        _set_cache(cache_key, cache_entry, ttl=ttl)
+    return ai_provider
+
+
+async def _render_tryon(model_doc: dict, product_doc: dict) -> tuple[dict, str]:
+    """
+    Produce a try-on image for a model/product pair without recording a session.
+
+    Returns (cache entry, ai_provider). Shared by generate_tryon and the
+    off-peak cache warmer.
+    """
     model_image_url = model_doc.get("image_url", "")
     product_images = product_doc.get("images", [])
     product_image_url = product_images[0] if product_images else ""
@@ -111,8 +224,9 @@ async def generate_tryon(
         raise TryOnError("Product does not have any images uploaded")
 
     # Step 3: Load images from local storage
-    model_image_bytes = _load_image_from_url(model_image_url)
-    garment_image_bytes = _load_image_from_url(product_image_url)
+    with _stage("fetch"):
+        model_image_bytes = _load_image_from_url(model_image_url)
+        garment_image_bytes = _load_image_from_url(product_image_url)
 
     if not model_image_bytes:
         raise TryOnError("Failed to load model image")
@@ -120,8 +234,10 @@ async def generate_tryon(
         raise TryOnError("Failed to load garment image")
 
     # Step 4: Preprocess images
-    preprocessed_model = await preprocess_model_image(model_image_bytes)
-    preprocessed_garment = await preprocess_garment_image(garment_image_bytes)
+    with _stage("preprocess_model"):
+        preprocessed_model = await preprocess_model_image(model_image_bytes)
+    with _stage("preprocess_garment"):
+        preprocessed_garment = await preprocess_garment_image(garment_image_bytes)
 
     # Step 5: Call AI API for generation
     # Priority: Gemini -> Bedrock -> Fallback composite
@@ -130,10 +246,11 @@ async def generate_tryon(
 
     if gemini_image_client.is_available:
         try:
-            generated_image = await gemini_image_client.generate_tryon(
-                model_image=preprocessed_model,
-                garment_image=preprocessed_garment,
-            )
+            with _provider("gemini"):
+                generated_image = await gemini_image_client.generate_tryon(
+                    model_image=preprocessed_model,
+                    garment_image=preprocessed_garment,
+                )
             ai_provider = "gemini"
             logger.info("Try-on generated via Gemini API")
         except GeminiImageError as e:
@@ -144,9 +261,10 @@ async def generate_tryon(
         try:
             from app.utils.bedrock_client import bedrock_image_client
             logger.info("Trying Bedrock for try-on generation...")
-            generated_image = await bedrock_image_client.generate_tryon(
-                preprocessed_model, preprocessed_garment
-            )
+            with _provider("bedrock"):
+                generated_image = await bedrock_image_client.generate_tryon(
+                    preprocessed_model, preprocessed_garment
+                )
             ai_provider = "bedrock"
             logger.info("Try-on generated successfully via Bedrock")
         except Exception as bedrock_error:
@@ -154,47 +272,27 @@ async def generate_tryon(
 
     if generated_image is None:
         logger.warning("Gemini API unavailable. Using fallback composite.")
-        generated_image = await _create_fallback_composite(
-            preprocessed_model, preprocessed_garment
-        )
+        with _provider("fallback"):
+            generated_image = await _create_fallback_composite(
+                preprocessed_model, preprocessed_garment
+            )
 
     # Step 6: Postprocess the result
-    final_image = await postprocess_tryon_image(generated_image)
+    with _stage("postprocess"):
+        final_image = await postprocess_tryon_image(generated_image)
 
     # Step 7: Upload result to storage
     result_filename = f"tryon_{uuid.uuid4().hex}"
-    result_url = upload_image(final_image, "tryon_results", result_filename)
+    with _stage("upload"):
+        result_url = upload_image(final_image, "tryon_results", result_filename)
 
-    # Step 8: Cache the result
-    model_name = model_doc.get("name", "")
-    product_name = product_doc.get("name", "")
-    _set_cache(cache_key, {
+    return {
         "result_url": result_url,
-        "model_name": model_name,
-        "product_name": product_name,
+        "model_name": model_doc.get("name", ""),
+        "product_name": product_doc.get("name", ""),
         "model_image_url": model_image_url,
         "product_image_url": product_image_url,
-    })
-
-    # Step 9: Increment model usage count
-    await store.update_one(
-        "models", {"_id": model_id}, {"$inc": {"usage_count": 1}}
-    )
-
-    # Step 10: Save session and return
-    elapsed_ms = int((time.time() - start_time) * 1000)
-    session = await _create_session(
-        store, user_id, model_id, product_id,
-        result_url, model_name, product_name,
-        model_image_url, product_image_url,
-        elapsed_ms,
-        ai_provider=ai_provider,
-    )
-
-    logger.info(
-        f"Try-on generated in {elapsed_ms}ms via {ai_provider} for model={model_id}, product={product_id}"
-    )
-    return session
+    }, ai_provider
 
 
 async def generate_batch_tryon(
@@ -213,15 +311,17 @@ async def generate_batch_tryon(
     # Step 1: Generate individual try-ons for each product
     individual_results: list[TryOnResponse] = []
     for product_id in product_ids:
-        result = await generate_tryon(store, model_id, product_id, user_id)
+        with span("tryon.generate", product_id=product_id):
+            result = await generate_tryon(store, model_id, product_id, user_id)
         individual_results.append(result)
 
     # Step 2: Generate combined outfit if 2+ garments
     combined_result = None
     if len(product_ids) >= 2:
-        combined_result = await _generate_combined_outfit(
-            store, model_id, product_ids, user_id
-        )
+        with span("tryon.combined", product_count=len(product_ids)):
+            combined_result = await _generate_combined_outfit(
+                store, model_id, product_ids, user_id
+            )
 
     total_ms = int((time.time() - start_time) * 1000)
     return BatchTryOnResponse(
@@ -266,10 +366,12 @@ async def _generate_combined_outfit(
         return session
 
     # Load model image
-    model_image_bytes = _load_image_from_url(model_image_url)
+    with _stage("fetch"):
+        model_image_bytes = _load_image_from_url(model_image_url)
     if not model_image_bytes:
         raise TryOnError("Failed to load model image")
-    preprocessed_model = await preprocess_model_image(model_image_bytes)
+    with _stage("preprocess_model"):
+        preprocessed_model = await preprocess_model_image(model_image_bytes)
 
     # Load and preprocess all garment images
     garment_bytes_list: list[bytes] = []
@@ -283,10 +385,12 @@ async def _generate_combined_outfit(
             raise TryOnError(f"Product {pid} has no images")
         if not first_product_image_url:
             first_product_image_url = product_images[0]
-        garment_raw = _load_image_from_url(product_images[0])
+        with _stage("fetch"):
+            garment_raw = _load_image_from_url(product_images[0])
         if not garment_raw:
             raise TryOnError(f"Failed to load image for product {pid}")
-        preprocessed = await preprocess_garment_image(garment_raw)
+        with _stage("preprocess_garment"):
+            preprocessed = await preprocess_garment_image(garment_raw)
         garment_bytes_list.append(preprocessed)
 
     # Try Gemini multi-garment, fall back to Bedrock, then composite
@@ -295,10 +399,11 @@ async def _generate_combined_outfit(
 
     if gemini_image_client.is_available:
         try:
-            generated_image = await gemini_image_client.generate_multi_garment_tryon(
-                model_image=preprocessed_model,
-                garment_images=garment_bytes_list,
-            )
+            with _provider("gemini"):
+                generated_image = await gemini_image_client.generate_multi_garment_tryon(
+                    model_image=preprocessed_model,
+                    garment_images=garment_bytes_list,
+                )
             ai_provider = "gemini"
             logger.info("Combined outfit generated via Gemini API")
         except GeminiImageError as e:
@@ -310,22 +415,26 @@ async def _generate_combined_outfit(
             from app.utils.bedrock_client import bedrock_image_client
             logger.info("Trying Bedrock for combined outfit generation...")
             # Use first garment for Bedrock single-garment try-on
-            generated_image = await bedrock_image_client.generate_tryon(
-                preprocessed_model, garment_bytes_list[0]
-            )
+            with _provider("bedrock"):
+                generated_image = await bedrock_image_client.generate_tryon(
+                    preprocessed_model, garment_bytes_list[0]
+                )
             ai_provider = "bedrock"
             logger.info("Combined outfit generated successfully via Bedrock")
         except Exception as bedrock_error:
             logger.warning(f"Bedrock failed: {bedrock_error}, using fallback...")
 
     if generated_image is None:
-        generated_image = await _create_multi_fallback_composite(
-            preprocessed_model, garment_bytes_list
-        )
+        with _provider("fallback"):
+            generated_image = await _create_multi_fallback_composite(
+                preprocessed_model, garment_bytes_list
+            )
 
-    final_image = await postprocess_tryon_image(generated_image)
+    with _stage("postprocess"):
+        final_image = await postprocess_tryon_image(generated_image)
     result_filename = f"tryon_combined_{uuid.uuid4().hex}"
-    result_url = upload_image(final_image, "tryon_results", result_filename)
+    with _stage("upload"):
+        result_url = upload_image(final_image, "tryon_results", result_filename)
 
     _set_cache(cache_key, {
         "result_url": result_url,
@@ -373,13 +482,16 @@ async def generate_tryon_with_user_photo(
         raise TryOnError("Product does not have any images uploaded")
 
     # Load garment image from local storage
-    garment_image_bytes = _load_image_from_url(product_image_url)
+    with _stage("fetch"):
+        garment_image_bytes = _load_image_from_url(product_image_url)
     if not garment_image_bytes:
         raise TryOnError("Failed to load garment image")
 
     # Preprocess images
-    preprocessed_model = await preprocess_model_image(user_photo_bytes)
-    preprocessed_garment = await preprocess_garment_image(garment_image_bytes)
+    with _stage("preprocess_model"):
+        preprocessed_model = await preprocess_model_image(user_photo_bytes)
+    with _stage("preprocess_garment"):
+        preprocessed_garment = await preprocess_garment_image(garment_image_bytes)
 
     # Call AI API for generation: Gemini -> Bedrock -> Fallback composite
     generated_image = None
@@ -387,10 +499,12 @@ async def generate_tryon_with_user_photo(
 
     if gemini_image_client.is_available:
         try:
-            generated_image = await gemini_image_client.generate_tryon(
-                model_image=preprocessed_model,
-                garment_image=preprocessed_garment,
-            )
+            with _provider("gemini"):
+                generated_image = await gemini_image_client.generate_tryon(
+                    model_image=preprocessed_model,
+                    garment_image=preprocessed_garment,
+                    model_reusable=False,
+                )
             ai_provider = "gemini"
             logger.info("Try-on (user photo) generated via Gemini API")
         except GeminiImageError as e:
@@ -401,9 +515,10 @@ async def generate_tryon_with_user_photo(
         try:
             from app.utils.bedrock_client import bedrock_image_client
             logger.info("Trying Bedrock for user photo try-on generation...")
-            generated_image = await bedrock_image_client.generate_tryon(
-                preprocessed_model, preprocessed_garment
-            )
+            with _provider("bedrock"):
+                generated_image = await bedrock_image_client.generate_tryon(
+                    preprocessed_model, preprocessed_garment
+                )
             ai_provider = "bedrock"
             logger.info("Try-on generated successfully via Bedrock")
         except Exception as bedrock_error:
@@ -411,16 +526,19 @@ async def generate_tryon_with_user_photo(
 
     if generated_image is None:
         logger.warning("Gemini API unavailable. Using fallback composite for user photo.")
-        generated_image = await _create_fallback_composite(
-            preprocessed_model, preprocessed_garment
-        )
+        with _provider("fallback"):
+            generated_image = await _create_fallback_composite(
+                preprocessed_model, preprocessed_garment
+            )
 
     # Postprocess the result
-    final_image = await postprocess_tryon_image(generated_image)
+    with _stage("postprocess"):
+        final_image = await postprocess_tryon_image(generated_image)
 
     # Upload result to storage
     result_filename = f"tryon_{uuid.uuid4().hex}"
-    result_url = upload_image(final_image, "tryon_results", result_filename)
+    with _stage("upload"):
+        result_url = upload_image(final_image, "tryon_results", result_filename)
 
     # Save session and return
     product_name = product_doc.get("name", "")
@@ -487,6 +605,10 @@ async def toggle_favorite(
     )
     if not result:
         return None
+    await analytics_rollups.record_favorite(store, result, is_favorite)
+    session_columns.set_favorite(session_id, is_favorite)
+    if is_favorite:
+        track_event("product_favorited", user_id, result.get("product_id"), {"session_id": session_id})
     return TryOnResponse(**result)
 
 
@@ -524,8 +646,23 @@ async def _create_session(
         "expires_at": expires_at.isoformat(),
     }
 
-    inserted_id = await store.insert_one(TRYON_COLLECTION, session_doc)
-    session_doc["_id"] = inserted_id
+    with _stage("session_write"):
+        inserted_id = await store.insert_one(TRYON_COLLECTION, session_doc)
+        session_doc["_id"] = inserted_id
+        await events.publish(
+            events.TRYON_CREATED, user_id=user_id, product_id=product_id, session=session_doc
+        )
+    track_event(
+        "tryon_generated",
+        user_id,
+        product_id,
+        {
+            "session_id": inserted_id,
+            "model_id": model_id,
+            "ai_provider": ai_provider,
+            "processing_time_ms": processing_time_ms,
+        },
+    )
     return TryOnResponse(**session_doc)
 
 
@@ -542,6 +679,7 @@ def _load_image_from_url(url: str) -> Optional[bytes]:
     return None
 
 
+@traced("tryon.fallback_composite")
 async def _create_fallback_composite(
     model_bytes: bytes, garment_bytes: bytes
 ) -> bytes:
@@ -645,6 +783,7 @@ async def _create_fallback_composite(
     return output.read()
 
 
+@traced("tryon.fallback_composite")
 async def _create_multi_fallback_composite(
     model_bytes: bytes, garment_bytes_list: list[bytes]
 ) -> bytes:
@@ -0,0 +1,188 @@
+"""
+Try-On Cache Warmer for FitView AI.
+
+Pre-generates likely model x product try-ons during an off-peak window so
+that peak-time requests are cache hits instead of 20-30s AI calls.
+
+Pairs are ranked from signals we already store:
+- models.usage_count (only the top N models are considered)
+- recent tryon_sessions per product and per model/product pair
+- newly added products, which have no history yet but are likely to be tried
+
+Each off-peak window makes at most TRYON_WARMER_BUDGET generation attempts
+in total, however many runs fit into it; failed attempts count too.
+Fallback composites (both AI providers down) are never cached.
+"""
+
+import asyncio
+import heapq
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import settings
+from app.services.tryon_service import TryOnError, peek_cached, warm_tryon
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DAYS = 30
+NEW_PRODUCT_DAYS = 7
+NEW_PRODUCT_BOOST = 3.0
+PAIR_HISTORY_WEIGHT = 2.0
+
+# Product tags that pin a garment to one model gender
+_GENDER_TAGS = {"male": "women", "female": "men"}
+
+
+def in_offpeak_window(now: Optional[datetime] = None) -> bool:
+    """Check whether `now` (UTC) falls inside the configured off-peak hours."""
+    hour = (now or datetime.now(timezone.utc)).hour
+    start, end = settings.TRYON_WARMER_START_HOUR, settings.TRYON_WARMER_END_HOUR
+    if start <= end:
+        return start <= hour < end
+    # Window wraps past midnight, e.g. 22 -> 4
+    return hour >= start or hour < end
+
+
+def window_opened_at(now: datetime) -> datetime:
+    """Start of the off-peak window containing `now` (call only inside the window)."""
+    opened = now.replace(hour=settings.TRYON_WARMER_START_HOUR, minute=0, second=0, microsecond=0)
+    if opened > now:
+        # Past midnight in a wrapping window: it opened the previous day
+        opened -= timedelta(days=1)
+    return opened
+
+
+async def rank_warm_candidates(
+    store: JsonStore,
+    limit: int,
+    top_models: int = 5,
+) -> list[tuple[str, str]]:
+    """
+    Rank uncached (model_id, product_id) pairs by expected demand.
+
+    Score = model weight (1 + usage_count) x product weight, where the
+    product weight adds recent try-ons of the product, recent try-ons of the
+    exact pair, and a boost for new products.
+    """
+    now = datetime.now(timezone.utc)
+
+    models = await store.find_many(
+        "models",
+        {"is_deleted": False, "is_active": True},
+        sort_field="usage_count",
+        sort_order=-1,
+        limit=top_models,
+    )
+    products = await store.find_many("products", {"is_deleted": False})
+    if not models or not products:
+        return []
+
+    history_since = (now - timedelta(days=HISTORY_DAYS)).isoformat()
+    sessions = await store.find_many("tryon_sessions", {"created_at": {"$gte": history_since}})
+
+    product_hits: Counter = Counter()
+    pair_hits: Counter = Counter()
+    for s in sessions:
+        pid = s.get("product_id", "")
+        # Skip combined outfits ("id1,id2") and user-photo sessions
+        if not pid or "," in pid:
+            continue
+        product_hits[pid] += 1
+        pair_hits[(s.get("model_id"), pid)] += 1
+
+    new_since = (now - timedelta(days=NEW_PRODUCT_DAYS)).isoformat()
+
+    candidates: list[tuple[float, str, str]] = []
+    for model in models:
+        mid = model["_id"]
+        if not model.get("image_url"):
+            continue
+        model_weight = 1 + model.get("usage_count", 0)
+        excluded_tag = _GENDER_TAGS.get(model.get("gender", ""))
+
+        for product in products:
+            pid = product["_id"]
+            if not product.get("images"):
+                continue
+            if excluded_tag and excluded_tag in product.get("tags", []):
+                continue
+            if peek_cached(mid, pid):
+                continue
+
+            product_weight = product_hits[pid] + PAIR_HISTORY_WEIGHT * pair_hits[(mid, pid)]
+            if product.get("created_at", "") >= new_since:
+                product_weight += NEW_PRODUCT_BOOST
+            if product_weight <= 0:
+                continue
+
+            candidates.append((model_weight * product_weight, mid, pid))
+
+    return [(mid, pid) for _, mid, pid in heapq.nlargest(limit, candidates)]
+
+
+async def run_warmer_once(store: JsonStore, budget: Optional[int] = None) -> int:
+    """
+    Generate and cache the top-ranked pairs. Returns the number of attempts
+    charged to the budget: generated pairs plus fallback composites and
+    failures, so a failing provider cannot spin through every candidate.
+    """
+    budget = settings.TRYON_WARMER_BUDGET if budget is None else budget
+    if budget <= 0:
+        return 0
+
+    pairs = await rank_warm_candidates(store, budget, settings.TRYON_WARMER_TOP_MODELS)
+    generated = attempted = 0
+    for model_id, product_id in pairs:
+        try:
+            provider = await warm_tryon(
+                store, model_id, product_id,
+                ttl=settings.TRYON_WARMER_CACHE_TTL_SECONDS,
+            )
+        except TryOnError as e:
+            attempted += 1
+            logger.warning(f"Warmer skipped model={model_id}, product={product_id}: {e}")
+            continue
+        except Exception as e:
+            attempted += 1
+            logger.error(f"Warmer failed for model={model_id}, product={product_id}: {e}")
+            continue
+        if provider is None:
+            continue
+        attempted += 1
+        if provider == "fallback":
+            logger.warning(f"Warmer got a fallback composite for model={model_id}, product={product_id}; not cached")
+        else:
+            generated += 1
+
+    logger.info(
+        f"Try-on warmer generated {generated}/{len(pairs)} candidate pairs ({attempted} attempts)"
+    )
+    return attempted
+
+
+async def warmer_loop(store: JsonStore) -> None:
+    """
+    Background task: run the warmer every interval while inside the off-peak
+    window, spending at most TRYON_WARMER_BUDGET generations per window.
+    """
+    window: Optional[datetime] = None
+    spent = 0
+    while True:
+        await asyncio.sleep(settings.TRYON_WARMER_INTERVAL_SECONDS)
+        now = datetime.now(timezone.utc)
+        if not in_offpeak_window(now):
+            continue
+
+        opened = window_opened_at(now)
+        if opened != window:
+            window, spent = opened, 0
+        remaining = settings.TRYON_WARMER_BUDGET - spent
+        if remaining <= 0:
+            continue
+        try:
+            spent += await run_warmer_once(store, remaining)
+        except Exception as e:
+            logger.error(f"Try-on warmer run failed: {e}")
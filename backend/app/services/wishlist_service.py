@@ -4,12 +4,17 @@ Phase 4: Intelligence Layer.
 
 Manages wishlist operations using the JsonStore.
 Each wishlist entry is a separate document linking user to product.
+Membership checks go through an in-memory per-user set index of
+wishlisted product IDs, maintained on add/remove.
 """
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 
+from app.core import events
 from app.models.wishlist import WishlistItemResponse, WishlistResponse
+from app.services.analytics_service import track_event
 from app.utils.json_store import JsonStore
 
 logger = logging.getLogger(__name__)
@@ -17,6 +22,54 @@ logger = logging.getLogger(__name__)
 WISHLISTS_COLLECTION = "wishlists"
 
 
+class WishlistIndex:
+    """user_id -> set of wishlisted product IDs, built once from the store."""
+
+    def __init__(self):
+        self._users: dict[str, set[str]] = {}
+        self._built = False
+        self._lock = asyncio.Lock()
+
+    async def ensure_built(self, store: JsonStore) -> None:
+        if self._built:
+            return
+        async with self._lock:
+            if self._built:
+                return
+            users: dict[str, set[str]] = {}
+            async for item in store.iter_many(WISHLISTS_COLLECTION, {}):
+                users.setdefault(item["user_id"], set()).add(item["product_id"])
+            self._users = users
+            self._built = True
+            logger.info(f"Wishlist index built for {len(users)} users")
+
+    def contains(self, user_id: str, product_ids: list[str]) -> dict[str, bool]:
+        wishlisted = self._users.get(user_id, set())
+        return {pid: pid in wishlisted for pid in product_ids}
+
+    def add(self, user_id: str, product_id: str) -> bool:
+        """Mark a product as wishlisted; False if it already was."""
+        wishlisted = self._users.setdefault(user_id, set())
+        if product_id in wishlisted:
+            return False
+        wishlisted.add(product_id)
+        return True
+
+    def remove(self, user_id: str, product_id: str) -> bool:
+        """Unmark a product; False if it was not wishlisted."""
+        wishlisted = self._users.get(user_id)
+        if not wishlisted or product_id not in wishlisted:
+            return False
+        wishlisted.discard(product_id)
+        return True
+
+    def forget_user(self, user_id: str) -> None:
+        self._users.pop(user_id, None)
+
+
+wishlist_index = WishlistIndex()
+
+
 async def get_wishlist(store: JsonStore, user_id: str) -> WishlistResponse:
     """Get the user's wishlist with enriched product details."""
     wishlist_items = await store.find_many(
@@ -27,9 +80,12 @@ async def get_wishlist(store: JsonStore, user_id: str) -> WishlistResponse:
     )
 
     enriched_items: list[WishlistItemResponse] = []
+    products = await store.find_by_ids(
+        "products", [item["product_id"] for item in wishlist_items], {"is_deleted": False}
+    )
 
     for item in wishlist_items:
-        product = await store.find_one("products", {"_id": item["product_id"], "is_deleted": False})
+        product = products.get(item["product_id"])
         product_name = product.get("name", "Unknown Product") if product else "Unknown Product"
         product_price = product.get("price", 0) if product else 0
         product_images = product.get("images", []) if product else []
@@ -63,12 +119,9 @@ async def add_to_wishlist(
     if not product:
         raise WishlistServiceError("Product not found")
 
-    # Check if already in wishlist
-    existing = await store.find_one(
-        WISHLISTS_COLLECTION,
-        {"user_id": user_id, "product_id": product_id},
-    )
-    if existing:
+    # Check if already in wishlist (marking it first guards against a concurrent add)
+    await wishlist_index.ensure_built(store)
+    if not wishlist_index.add(user_id, product_id):
         raise WishlistServiceError("Product is already in your wishlist")
 
     now = datetime.now(timezone.utc).isoformat()
@@ -79,7 +132,12 @@ async def add_to_wishlist(
         "added_at": now,
     }
 
-    await store.insert_one(WISHLISTS_COLLECTION, wishlist_doc)
+    try:
+        await store.insert_one(WISHLISTS_COLLECTION, wishlist_doc)
+    except Exception:
+        wishlist_index.remove(user_id, product_id)
+        raise
+    track_event("wishlist_added", user_id, product_id)
     return await get_wishlist(store, user_id)
 
 
@@ -89,11 +147,21 @@ async def remove_from_wishlist(
     product_id: str,
 ) -> WishlistResponse:
     """Remove a product from the user's wishlist."""
-    deleted = await store.delete_one(
-        WISHLISTS_COLLECTION,
-        {"user_id": user_id, "product_id": product_id},
-    )
-    if deleted == 0:
+    await wishlist_index.ensure_built(store)
+    if not wishlist_index.remove(user_id, product_id):
+        raise WishlistServiceError("Product not found in your wishlist")
+
+    try:
+        deleted = await store.delete_one(
+            WISHLISTS_COLLECTION,
+            {"user_id": user_id, "product_id": product_id},
+        )
+    except Exception:
+        wishlist_index.add(user_id, product_id)
+        raise
+    if not deleted:
+        # A concurrent add marked the index and has not inserted its row yet
+        wishlist_index.add(user_id, product_id)
         raise WishlistServiceError("Product not found in your wishlist")
 
     return await get_wishlist(store, user_id)
@@ -105,11 +173,24 @@ async def is_in_wishlist(
     product_id: str,
 ) -> bool:
     """Check if a product is in the user's wishlist."""
-    existing = await store.find_one(
-        WISHLISTS_COLLECTION,
-        {"user_id": user_id, "product_id": product_id},
-    )
-    return existing is not None
+    await wishlist_index.ensure_built(store)
+    return wishlist_index.contains(user_id, [product_id])[product_id]
+
+
+async def wishlist_contains(
+    store: JsonStore,
+    user_id: str,
+    product_ids: list[str],
+) -> dict[str, bool]:
+    """Wishlist membership for many products at once (e.g. a product grid)."""
+    await wishlist_index.ensure_built(store)
+    return wishlist_index.contains(user_id, product_ids)
+
+
+@events.subscribe(events.USER_DELETED)
+def _on_user_deleted(user_id: str, **_) -> None:
+    # Account deletion removes the user's wishlist rows
+    wishlist_index.forget_user(user_id)
 
 
 class WishlistServiceError(Exception):
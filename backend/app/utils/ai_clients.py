@@ -8,14 +8,19 @@ Clients:
 
 import asyncio
 import base64
+import hashlib
 import io
 import logging
 import time
-from typing import Optional
+from collections import OrderedDict
+from typing import Any, Optional
 
 import httpx
+from PIL import Image
 
 from app.core.config import settings
+from app.core.metrics import record_cache
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -24,9 +29,29 @@ logger = logging.getLogger(__name__)
 # -------------------------------------------------------------------
 
 GEMINI_API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+GEMINI_UPLOAD_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files"
 GEMINI_TIMEOUT = 60.0
 GEMINI_MAX_RETRIES = 2
 
+# Input images are downscaled to the model's effective input resolution and
+# sent lossy (JPEG, or WebP when there is an alpha channel) instead of PNG.
+GEMINI_INPUT_MAX_SIDE = 1024
+GEMINI_INPUT_QUALITY = 85
+
+# Reusable (catalog / model) images whose encoding is above this size are
+# uploaded once through the Files API and referenced by URI; smaller ones are
+# cheaper to send inline. Single-use images (user photos, style bases) are
+# always sent inline, since an upload would never be reused.
+GEMINI_INLINE_MAX_BYTES = 256 * 1024
+
+# Uploaded files live for 48h on Gemini's side; expire our handles earlier.
+GEMINI_FILE_TTL_SECONDS = 46 * 3600
+GEMINI_PART_CACHE_SIZE = 256
+
+# After a failed upload the inline part is only reused briefly, so the
+# image gets another upload attempt soon.
+GEMINI_UPLOAD_RETRY_SECONDS = 300
+
 
 class GeminiImageClient:
     """
@@ -41,6 +66,9 @@ class GeminiImageClient:
         self._api_key = settings.GEMINI_API_KEY
         self._model = settings.GEMINI_IMAGE_MODEL
         self._timeout = GEMINI_TIMEOUT
+        # sha256(original image bytes) -> {"part": request part, "expires_at": ts}
+        self._part_cache: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        self._pending_parts: dict[str, asyncio.Future] = {}
 
     @property
     def is_available(self) -> bool:
@@ -50,6 +78,7 @@ class GeminiImageClient:
         m = model or self._model
         return f"{GEMINI_API_BASE}/models/{m}:generateContent"
 
+    @traced("gemini.generate_image")
     async def generate_image(self, prompt: str, aspect_ratio: str = "1:1") -> bytes:
         """
         Generate an image from a text prompt using Gemini API.
@@ -68,26 +97,26 @@ class GeminiImageClient:
 
         return await self._call_api(payload)
 
-    async def edit_image(self, prompt: str, image_bytes: bytes) -> bytes:
+    @traced("gemini.edit_image")
+    async def edit_image(self, prompt: str, image_bytes: bytes, reusable: bool = True) -> bytes:
         """
         Edit an image using text prompt + image input via Gemini API.
 
         Args:
             prompt: Text instruction for editing
             image_bytes: Source image bytes
+            reusable: False for one-off images, which are sent inline
 
         Returns: Edited PNG image bytes
         """
         if not self._api_key:
             raise GeminiImageError("Gemini API key not configured")
 
-        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-
         payload = {
             "contents": [{
                 "parts": [
                     {"text": prompt},
-                    {"inline_data": {"mime_type": "image/png", "data": image_b64}},
+                    await self._image_part(image_bytes, reusable),
                 ]
             }],
             "generationConfig": {
@@ -97,16 +126,21 @@ class GeminiImageClient:
 
         return await self._call_api(payload)
 
-    async def generate_tryon(self, model_image: bytes, garment_image: bytes) -> bytes:
+    @traced("gemini.generate_tryon")
+    async def generate_tryon(
+        self, model_image: bytes, garment_image: bytes, model_reusable: bool = True
+    ) -> bytes:
         """
         Generate a virtual try-on using Gemini vision.
         Sends both model and garment images with a try-on prompt.
+        Pass model_reusable=False for a user's own photo.
         """
         if not self._api_key:
             raise GeminiImageError("Gemini API key not configured")
 
-        model_b64 = base64.b64encode(model_image).decode("utf-8")
-        garment_b64 = base64.b64encode(garment_image).decode("utf-8")
+        model_part, garment_part = await asyncio.gather(
+            self._image_part(model_image, model_reusable), self._image_part(garment_image)
+        )
 
         payload = {
             "contents": [{
@@ -120,8 +154,8 @@ class GeminiImageClient:
                             "proper fit, wrinkles, and lighting. Output only the final image."
                         )
                     },
-                    {"inline_data": {"mime_type": "image/png", "data": model_b64}},
-                    {"inline_data": {"mime_type": "image/png", "data": garment_b64}},
+                    model_part,
+                    garment_part,
                 ]
             }],
             "generationConfig": {
@@ -131,6 +165,7 @@ class GeminiImageClient:
 
         return await self._call_api(payload)
 
+    @traced("gemini.generate_multi_garment_tryon")
     async def generate_multi_garment_tryon(
         self, model_image: bytes, garment_images: list[bytes]
     ) -> bytes:
@@ -141,7 +176,9 @@ class GeminiImageClient:
         if not self._api_key:
             raise GeminiImageError("Gemini API key not configured")
 
-        model_b64 = base64.b64encode(model_image).decode("utf-8")
+        image_parts = await asyncio.gather(
+            *(self._image_part(img) for img in [model_image, *garment_images])
+        )
 
         parts: list[dict] = [
             {
@@ -154,13 +191,9 @@ class GeminiImageClient:
                     "Combine all garments into one cohesive outfit. Output only the final image."
                 )
             },
-            {"inline_data": {"mime_type": "image/png", "data": model_b64}},
+            *image_parts,
         ]
 
-        for garment_bytes in garment_images:
-            garment_b64 = base64.b64encode(garment_bytes).decode("utf-8")
-            parts.append({"inline_data": {"mime_type": "image/png", "data": garment_b64}})
-
         payload = {
             "contents": [{"parts": parts}],
             "generationConfig": {
@@ -170,6 +203,7 @@ class GeminiImageClient:
 
         return await self._call_api(payload)
 
+    @traced("gemini.generate_style_variation")
     async def generate_style_variation(
         self, base_image: bytes, style: str
     ) -> bytes:
@@ -184,8 +218,102 @@ class GeminiImageClient:
         }
         prompt = style_prompts.get(style, f"Show this outfit in a {style} setting with appropriate lighting.")
 
-        return await self.edit_image(prompt, base_image)
+        return await self.edit_image(prompt, base_image, reusable=False)
 
+    async def _image_part(self, image_bytes: bytes, reusable: bool = True) -> dict:
+        """
+        Build the request part for an image.
+
+        Parts of reusable images are cached by content hash, so a catalog image
+        is compressed and uploaded once and then referenced by file URI until
+        the handle expires. Single-use images are encoded and sent inline.
+        """
+        if not reusable:
+            data, mime_type = await self._encode(image_bytes)
+            return _inline_part(data, mime_type)
+
+        key = hashlib.sha256(image_bytes).hexdigest()
+        entry = self._part_cache.get(key)
+        if entry is not None:
+            if time.time() < entry["expires_at"]:
+                self._part_cache.move_to_end(key)
+                record_cache("gemini_image_part", True)
+                return entry["part"]
+            del self._part_cache[key]
+        record_cache("gemini_image_part", False)
+
+        # Share one build between concurrent requests for the same image
+        pending = self._pending_parts.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._build_image_part(image_bytes, key))
+            self._pending_parts[key] = pending
+            pending.add_done_callback(lambda _: self._pending_parts.pop(key, None))
+        return await asyncio.shield(pending)
+
+    @staticmethod
+    async def _encode(image_bytes: bytes) -> tuple[bytes, str]:
+        try:
+            return await asyncio.to_thread(_encode_input_image, image_bytes)
+        except Exception as e:
+            raise GeminiImageError(f"Could not encode input image: {e}") from e
+
+    async def _build_image_part(self, image_bytes: bytes, key: str) -> dict:
+        data, mime_type = await self._encode(image_bytes)
+
+        part: Optional[dict] = None
+        ttl = GEMINI_FILE_TTL_SECONDS
+        if len(data) > GEMINI_INLINE_MAX_BYTES:
+            try:
+                file_uri = await self._upload_file(data, mime_type, key)
+                part = {"file_data": {"mime_type": mime_type, "file_uri": file_uri}}
+            except Exception as e:
+                logger.warning(f"Gemini file upload failed, sending image inline: {e}")
+                ttl = GEMINI_UPLOAD_RETRY_SECONDS
+        if part is None:
+            part = _inline_part(data, mime_type)
+
+        self._part_cache[key] = {"part": part, "expires_at": time.time() + ttl}
+        while len(self._part_cache) > GEMINI_PART_CACHE_SIZE:
+            self._part_cache.popitem(last=False)
+        return part
+
+    @traced("gemini.upload_file")
+    async def _upload_file(self, data: bytes, mime_type: str, digest: str) -> str:
+        """Upload bytes through the Gemini Files API (resumable protocol). Returns the file URI."""
+        async with httpx.AsyncClient(timeout=self._timeout) as client:
+            start = await client.post(
+                GEMINI_UPLOAD_URL,
+                json={"file": {"display_name": f"fitview-{digest[:16]}"}},
+                headers={
+                    "X-Goog-Api-Key": self._api_key or "",
+                    "X-Goog-Upload-Protocol": "resumable",
+                    "X-Goog-Upload-Command": "start",
+                    "X-Goog-Upload-Header-Content-Length": str(len(data)),
+                    "X-Goog-Upload-Header-Content-Type": mime_type,
+                },
+            )
+            upload_url = start.headers.get("x-goog-upload-url")
+            if start.status_code != 200 or not upload_url:
+                raise GeminiImageError(f"File upload start failed: {start.status_code}")
+
+            response = await client.post(
+                upload_url,
+                content=data,
+                headers={
+                    "X-Goog-Upload-Offset": "0",
+                    "X-Goog-Upload-Command": "upload, finalize",
+                },
+            )
+            if response.status_code != 200:
+                raise GeminiImageError(f"File upload failed: {response.status_code}")
+
+        file_info = response.json().get("file", {})
+        if file_info.get("state", "ACTIVE") != "ACTIVE" or not file_info.get("uri"):
+            raise GeminiImageError(f"Uploaded file not usable: {file_info.get('state')}")
+        logger.info(f"Uploaded {len(data)} bytes to Gemini Files API as {file_info.get('name')}")
+        return file_info["uri"]
+
+    @traced("gemini.call_api")
     async def _call_api(self, payload: dict) -> bytes:
         """Make a Gemini API call and extract the image from the response."""
         last_error: Optional[Exception] = None
@@ -279,6 +407,28 @@ class GeminiImageClient:
             return False
 
 
+def _inline_part(data: bytes, mime_type: str) -> dict:
+    return {"inline_data": {"mime_type": mime_type, "data": base64.b64encode(data).decode("utf-8")}}
+
+
+def _encode_input_image(image_bytes: bytes) -> tuple[bytes, str]:
+    """
+    Downscale to GEMINI_INPUT_MAX_SIDE and re-encode lossy.
+    Images with transparency (e.g. background-removed garments) go as WebP to
+    keep the alpha channel; everything else as JPEG.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img.thumbnail((GEMINI_INPUT_MAX_SIDE, GEMINI_INPUT_MAX_SIDE), Image.Resampling.LANCZOS)
+
+    output = io.BytesIO()
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        img.convert("RGBA").save(output, format="WEBP", quality=GEMINI_INPUT_QUALITY)
+        return output.getvalue(), "image/webp"
+
+    img.convert("RGB").save(output, format="JPEG", quality=GEMINI_INPUT_QUALITY, optimize=True)
+    return output.getvalue(), "image/jpeg"
+
+
 class GeminiImageError(Exception):
     """Custom exception for Gemini Image API errors."""
     pass
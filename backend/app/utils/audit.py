@@ -2,6 +2,8 @@ import logging
 from datetime import datetime, timezone
 from typing import Optional
 
+from app.utils.event_ingest import event_ingest
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,7 +17,11 @@ async def log_audit_event(
     status: str = "success",
     metadata: Optional[dict] = None,
 ):
-    """Log an audit event for security compliance."""
+    """
+    Log an audit event for security compliance. Written directly (an
+    append, not a collection rewrite); if that fails the event is handed to
+    the ingest's durable queue, which never drops and retries until written.
+    """
     event = {
         "event_type": event_type,
         "user_id": user_id,
@@ -27,6 +33,7 @@ async def log_audit_event(
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
     try:
-        await store.insert_one("audit_logs", event)
+        await store.append_log("audit_logs", [event])
     except Exception as e:
-        logger.error(f"Audit log failed: {e}")
+        logger.error(f"Audit log write failed, queued for retry: {e}")
+        event_ingest.emit("audit_logs", event, durable=True)
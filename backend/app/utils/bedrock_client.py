@@ -10,9 +10,15 @@ from typing import Optional
 import boto3
 from botocore.exceptions import ClientError
 from app.core.config import settings
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Bedrock only caches a prompt prefix of at least this many tokens (the
+# minimum for the Haiku chat model); a shorter cache point is ignored.
+# Tokens are estimated at ~4 characters each.
+PROMPT_CACHE_MIN_TOKENS = 2048
+
 
 class BedrockError(Exception):
     pass
@@ -56,6 +62,7 @@ class BedrockImageClient:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self._invoke_model_sync, body)
 
+    @traced("bedrock.generate_tryon")
     async def generate_tryon(self, model_image: bytes, garment_image: bytes) -> bytes:
         """Generate virtual try-on using Claude 3.5 Vision."""
         model_b64 = self._encode_image(model_image)
@@ -112,6 +119,7 @@ class BedrockImageClient:
         except ClientError as e:
             raise BedrockError(f"Bedrock API error: {e}") from e
 
+    @traced("bedrock.generate_style_variation")
     async def generate_style_variation(self, base_image: bytes, style: str) -> bytes:
         """Generate style variation using Claude Vision."""
         style_prompts = {
@@ -197,14 +205,29 @@ class BedrockChatClient:
         messages: list[dict],
         system_prompt: str = "",
         max_tokens: int = 1024,
+        system_prefix: str = "",
     ) -> str:
-        """Send messages and get a response string."""
+        """
+        Send messages and get a response string.
+
+        `system_prefix` is sent as a separate system block, marked with a
+        cache point when it is long enough for Bedrock prompt caching to reuse
+        it across requests; keep anything user-specific in `system_prompt`.
+        """
         body: dict = {
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": max_tokens,
             "messages": messages,
         }
-        if system_prompt:
+        if system_prefix:
+            prefix_block: dict = {"type": "text", "text": system_prefix}
+            if len(system_prefix) // 4 >= PROMPT_CACHE_MIN_TOKENS:
+                prefix_block["cache_control"] = {"type": "ephemeral"}
+            system_blocks = [prefix_block]
+            if system_prompt:
+                system_blocks.append({"type": "text", "text": system_prompt})
+            body["system"] = system_blocks
+        elif system_prompt:
             body["system"] = system_prompt
 
         loop = asyncio.get_event_loop()
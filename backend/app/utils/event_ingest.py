@@ -0,0 +1,127 @@
+"""
+Buffered event ingest for analytics and audit events.
+
+Request handlers call `emit()`, which only appends to an in-memory ring
+buffer. A background task drains the buffer in batches with one
+`append_log` per collection, so a burst of events costs one JSON-lines
+append (in a worker thread) instead of one write per event, and nothing is
+written on the request path.
+
+When the buffer is full, EVENT_DROP_POLICY decides whether the oldest
+buffered event or the incoming one is dropped. Filling a whole batch wakes
+the drainer early instead of waiting for the flush interval.
+
+Durable events (audit records whose direct write failed) go to a separate
+unbounded queue that is never dropped. A batch whose write fails is put
+back at the front of its queue and retried on the next flush.
+"""
+
+import asyncio
+import logging
+from collections import deque
+
+from app.core.config import settings
+from app.utils.json_store import JsonStore
+
+logger = logging.getLogger(__name__)
+
+
+class EventIngest:
+    """Bounded in-memory event buffer with a batch drainer."""
+
+    def __init__(
+        self,
+        capacity: int = settings.EVENT_BUFFER_SIZE,
+        batch_size: int = settings.EVENT_BATCH_SIZE,
+        drop_policy: str = settings.EVENT_DROP_POLICY,
+    ):
+        self._buffer: deque[tuple[str, dict]] = deque()
+        self._durable: deque[tuple[str, dict]] = deque()
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._drop_newest = drop_policy == "newest"
+        self._wakeup = asyncio.Event()
+        self.dropped = 0
+        self.written = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer) + len(self._durable)
+
+    def emit(self, collection: str, document: dict, durable: bool = False) -> bool:
+        """
+        Queue a document for `collection`. Returns False if it was dropped.
+        Durable documents bypass the bounded buffer and are never dropped.
+        """
+        if durable:
+            self._durable.append((collection, document))
+            self._wakeup.set()
+            return True
+        if len(self._buffer) >= self._capacity:
+            self.dropped += 1
+            if self._drop_newest:
+                return False
+            self._buffer.popleft()
+        self._buffer.append((collection, document))
+        if len(self._buffer) >= self._batch_size:
+            self._wakeup.set()
+        return True
+
+    async def flush(self, store: JsonStore) -> int:
+        """
+        Write everything currently buffered, durable events first. Returns the
+        number written. Stops at the first failed batch, which is re-queued.
+        """
+        written = 0
+        for queue in (self._durable, self._buffer):
+            while queue:
+                batch: dict[str, list[dict]] = {}
+                for _ in range(min(self._batch_size, len(queue))):
+                    collection, document = queue.popleft()
+                    batch.setdefault(collection, []).append(document)
+
+                failed: list[tuple[str, dict]] = []
+                for collection, documents in batch.items():
+                    try:
+                        await store.append_log(collection, documents)
+                        written += len(documents)
+                    except Exception as e:
+                        failed.extend((collection, document) for document in documents)
+                        logger.error(
+                            f"Event ingest failed for {collection} ({len(documents)} events), will retry: {e}"
+                        )
+                if failed:
+                    queue.extendleft(reversed(failed))
+                    if queue is self._buffer:
+                        self._trim()
+                    self.written += written
+                    return written
+        self.written += written
+        return written
+
+    def _trim(self) -> None:
+        """Apply the drop policy after re-queued events overfilled the buffer."""
+        while len(self._buffer) > self._capacity:
+            self.dropped += 1
+            if self._drop_newest:
+                self._buffer.pop()
+            else:
+                self._buffer.popleft()
+
+    async def drain_loop(self, store: JsonStore) -> None:
+        """Background task: flush on every interval or as soon as a batch fills."""
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=settings.EVENT_FLUSH_INTERVAL_SECONDS
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush(store)
+
+
+# -------------------------------------------------------------------
+# Singleton instance
+# -------------------------------------------------------------------
+
+event_ingest = EventIngest()
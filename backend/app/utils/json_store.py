@@ -4,12 +4,65 @@ Data lives in-memory for fast reads and persists to JSON files on disk.
 """
 
 import asyncio
+import functools
+import inspect
+import itertools
 import json
 import os
+import time
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, AsyncIterator, Iterable, Optional
+
+from app.core.metrics import STORE_OPERATION_SECONDS
+from app.core.tracing import span
+
+
+# iter_many hands control back to the event loop after this many documents
+ITER_BATCH_SIZE = 500
+
+
+def _timed(op: str):
+    """
+    Record the latency of a store method under (collection, op) and trace it.
+    For async generators (iter_many) only the time spent producing documents
+    is recorded, not the consumer's time between items, and no span is
+    opened since the iteration interleaves with the consumer's own spans.
+    """
+    def decorator(fn):
+        if inspect.isasyncgenfunction(fn):
+            @functools.wraps(fn)
+            async def gen_wrapper(self, collection: str, *args, **kwargs):
+                elapsed = 0.0
+                agen = fn(self, collection, *args, **kwargs)
+                try:
+                    while True:
+                        start = time.perf_counter()
+                        try:
+                            item = await agen.__anext__()
+                        except StopAsyncIteration:
+                            return
+                        finally:
+                            elapsed += time.perf_counter() - start
+                        yield item
+                finally:
+                    await agen.aclose()
+                    STORE_OPERATION_SECONDS.observe(elapsed, collection=collection, op=op)
+            return gen_wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(self, collection: str, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with span(f"store.{op}", collection=collection):
+                    return await fn(self, collection, *args, **kwargs)
+            finally:
+                STORE_OPERATION_SECONDS.observe(
+                    time.perf_counter() - start, collection=collection, op=op
+                )
+        return wrapper
+    return decorator
 
 
 class JsonStore:
@@ -19,6 +72,12 @@ class JsonStore:
         self._data_dir = Path(data_dir)
         self._collections: dict[str, list[dict]] = {}
         self._locks: dict[str, asyncio.Lock] = {}
+        # collection -> _id -> doc, for direct id lookups
+        self._id_index: dict[str, dict[str, dict]] = {}
+        # collection -> field -> value -> doc, for create_index() fields
+        self._field_index: dict[str, dict[str, dict[Any, dict]]] = {}
+        # collection -> (max_bytes, backups) rotation for append_log()
+        self._log_retention: dict[str, tuple[int, int]] = {}
 
     def _get_lock(self, collection: str) -> asyncio.Lock:
         if collection not in self._locks:
@@ -39,17 +98,58 @@ class JsonStore:
             except (json.JSONDecodeError, IOError):
                 self._collections[collection] = []
             self._locks[collection] = asyncio.Lock()
+            self._reindex(collection)
+
+    def _reindex(self, collection: str) -> None:
+        self._id_index[collection] = {
+            d["_id"]: d for d in self._collections.get(collection, []) if "_id" in d
+        }
+        self._reindex_fields(collection)
+
+    def _reindex_fields(self, collection: str) -> None:
+        for field, index in self._field_index.get(collection, {}).items():
+            index.clear()
+            for d in self._collections.get(collection, []):
+                if d.get(field) is not None:
+                    index.setdefault(d[field], d)
+
+    def _index_doc(self, collection: str, document: dict) -> None:
+        self._id_index[collection][document["_id"]] = document
+        for field, index in self._field_index.get(collection, {}).items():
+            if document.get(field) is not None:
+                index.setdefault(document[field], document)
+
+    def create_index(self, collection: str, field: str) -> None:
+        """
+        Index a unique field (e.g. users.email) so find_one queries on it are
+        dict lookups instead of scans. Uniqueness is up to the caller; with
+        duplicates the index points at the first document.
+        """
+        self._ensure_collection(collection)
+        self._field_index.setdefault(collection, {})[field] = {}
+        self._reindex_fields(collection)
+
+    def set_log_retention(self, collection: str, max_bytes: int, backups: int) -> None:
+        """
+        Rotate the append_log() file of `collection` once it exceeds
+        max_bytes, keeping `backups` older files (<collection>.jsonl.1 ...),
+        so the log never takes more than about max_bytes * (backups + 1) on
+        disk. Collections without a retention setting are never rotated.
+        """
+        self._log_retention[collection] = (max_bytes, backups)
 
     def _persist(self, collection: str) -> None:
         """Write a collection to its JSON file."""
-        self._data_dir.mkdir(parents=True, exist_ok=True)
-        fp = self._file_path(collection)
-        with open(fp, "w") as f:
-            json.dump(self._collections.get(collection, []), f, indent=2, default=_json_default)
+        with STORE_OPERATION_SECONDS.time(collection=collection, op="persist"):
+            self._data_dir.mkdir(parents=True, exist_ok=True)
+            fp = self._file_path(collection)
+            with open(fp, "w") as f:
+                json.dump(self._collections.get(collection, []), f, indent=2, default=_json_default)
 
     def _ensure_collection(self, collection: str) -> list[dict]:
         if collection not in self._collections:
             self._collections[collection] = []
+            self._id_index[collection] = {}
         return self._collections[collection]
 
     # ------------------------------------------------------------------
@@ -58,7 +158,10 @@ class JsonStore:
 
     @staticmethod
     def _match(doc: dict, query: dict) -> bool:
-        """Check if a document matches a query (supports equality, $gte, $lte, $text)."""
+        """
+        Check if a document matches a query (supports equality, $in, $gte,
+        $lte, $text, and $elemMatch / $not for array fields).
+        """
         for key, value in query.items():
             if key == "$text":
                 search_terms = value.get("$search", "").lower().split()
@@ -72,11 +175,17 @@ class JsonStore:
             doc_val = doc.get(key)
 
             if isinstance(value, dict):
-                # Range operators
+                # Set membership and range operators
+                if "$in" in value and doc_val not in value["$in"]:
+                    return False
                 if "$gte" in value and (doc_val is None or doc_val < value["$gte"]):
                     return False
                 if "$lte" in value and (doc_val is None or doc_val > value["$lte"]):
                     return False
+                if "$elemMatch" in value and _elem_index(doc_val, value["$elemMatch"]) is None:
+                    return False
+                if "$not" in value and JsonStore._match(doc, {key: value["$not"]}):
+                    return False
             else:
                 if doc_val != value:
                     return False
@@ -86,13 +195,44 @@ class JsonStore:
     # CRUD operations (all async for drop-in replacement)
     # ------------------------------------------------------------------
 
+    @_timed("find_one")
     async def find_one(self, collection: str, query: dict) -> Optional[dict]:
         docs = self._ensure_collection(collection)
+        doc_id = query.get("_id")
+        if isinstance(doc_id, str):
+            doc = self._id_index[collection].get(doc_id)
+            return _copy(doc) if doc is not None and self._match(doc, query) else None
+        for field, index in self._field_index.get(collection, {}).items():
+            value = query.get(field)
+            if isinstance(value, str):
+                doc = index.get(value)
+                return _copy(doc) if doc is not None and self._match(doc, query) else None
         for doc in docs:
             if self._match(doc, query):
                 return _copy(doc)
         return None
 
+    @_timed("find_by_ids")
+    async def find_by_ids(
+        self,
+        collection: str,
+        ids: Iterable[str],
+        query: Optional[dict] = None,
+    ) -> dict[str, dict]:
+        """
+        Fetch many docs by _id in one pass over the id index.
+        Returns {_id: doc} for the ids that exist and also match `query`.
+        """
+        self._ensure_collection(collection)
+        index = self._id_index[collection]
+        found = {}
+        for doc_id in set(ids):
+            doc = index.get(doc_id)
+            if doc is not None and (not query or self._match(doc, query)):
+                found[doc_id] = _copy(doc)
+        return found
+
+    @_timed("find_many")
     async def find_many(
         self,
         collection: str,
@@ -115,10 +255,36 @@ class JsonStore:
             results = results[:limit]
         return results
 
+    @_timed("iter_many")
+    async def iter_many(
+        self,
+        collection: str,
+        query: dict,
+        sort_field: Optional[str] = None,
+        sort_order: int = -1,
+    ) -> AsyncIterator[dict]:
+        """
+        Yield matching docs one copy at a time, matching lazily as the caller
+        consumes them and yielding to the event loop every ITER_BATCH_SIZE
+        docs. A collection already stored in the requested order (e.g.
+        sessions by created_at) is streamed as is; otherwise references to
+        the docs are sorted first, which costs O(collection) memory.
+        """
+        docs: Iterable[dict] = self._ensure_collection(collection)
+        if sort_field:
+            docs = _in_order(docs, sort_field, reverse=sort_order == -1)
+        for i, doc in enumerate(docs, 1):
+            if self._match(doc, query):
+                yield _copy(doc)
+            if i % ITER_BATCH_SIZE == 0:
+                await asyncio.sleep(0)
+
+    @_timed("count")
     async def count(self, collection: str, query: dict) -> int:
         docs = self._ensure_collection(collection)
         return sum(1 for d in docs if self._match(d, query))
 
+    @_timed("insert_one")
     async def insert_one(self, collection: str, document: dict) -> str:
         async with self._get_lock(collection):
             docs = self._ensure_collection(collection)
@@ -126,41 +292,109 @@ class JsonStore:
             document = _copy(document)
             document["_id"] = doc_id
             docs.append(document)
+            self._index_doc(collection, document)
             self._persist(collection)
             return doc_id
 
+    @_timed("insert_many")
+    async def insert_many(self, collection: str, documents: list[dict]) -> list[str]:
+        """Insert several docs with a single write to disk."""
+        if not documents:
+            return []
+        async with self._get_lock(collection):
+            docs = self._ensure_collection(collection)
+            ids = []
+            for document in documents:
+                document = _copy(document)
+                document["_id"] = uuid.uuid4().hex
+                docs.append(document)
+                self._index_doc(collection, document)
+                ids.append(document["_id"])
+            self._persist(collection)
+            return ids
+
+    @_timed("append_log")
+    async def append_log(self, collection: str, documents: list[dict]) -> list[str]:
+        """
+        Append docs as JSON lines to <collection>.jsonl, for write-only
+        collections (analytics events, audit logs). The docs are not kept in
+        memory and are not readable through find_*; the write runs in a
+        worker thread, so the event loop never waits on disk.
+        """
+        if not documents:
+            return []
+        ids = []
+        lines = []
+        for document in documents:
+            document = _copy(document)
+            document["_id"] = uuid.uuid4().hex
+            ids.append(document["_id"])
+            lines.append(json.dumps(document, default=_json_default) + "\n")
+        async with self._get_lock(collection):
+            await asyncio.to_thread(self._append_lines, collection, "".join(lines))
+        return ids
+
+    def _append_lines(self, collection: str, data: str) -> None:
+        self._data_dir.mkdir(parents=True, exist_ok=True)
+        fp = self._data_dir / f"{collection}.jsonl"
+        max_bytes, backups = self._log_retention.get(collection, (0, 0))
+        if max_bytes and fp.exists() and fp.stat().st_size + len(data) > max_bytes:
+            for i in range(backups - 1, 0, -1):
+                older = fp.with_name(f"{fp.name}.{i}")
+                if older.exists():
+                    older.replace(fp.with_name(f"{fp.name}.{i + 1}"))
+            if backups:
+                fp.replace(fp.with_name(f"{fp.name}.1"))
+            else:
+                fp.unlink()
+        with open(fp, "a") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @_timed("update_one")
     async def update_one(self, collection: str, query: dict, update: dict) -> int:
-        """Update first matching doc. Returns number of modified documents (0 or 1)."""
+        """
+        Update first matching doc. Returns number of modified documents (0 or 1).
+
+        Supports $set, $inc, $push and $pull. "field.$.key" paths in $set /
+        $inc address the array element matched by the query's $elemMatch on
+        that field, so single array items are changed under the collection
+        lock without a read-modify-write round trip.
+        """
         async with self._get_lock(collection):
             docs = self._ensure_collection(collection)
             for doc in docs:
                 if self._match(doc, query):
-                    if "$set" in update:
-                        doc.update(update["$set"])
-                    if "$inc" in update:
-                        for k, v in update["$inc"].items():
-                            doc[k] = doc.get(k, 0) + v
+                    _apply_update(doc, query, update)
+                    if self._field_index.get(collection, {}).keys() & update.get("$set", {}).keys():
+                        self._reindex_fields(collection)
                     self._persist(collection)
                     return 1
             return 0
 
+    @_timed("find_one_and_update")
     async def find_one_and_update(
-        self, collection: str, query: dict, update: dict
+        self, collection: str, query: dict, update: dict, return_document: str = "after"
     ) -> Optional[dict]:
-        """Update first matching doc and return the updated document."""
+        """
+        Update first matching doc (same operators as update_one) and return
+        it as it is after the update, or as it was before with
+        return_document="before".
+        """
         async with self._get_lock(collection):
             docs = self._ensure_collection(collection)
             for doc in docs:
                 if self._match(doc, query):
-                    if "$set" in update:
-                        doc.update(update["$set"])
-                    if "$inc" in update:
-                        for k, v in update["$inc"].items():
-                            doc[k] = doc.get(k, 0) + v
+                    before = _copy(doc)
+                    _apply_update(doc, query, update)
+                    if self._field_index.get(collection, {}).keys() & update.get("$set", {}).keys():
+                        self._reindex_fields(collection)
                     self._persist(collection)
-                    return _copy(doc)
+                    return before if return_document == "before" else _copy(doc)
             return None
 
+    @_timed("delete_one")
     async def delete_one(self, collection: str, query: dict) -> int:
         """Delete first matching doc. Returns number of deleted documents (0 or 1)."""
         async with self._get_lock(collection):
@@ -168,10 +402,13 @@ class JsonStore:
             for i, doc in enumerate(docs):
                 if self._match(doc, query):
                     docs.pop(i)
+                    self._id_index[collection].pop(doc.get("_id"), None)
+                    self._reindex_fields(collection)
                     self._persist(collection)
                     return 1
             return 0
 
+    @_timed("delete_many")
     async def delete_many(self, collection: str, query: dict) -> int:
         """Delete all matching docs. Returns number of deleted documents."""
         async with self._get_lock(collection):
@@ -180,6 +417,7 @@ class JsonStore:
             self._collections[collection] = [d for d in docs if not self._match(d, query)]
             deleted = original_len - len(self._collections[collection])
             if deleted:
+                self._reindex(collection)
                 self._persist(collection)
             return deleted
 
@@ -194,6 +432,74 @@ def _json_default(obj: Any) -> Any:
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
 
+def _in_order(docs: list[dict], field: str, reverse: bool) -> list[dict]:
+    """
+    `docs` sorted by `field` (stable, like list.sort). Returns the list itself
+    when it is already in that order, so appended-in-order collections are
+    not copied.
+    """
+    def key(d: dict) -> Any:
+        return d.get(field, "")
+
+    pairs = itertools.pairwise(docs)
+    if reverse:
+        in_order = all(key(a) >= key(b) for a, b in pairs)
+    else:
+        in_order = all(key(a) <= key(b) for a, b in pairs)
+    return docs if in_order else sorted(docs, key=key, reverse=reverse)
+
+
+def _elem_index(array: Any, query: dict) -> Optional[int]:
+    """Index of the first dict element of `array` matching `query`, or None."""
+    if not isinstance(array, list):
+        return None
+    for i, element in enumerate(array):
+        if isinstance(element, dict) and JsonStore._match(element, query):
+            return i
+    return None
+
+
+def _resolve(doc: dict, query: dict, path: str) -> tuple[dict, str]:
+    """
+    Resolve an update path to (container, key). "field.$.key" targets the
+    element matched by the query's $elemMatch on field. The array and the
+    element are replaced by copies, so documents handed out earlier by
+    find_* (shallow copies) never change underneath their readers.
+    """
+    if ".$." not in path:
+        return doc, path
+    field, key = path.split(".$.", 1)
+    condition = query.get(field)
+    elem_query = condition.get("$elemMatch") if isinstance(condition, dict) else None
+    index = _elem_index(doc.get(field), elem_query) if elem_query is not None else None
+    if index is None:
+        raise ValueError(f"Positional update {path!r} needs a matching $elemMatch on {field!r}")
+    array = doc[field] = list(doc[field])
+    element = array[index] = dict(array[index])
+    return element, key
+
+
+def _apply_update(doc: dict, query: dict, update: dict) -> None:
+    """Apply $set / $inc / $push / $pull to a matched document in place."""
+    for path, value in update.get("$set", {}).items():
+        target, key = _resolve(doc, query, path)
+        target[key] = value
+    for path, value in update.get("$inc", {}).items():
+        target, key = _resolve(doc, query, path)
+        target[key] = target.get(key, 0) + value
+    for field, value in update.get("$push", {}).items():
+        doc[field] = [*(doc.get(field) or []), _copy(value) if isinstance(value, dict) else value]
+    for field, condition in update.get("$pull", {}).items():
+        doc[field] = [
+            element for element in doc.get(field) or []
+            if not (
+                JsonStore._match(element, condition)
+                if isinstance(condition, dict) and isinstance(element, dict)
+                else element == condition
+            )
+        ]
+
+
 def _copy(d: dict) -> dict:
     """Shallow copy a dict to prevent mutation of internal data."""
     return dict(d)
@@ -0,0 +1,93 @@
+"""
+In-memory TF-IDF product index for FitView AI.
+
+Used by the chatbot to match a free-text message against the catalog
+(name, description, tags, category) without touching the store per query.
+The index is an inverted list of L2-normalised TF-IDF weights, so a query
+only visits postings for its own terms.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "any", "are", "at", "be", "for", "from", "i", "in", "is",
+    "it", "me", "my", "of", "on", "or", "please", "show", "some", "something",
+    "the", "to", "want", "with", "you", "find", "recommend", "suggest", "looking",
+    "need", "can", "get", "good", "what", "which",
+}
+
+# Repeat counts per field: short, descriptive fields weigh more than prose
+FIELD_WEIGHTS = {"name": 3, "tags": 2, "category": 2, "subcategory": 1, "description": 1}
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase, split on non-alphanumerics, drop stopwords, strip plural 's'."""
+    tokens = []
+    for tok in _TOKEN_RE.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tokens
+
+
+def _product_terms(product: dict) -> Counter:
+    terms: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = product.get(field)
+        if not value:
+            continue
+        text = " ".join(value) if isinstance(value, list) else str(value)
+        for tok in tokenize(text):
+            terms[tok] += weight
+    return terms
+
+
+class ProductIndex:
+    """TF-IDF inverted index over active products."""
+
+    def __init__(self, products: list[dict]):
+        self._products: list[dict] = products
+        self._idf: dict[str, float] = {}
+        self._postings: dict[str, list[tuple[int, float]]] = defaultdict(list)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def _build(self) -> None:
+        doc_terms = [_product_terms(p) for p in self._products]
+        n_docs = len(doc_terms)
+
+        df: Counter = Counter()
+        for terms in doc_terms:
+            df.update(terms.keys())
+        self._idf = {t: math.log((1 + n_docs) / (1 + d)) + 1.0 for t, d in df.items()}
+
+        for idx, terms in enumerate(doc_terms):
+            weights = {t: (1 + math.log(tf)) * self._idf[t] for t, tf in terms.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            for term, w in weights.items():
+                self._postings[term].append((idx, w / norm))
+
+    def search(self, text: str, limit: int = 5, min_score: float = 0.0) -> list[dict]:
+        """Return up to `limit` products ranked by cosine similarity to `text`."""
+        query_tf = Counter(t for t in tokenize(text) if t in self._idf)
+        if not query_tf:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+        for term, tf in query_tf.items():
+            qw = (1 + math.log(tf)) * self._idf[term]
+            for idx, dw in self._postings[term]:
+                scores[idx] += qw * dw
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda kv: kv[1])
+        return [self._products[idx] for idx, score in top if score > min_score]
+
@@ -10,6 +10,7 @@ import uuid
 from PIL import Image
 
 from app.core.config import settings
+from app.core.tracing import traced
 from app.utils.s3_storage import strip_exif
 
 # Constraints
@@ -101,6 +102,7 @@ def _save_local(file_bytes: bytes, folder: str, filename: str, ext: str = "png")
     return f"{settings.BASE_URL}/uploads/{folder}/{filename}.{ext}"
 
 
+@traced("storage.upload_image")
 def upload_image(file_bytes: bytes, folder: str, filename: str) -> str:
     """Upload an image to local storage. Strips EXIF metadata before saving. Returns the URL."""
     _validate_folder(folder)
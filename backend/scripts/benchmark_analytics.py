@@ -0,0 +1,120 @@
+"""
+Benchmark retailer analytics: list-of-dicts scans vs. the columnar session store.
+Generates synthetic try-on sessions in memory; no store or network access.
+
+Usage (from backend/):
+    python -m scripts.benchmark_analytics [num_sessions]
+"""
+
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from app.services.analytics_columnar import SessionColumns
+
+NUM_SESSIONS = 1_000_000
+NUM_PRODUCTS = 2_000
+NUM_MODELS = 50
+NUM_RETAILERS = 20
+DAYS = 90
+
+
+def generate_sessions(n: int) -> tuple[list[dict], dict[str, str]]:
+    rng = random.Random(42)
+    product_retailer = {f"p{i}": f"r{i % NUM_RETAILERS}" for i in range(NUM_PRODUCTS)}
+    products = list(product_retailer)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    sessions = []
+    for i in range(n):
+        created = start + timedelta(seconds=rng.randrange(DAYS * 86400))
+        sessions.append({
+            "_id": f"s{i}",
+            "user_id": f"u{rng.randrange(50_000)}",
+            "product_id": rng.choice(products),
+            "model_id": f"m{rng.randrange(NUM_MODELS)}",
+            "ai_provider": rng.choice(("gemini", "bedrock", "fallback")),
+            "processing_time_ms": rng.randrange(500, 30_000),
+            "is_favorite": rng.random() < 0.1,
+            "status": "completed",
+            "created_at": created.isoformat(),
+        })
+    return sessions, product_retailer
+
+
+def dashboard_baseline(sessions: list[dict], product_ids: set[str], date_from: str, date_to: str) -> dict:
+    """The per-dict loops get_dashboard_summary used before the columnar store."""
+    rows = [s for s in sessions if s.get("product_id") in product_ids]
+    rows = [s for s in rows if s.get("created_at", "") >= date_from]
+    rows = [s for s in rows if s.get("created_at", "") <= date_to + "T23:59:59"]
+    favorites = sum(1 for s in rows if s.get("is_favorite"))
+    times = [s["processing_time_ms"] for s in rows if s.get("processing_time_ms")]
+    by_date: dict[str, int] = defaultdict(int)
+    for s in rows:
+        by_date[s["created_at"][:10]] += 1
+    products = Counter(s["product_id"] for s in rows)
+    models = Counter(s["model_id"] for s in rows if s.get("model_id"))
+    providers = Counter(s.get("ai_provider", "unknown") for s in rows)
+    return {
+        "total_tryons": len(rows),
+        "total_favorites": favorites,
+        "avg_processing_time_ms": sum(times) / len(times) if times else 0.0,
+        "tryons_by_date": dict(by_date),
+        "products": products,
+        "models": models,
+        "providers": providers,
+    }
+
+
+def product_baseline(sessions: list[dict], product_id: str) -> dict:
+    rows = [s for s in sessions if s.get("product_id") == product_id]
+    recent = sorted(rows, key=lambda s: s.get("created_at", ""), reverse=True)[:10]
+    return {
+        "tryon_count": len(rows),
+        "models": Counter(s["model_id"] for s in rows),
+        "recent": [s["_id"] for s in recent],
+    }
+
+
+def timed(label: str, fn, repeat: int = 5):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<40} {best * 1000:10.1f} ms")
+    return result
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_SESSIONS
+    print(f"Generating {n:,} sessions...")
+    sessions, product_retailer = generate_sessions(n)
+    product_ids = {pid for pid, rid in product_retailer.items() if rid == "r3"}
+    date_from, date_to = "2025-02-01", "2025-02-28"
+
+    columns = SessionColumns()
+    timed("columnar build (one-off)", lambda: columns.load(sessions), repeat=1)
+
+    print("Dashboard summary (1 retailer, 28 days):")
+    base = timed("list-of-dicts", lambda: dashboard_baseline(sessions, product_ids, date_from, date_to))
+    col = timed("columnar", lambda: columns.summarize(columns.mask(product_ids, date_from, date_to)))
+    for key in ("total_tryons", "total_favorites", "tryons_by_date", "products", "models", "providers"):
+        assert base[key] == col[key], key
+
+    print("Product analytics (1 product):")
+    base = timed("list-of-dicts", lambda: product_baseline(sessions, "p7"))
+
+    def product_columnar():
+        return columns.summarize(columns.product_rows("p7")), columns.recent("p7")
+
+    agg, recent = timed("columnar (product index)", product_columnar)
+    assert base["tryon_count"] == agg["total_tryons"]
+    assert base["models"] == agg["models"]
+    assert base["recent"] == [r["session_id"] for r in recent]
+
+
+if __name__ == "__main__":
+    main()
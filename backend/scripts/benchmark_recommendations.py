@@ -0,0 +1,94 @@
+"""
+Benchmark style recommendations: per-product Python scoring vs. the sparse
+recommendation engine. Generates a synthetic catalog in memory; no store or
+network access.
+
+Usage (from backend/):
+    python -m scripts.benchmark_recommendations [num_products]
+"""
+
+import random
+import sys
+import time
+
+from app.services.recommendation_engine import RecommendationEngine, UserAffinity
+
+NUM_PRODUCTS = 100_000
+NUM_TAGS = 2_000
+NUM_CATEGORIES = 40
+NUM_USERS = 20
+TRIES_PER_USER = 30
+LIMIT = 10
+
+
+def generate_products(n: int) -> list[dict]:
+    rng = random.Random(42)
+    tags = [f"tag{i}" for i in range(NUM_TAGS)]
+    return [
+        {
+            "_id": f"p{i}",
+            "tags": rng.sample(tags, rng.randrange(1, 8)),
+            "category": f"cat{rng.randrange(NUM_CATEGORIES)}",
+            "is_deleted": False,
+        }
+        for i in range(n)
+    ]
+
+
+def baseline(products: list[dict], affinity: UserAffinity, limit: int) -> list[str]:
+    """The loop recommend_style ran over every active product before the engine."""
+    scored = []
+    for product in products:
+        if product["_id"] in affinity.tried:
+            continue
+        score = 0.0
+        for tag in set(product.get("tags", [])):
+            if tag in affinity.tags:
+                score += affinity.tags[tag]
+        category = product.get("category", "")
+        if category in affinity.categories:
+            score += affinity.categories[category] * 2
+        if score > 0:
+            scored.append((score, product))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [p["_id"] for _, p in scored[:limit]]
+
+
+def timed(label: str, fn, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<40} {best * 1000:10.1f} ms")
+    return result
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else NUM_PRODUCTS
+    print(f"Generating {n:,} products...")
+    products = generate_products(n)
+    rng = random.Random(7)
+
+    engine = RecommendationEngine()
+    timed("matrix build (one-off)", lambda: engine.load(products), repeat=1)
+
+    users = []
+    for _ in range(NUM_USERS):
+        affinity = UserAffinity()
+        for product in rng.sample(products, TRIES_PER_USER):
+            affinity.add(product["_id"], product)
+        users.append(affinity)
+
+    print(f"Style recommendations ({NUM_USERS} users, top {LIMIT}):")
+    base = timed("python loop", lambda: [baseline(products, u, LIMIT) for u in users], repeat=1)
+    fast = timed(
+        "sparse mat-vec + argpartition",
+        lambda: [[p["_id"] for p in engine.top_products(u, LIMIT)] for u in users],
+    )
+    assert base == fast
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Offline job: build the item-item similarity artifact served by
+/recommendations/also-tried and blended into style recommendations.
+
+Reads try-on sessions, wishlists and carts from the JSON store, computes
+cosine similarity over user sets with the top ITEM_SIMILARITY_TOP_N
+neighbors per product, and writes ITEM_SIMILARITY_PATH. Restart the API
+(or run this before starting it) to pick up the new artifact.
+
+Usage (from backend/):
+    python -m scripts.build_item_similarity [output_path]
+"""
+
+import asyncio
+import sys
+import time
+
+from app.core.config import settings
+from app.services.item_similarity import collect_interactions, compute_similarity, save_artifact
+from app.utils.json_store import JsonStore
+
+
+async def build(output_path: str) -> None:
+    store = JsonStore(data_dir=settings.DATA_DIR)
+    store.load()
+
+    start = time.perf_counter()
+    interactions = collect_interactions(
+        await store.find_many("tryon_sessions", {}),
+        await store.find_many("wishlists", {}),
+        await store.find_many("carts", {}),
+    )
+    arrays = compute_similarity(interactions, top_n=settings.ITEM_SIMILARITY_TOP_N)
+    save_artifact(output_path, arrays)
+
+    print(
+        f"Wrote {output_path}: {len(interactions)} users, "
+        f"{arrays['product_ids'].size} products, {arrays['neighbors'].size} neighbor pairs "
+        f"in {time.perf_counter() - start:.2f}s"
+    )
+
+
+def main() -> None:
+    output_path = sys.argv[1] if len(sys.argv) > 1 else settings.ITEM_SIMILARITY_PATH
+    asyncio.run(build(output_path))
+
+
+if __name__ == "__main__":
+    main()